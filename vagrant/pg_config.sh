@@ -1,9 +1,18 @@
 
+# tournament.sql needs PostgreSQL 13 or later, newer than the distribution's
+# own postgresql package, so it comes from the PostgreSQL apt repository
 apt-get -qqy update
-apt-get -qqy install postgresql python-psycopg2
+apt-get -qqy install wget ca-certificates
+wget -qO - https://www.postgresql.org/media/keys/ACCC4CF8.asc | apt-key add -
+echo "deb http://apt-archive.postgresql.org/pub/repos/apt bionic-pgdg main" > /etc/apt/sources.list.d/pgdg.list
+apt-get -qqy update
+apt-get -qqy install postgresql-13 python-psycopg2
+apt-get -qqy install python-numpy
 apt-get -qqy install python-flask python-sqlalchemy
 apt-get -qqy install python-pip
 pip install bleach
+apt-get -qqy install python3-pip python3-psycopg2
+pip3 install aiopg
 su postgres -c 'createuser -dRS vagrant'
 su vagrant -c 'createdb'
 su vagrant -c 'createdb forum'
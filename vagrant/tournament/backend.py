@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#
+# backend.py -- storage backend interface behind tournament.py
+#
+# By default every public function in tournament.py runs against PostgreSQL.
+# tournament.useBackend() routes them to another implementation of Backend
+# instead, such as the embedded SQLiteBackend in sqlite_backend.py.
+#
+
+
+class Backend(object):
+    """The operations a storage backend provides to tournament.py.
+
+    Each method takes the same arguments, returns the same values and raises
+    the same errors as the tournament.py function of the same name; see
+    those functions for details.
+    """
+
+    def createNewTournament(self):
+        raise NotImplementedError
+
+    def closeTournament(self, tourney_id):
+        raise NotImplementedError
+
+    def getCurrentTournamentId(self):
+        raise NotImplementedError
+
+    def deleteAllMatches(self):
+        raise NotImplementedError
+
+    def deleteMatchesFromTournament(self, tourney_id):
+        raise NotImplementedError
+
+    def dropTournament(self, tourney_id):
+        raise NotImplementedError
+
+    def archiveTournament(self, tourney_id, export_path=None):
+        raise NotImplementedError
+
+    def compactTournaments(self, older_than=0, export_dir=None):
+        raise NotImplementedError
+
+    def deleteAllPlayers(self):
+        raise NotImplementedError
+
+    def deletePlayersFromTournament(self, tourney_id):
+        raise NotImplementedError
+
+    def countTotalPlayers(self):
+        raise NotImplementedError
+
+    def countPlayersFromTournament(self, tourney_id):
+        raise NotImplementedError
+
+    def registerPlayer(self, name, tourney_id):
+        raise NotImplementedError
+
+    def registerPlayers(self, names, tourney_id):
+        raise NotImplementedError
+
+    def findPlayerOMW(self, player_id, tourney_id, cursor=None):
+        raise NotImplementedError
+
+    def playerStandings(self, tourney_id, tiebreakers=None):
+        raise NotImplementedError
+
+    def iterStandings(self, tourney_id, batch_size=1000):
+        raise NotImplementedError
+
+    def standingsPage(self, tourney_id, limit=50, offset=None, after_key=None):
+        raise NotImplementedError
+
+    def reportMatch(self, player_one_id, player_two_id, winner_id, tourney_id):
+        raise NotImplementedError
+
+    def reportMatches(self, results, tourney_id):
+        raise NotImplementedError
+
+    def reportLoggedMatches(self, log_id, entries, through=None):
+        raise NotImplementedError
+
+    def getMatchLogMark(self, log_id):
+        raise NotImplementedError
+
+    def importRecords(self, records, tourney_id, max_errors=100):
+        raise NotImplementedError
+
+    def getCurrentRound(self, tourney_id):
+        raise NotImplementedError
+
+    def closeRound(self, tourney_id):
+        raise NotImplementedError
+
+    def standingsAfterRound(self, tourney_id, round_number):
+        raise NotImplementedError
+
+    def swissPairings(self, tourney_id):
+        raise NotImplementedError
+
+    def pairAllActiveTournaments(self, processes=None, tourney_ids=None):
+        raise NotImplementedError
+
+    def findByePlayer(self, standings, tourney_id):
+        raise NotImplementedError
+
+    def resetDatabase(self):
+        raise NotImplementedError
+
+    def transaction(self):
+        """Returns a context manager that runs every operation called in its
+        block in one transaction; see tournament.transaction()."""
+        raise NotImplementedError
+
+    def close(self):
+        """Releases whatever the backend holds open."""
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+#
+# cache.py -- bounded, versioned LRU cache used for standings results
+#
+
+import threading
+from collections import OrderedDict
+
+
+class VersionedLRUCache(object):
+    """A thread-safe LRU cache whose entries are tagged with a version.
+
+    A lookup only hits when the caller's current version matches the version
+    the entry was stored with, so bumping the version invalidates an entry
+    without having to reach the cache that holds it.
+
+    Counters:
+        hits: lookups answered from the cache
+        misses: lookups for a missing or out-of-date entry
+        evictions: entries dropped to stay within maxsize
+    """
+
+    def __init__(self, maxsize=128):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key, version):
+        """Returns the value stored for key at this version, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self._stats['misses'] += 1
+                return None
+            # move to the most recently used end
+            del self._entries[key]
+            self._entries[key] = entry
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        """Stores value for key at this version, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (version, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns a snapshot of the counters and the current number of entries."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        return stats
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+#
+# compactor.py -- background archival of finished tournaments
+#
+# A Compactor calls tournament.compactTournaments() every `interval` seconds
+# from a background thread, so tournaments closed with closeTournament() are
+# moved out of the live tables once they have been closed for `older_than`
+# seconds, without the caller having to schedule it.  Each archive briefly
+# stalls every other tournament (see archiveTournament()), so give it an
+# interval and older_than that keep it to quiet periods.
+#
+
+import threading
+
+import tournament
+
+
+class Compactor(object):
+    """Archives closed tournaments in a background thread.
+
+    Args:
+      interval: seconds between passes
+      older_than: how many seconds a closed tournament stays in the live
+        tables, as for compactTournaments()
+      export_dir: optionally, a directory to export archived matches to, as
+        for compactTournaments()
+
+    Attributes:
+      archived: the ids of the tournaments archived so far, in order
+      last_error: the exception raised by the last pass, or None
+    """
+
+    def __init__(self, interval=60.0, older_than=3600.0, export_dir=None):
+        self.interval = interval
+        self.older_than = older_than
+        self.export_dir = export_dir
+        self.archived = []
+        self.last_error = None
+
+        self._compacting = threading.Lock()
+        self._wakeup = threading.Condition(threading.Lock())
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._compactLoop, name="tournament-compactor")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def compact(self):
+        """Runs a pass now, rather than waiting for the next one.
+
+        Returns:
+          The ids of the tournaments archived by this pass
+        """
+        with self._compacting:
+            tourney_ids = tournament.compactTournaments(self.older_than, self.export_dir)
+            self.archived.extend(tourney_ids)
+        return tourney_ids
+
+    def _compactLoop(self):
+        while True:
+            with self._wakeup:
+                if not self._closed:
+                    self._wakeup.wait(self.interval)
+                if self._closed:
+                    return
+            try:
+                self.compact()
+                self.last_error = None
+            except Exception as e:
+                # leave the tournaments where they are and try again next pass
+                self.last_error = e
+
+    def close(self):
+        """Stops the background thread, waiting for a pass in progress to finish."""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
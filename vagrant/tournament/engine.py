@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+#
+# engine.py -- in-memory tournament engine with write-behind persistence
+#
+# A TournamentEngine loads one tournament from the database once and then
+# answers standings and pairings from memory.  New results are applied in
+# memory immediately and written to the matches table in batches by a
+# background thread.  It assumes it is the only writer of its tournament's
+# matches while it is running.
+#
+
+import threading
+from array import array
+from contextlib import closing
+
+import tournament
+from pairing import PairingPlayer, pairRound
+
+
+class TournamentEngine(object):
+    """Holds one tournament's players and results in memory.
+
+    Players are numbered densely in registration order; per-player totals
+    are kept in parallel integer arrays and opponents as sets of those
+    numbers.  Totals are updated incrementally as results are reported, the
+    same way the player_stats triggers do in the database.
+
+    Results are written to the round that is open when they reach the
+    database: close rounds with closeRound(), which flushes first, or call
+    flush() before tournament.closeRound(), so that a round's results are
+    recorded in it.  A result the database refuses is left out and kept in
+    `rejected`; it still counts in the engine's own standings.
+
+    Args:
+      tourney_id: the id of the tournament to load
+      flush_interval: the most seconds a reported result waits before the
+        background thread writes it to the database
+      batch_size: the most results written in one transaction
+
+    Attributes:
+      rejected: (result, exception) tuples for the results the database
+        refused, with results as (player_one_id, player_two_id, winner_id)
+      last_error: the exception raised by the last background flush, or None
+    """
+
+    def __init__(self, tourney_id, flush_interval=0.5, batch_size=500):
+        self.tourney_id = tourney_id
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.rejected = []
+        self.last_error = None
+
+        self._lock = threading.RLock()
+        self._index = {}
+        self._ids = []
+        self._names = []
+        self._wins = array('i')
+        self._matches = array('i')
+        self._omw = array('i')
+        self._had_bye = bytearray()
+        self._opponents = []
+        self._ranking = None
+
+        self._pending = []
+        self._flushing = threading.Lock()
+        self._wakeup = threading.Condition(threading.Lock())
+        self._closed = False
+
+        self._load()
+        self._flusher = threading.Thread(target=self._flushLoop, name="engine-flush-%s" % tourney_id)
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def _load(self):
+        """Reads the tournament's players and matches from one snapshot."""
+        with closing(tournament.connect()) as db:
+            cursor = db.cursor()
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+            cursor.execute("SELECT id, name FROM players WHERE tourney_id=(%s) ORDER BY id;",
+                           (str(self.tourney_id),))
+            for player_id, name in cursor.fetchall():
+                self._addPlayer(player_id, name)
+            cursor.execute("SELECT player_one_id, player_two_id, winner_id FROM matches "
+                           "WHERE tourney_id=(%s) ORDER BY id;", (str(self.tourney_id),))
+            for player_one_id, player_two_id, winner_id in cursor.fetchall():
+                self._apply(player_one_id, player_two_id, winner_id)
+            db.rollback()
+
+    def _addPlayer(self, player_id, name):
+        self._index[player_id] = len(self._ids)
+        self._ids.append(player_id)
+        self._names.append(name)
+        self._wins.append(0)
+        self._matches.append(0)
+        self._omw.append(0)
+        self._had_bye.append(0)
+        self._opponents.append(set())
+        self._ranking = None
+
+    def _apply(self, player_one_id, player_two_id, winner_id):
+        """Folds one normalized result into the in-memory totals."""
+        one = self._index[player_one_id]
+        self._matches[one] += 1
+        if player_two_id is None:
+            self._had_bye[one] = 1
+        else:
+            two = self._index[player_two_id]
+            self._matches[two] += 1
+            # first meeting: each player's omw gains the other's wins so far
+            if two not in self._opponents[one]:
+                self._omw[one] += self._wins[two]
+                self._omw[two] += self._wins[one]
+                self._opponents[one].add(two)
+                self._opponents[two].add(one)
+        if winner_id is not None:
+            winner = self._index[winner_id]
+            self._wins[winner] += 1
+            for opponent in self._opponents[winner]:
+                self._omw[opponent] += 1
+        self._ranking = None
+
+    def _rank(self):
+        """Returns player numbers in standings order, caching the result."""
+        if self._ranking is None:
+            wins, omw, ids = self._wins, self._omw, self._ids
+            self._ranking = sorted(range(len(ids)), key=lambda i: (-wins[i], -omw[i], ids[i]))
+        return self._ranking
+
+    def registerPlayers(self, names):
+        """Registers players in the database right away and adds them to the engine.
+
+        Returns:
+          The ids assigned to the players, in the same order as `names`
+        """
+        names = list(names)
+        ids = tournament.registerPlayers(names, self.tourney_id)
+        with self._lock:
+            for player_id, name in zip(ids, names):
+                self._addPlayer(player_id, name)
+        return ids
+
+    def playerStandings(self):
+        """Returns the standings in the same form as tournament.playerStandings()."""
+        with self._lock:
+            return [(self._ids[i], self._names[i], self._wins[i], self._matches[i],
+                     self.tourney_id, self._omw[i]) for i in self._rank()]
+
+    def reportMatch(self, player_one_id, player_two_id, winner_id):
+        """Records the outcome of a single match; see tournament.reportMatch()."""
+        self.reportMatches([(player_one_id, player_two_id, winner_id)])
+
+    def reportMatches(self, results):
+        """Records a batch of results in memory and queues them for the database.
+
+        Every result is validated before any of them is applied.
+
+        Raises:
+          ValueError: if any result is malformed or names an unknown player
+        """
+        rows = [tournament.normalizeMatch(*result) for result in results]
+        with self._lock:
+            for row in rows:
+                for player_id in row[:2]:
+                    if player_id is not None and player_id not in self._index:
+                        raise ValueError("Player %s is not registered in tournament %s." %
+                                         (player_id, self.tourney_id))
+            for row in rows:
+                self._apply(*row)
+            self._queue(rows)
+
+    def swissPairings(self):
+        """Pairs the next round from memory; see tournament.swissPairings().
+
+        The bye, if any, is recorded like any other result.
+        """
+        with self._lock:
+            players = [PairingPlayer(i, self._names[i], self._wins[i],
+                                     self._opponents[i], bool(self._had_bye[i]))
+                       for i in self._rank()]
+            pairs, bye = pairRound(players)
+            if bye is not None:
+                row = (self._ids[bye.id], None, self._ids[bye.id])
+                self._apply(*row)
+                self._queue([row])
+
+        return [(self._ids[one.id], one.name, self._ids[two.id], two.name) for (one, two) in pairs]
+
+    def _queue(self, rows):
+        with self._wakeup:
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.notify()
+
+    def pending(self):
+        """Returns the number of results not yet written to the database."""
+        with self._wakeup:
+            return len(self._pending)
+
+    def flush(self):
+        """Writes every queued result to the database before returning."""
+        with self._flushing:
+            while True:
+                with self._wakeup:
+                    batch = self._pending[:self.batch_size]
+                if not batch:
+                    return
+                self._write(batch)
+
+    def _write(self, batch):
+        """Writes a batch in one transaction, or result by result if the database refuses it."""
+        try:
+            tournament.reportMatches(batch, self.tourney_id)
+        except Exception:
+            # one refused result fails the whole batch, so find it
+            for row in batch:
+                try:
+                    tournament.reportMatches([row], self.tourney_id)
+                except Exception as e:
+                    # if the database cannot be read at all, the result is not to
+                    # blame; this raises, and the rest is written again later
+                    tournament.getCurrentRound(self.tourney_id)
+                    self.rejected.append((row, e))
+                with self._wakeup:
+                    del self._pending[0]
+        else:
+            with self._wakeup:
+                del self._pending[:len(batch)]
+
+    def closeRound(self):
+        """Writes every queued result, then closes the open round; see
+        tournament.closeRound().
+
+        Returns:
+          The number of the round that was closed
+        """
+        self.flush()
+        return tournament.closeRound(self.tourney_id)
+
+    def _flushLoop(self):
+        while True:
+            with self._wakeup:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._wakeup.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                self.last_error = None
+            except Exception as e:
+                # keep the results queued and try again on the next wakeup
+                self.last_error = e
+
+    def close(self):
+        """Stops the background writer and flushes the remaining results."""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        self._flusher.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
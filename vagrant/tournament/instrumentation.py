@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+#
+# instrumentation.py -- query and latency hooks for tournament.py
+#
+# While at least one hook is registered, tournament.py reports every
+# connection checkout, every statement and every public function call to the
+# registered hooks.  With no hooks registered the only cost is a check of an
+# empty list per call.
+#
+
+import inspect
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import wraps
+
+
+class ConnectionEvent(namedtuple('ConnectionEvent', 'seconds')):
+    """A connection was checked out of the pool.
+
+    Attributes:
+      seconds: how long the checkout took, including opening a new
+        connection when the pool had no idle one
+    """
+    __slots__ = ()
+
+
+class QueryEvent(namedtuple('QueryEvent', 'statement seconds rows')):
+    """A statement was executed.
+
+    Attributes:
+      statement: the SQL as sent to the server, parameters included
+      seconds: how long execute() took
+      rows: the cursor's rowcount afterwards: rows returned or affected, or -1
+    """
+    __slots__ = ()
+
+
+class CallEvent(namedtuple('CallEvent', 'function seconds connections queries rows')):
+    """A public tournament.py function returned or raised.
+
+    Attributes:
+      function: the function's name
+      seconds: how long the call took
+      connections: connections checked out during the call
+      queries: statements executed during the call
+      rows: the total rows returned or affected by those statements
+    """
+    __slots__ = ()
+
+
+_hooks = ()
+_hooks_lock = threading.Lock()
+_local = threading.local()
+
+
+def addHook(hook):
+    """Registers a callable to be called with every ConnectionEvent,
+    QueryEvent and CallEvent, on the thread that caused it."""
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+
+
+def removeHook(hook):
+    """Unregisters a hook added with addHook()."""
+    global _hooks
+    with _hooks_lock:
+        hooks = list(_hooks)
+        hooks.remove(hook)
+        _hooks = tuple(hooks)
+
+
+def enabled():
+    """Returns whether any hook is registered."""
+    return bool(_hooks)
+
+
+def _emit(event):
+    for hook in _hooks:
+        hook(event)
+
+
+def _activeCalls():
+    calls = getattr(_local, 'calls', None)
+    if calls is None:
+        calls = _local.calls = []
+    return calls
+
+
+def instrumented(function):
+    """Decorates a public function so each call is reported as a CallEvent.
+
+    Calls made from inside another instrumented function are reported too,
+    and their statements count towards both calls.  A call that returns a
+    generator, like iterStandings(), is reported once the generator is
+    exhausted or closed, with the time and statements spent iterating it.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _hooks:
+            return function(*args, **kwargs)
+        totals = [0, 0, 0]
+        elapsed = [0.0]
+        result = None
+        try:
+            result = _counted(totals, elapsed, function, *args, **kwargs)
+        finally:
+            if not inspect.isgenerator(result):
+                _emit(CallEvent(function.__name__, elapsed[0], totals[0], totals[1], totals[2]))
+        if inspect.isgenerator(result):
+            return _countedGenerator(function.__name__, result, totals, elapsed)
+        return result
+    return wrapper
+
+
+def _counted(totals, elapsed, function, *args, **kwargs):
+    """Calls `function`, adding its connections, statements and rows to
+    `totals` and its duration to `elapsed`."""
+    calls = _activeCalls()
+    calls.append(totals)
+    start = time.time()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        elapsed[0] += time.time() - start
+        calls.pop()
+
+
+def _countedGenerator(name, generator, totals, elapsed):
+    """Iterates a generator returned by an instrumented call, counting each
+    step towards the call, and reports the call when the generator ends."""
+    try:
+        while True:
+            try:
+                item = _counted(totals, elapsed, next, generator)
+            except StopIteration:
+                return
+            yield item
+    finally:
+        _counted(totals, elapsed, generator.close)
+        _emit(CallEvent(name, elapsed[0], totals[0], totals[1], totals[2]))
+
+
+class InstrumentedCursor(object):
+    """Wraps a cursor, reporting every statement it executes."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, query, params=None):
+        return self._timed(self._cursor.execute, query, params)
+
+    def executemany(self, query, params_seq):
+        return self._timed(self._cursor.executemany, query, params_seq)
+
+    def _timed(self, method, query, params):
+        start = time.time()
+        try:
+            return method(query, params)
+        finally:
+            seconds = time.time() - start
+            statement = getattr(self._cursor, 'query', None) or query
+            if isinstance(statement, bytes) and not isinstance(statement, str):
+                statement = statement.decode('utf-8', 'replace')
+            rows = self._cursor.rowcount
+            for totals in _activeCalls():
+                totals[1] += 1
+                totals[2] += max(rows, 0)
+            _emit(QueryEvent(statement, seconds, rows))
+
+
+class InstrumentedConnection(object):
+    """Wraps a connection so that its cursors report their statements."""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._connection.cursor(*args, **kwargs))
+
+
+def instrumentConnect(connect):
+    """Times a connection checkout and wraps the connection it returns.
+
+    Args:
+      connect: a function returning a new or pooled connection
+    """
+    start = time.time()
+    connection = connect()
+    seconds = time.time() - start
+    for totals in _activeCalls():
+        totals[0] += 1
+    _emit(ConnectionEvent(seconds))
+    return InstrumentedConnection(connection)
+
+
+class Profile(object):
+    """The events recorded by a profile() block.
+
+    Attributes:
+      calls: CallEvents, in the order the calls finished
+      queries: QueryEvents, in the order the statements ran
+      connections: ConnectionEvents, in the order of checkout
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.queries = []
+        self.connections = []
+
+    def record(self, event):
+        if isinstance(event, QueryEvent):
+            self.queries.append(event)
+        elif isinstance(event, CallEvent):
+            self.calls.append(event)
+        elif isinstance(event, ConnectionEvent):
+            self.connections.append(event)
+
+    def summary(self):
+        """Returns totals over every recorded event."""
+        return {
+            'calls': len(self.calls),
+            'connections': len(self.connections),
+            'connect_seconds': sum(event.seconds for event in self.connections),
+            'queries': len(self.queries),
+            'query_seconds': sum(event.seconds for event in self.queries),
+            'rows': sum(max(event.rows, 0) for event in self.queries),
+        }
+
+    def slowestQueries(self, count=10):
+        """Returns the `count` slowest QueryEvents, slowest first."""
+        return sorted(self.queries, key=lambda event: event.seconds, reverse=True)[:count]
+
+
+@contextmanager
+def profile(all_threads=False):
+    """Records every event raised inside the block.
+
+    Usage:
+      with profile() as result:
+          swissPairings(tourney_id)
+      print(result.summary())
+
+    Args:
+      all_threads: record events from every thread, not just this one
+    """
+    result = Profile()
+    thread = threading.current_thread()
+
+    def hook(event):
+        if all_threads or threading.current_thread() is thread:
+            result.record(event)
+
+    addHook(hook)
+    try:
+        yield result
+    finally:
+        removeHook(hook)
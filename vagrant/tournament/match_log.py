@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+#
+# match_log.py -- write-ahead log for bursts of match results
+#
+# A MatchLog acknowledges a result as soon as it is appended to a local log
+# file and synced to disk, and a background thread records logged results
+# in the matches table in batches, many results per transaction.  Callers
+# reporting at the same moment share one fsync, so reporting latency stays
+# flat when every table of a round reports at once.  Each result is logged
+# with an increasing seq, and the last seq recorded is stored with the
+# results (see tournament.reportLoggedMatches()), so opening the log again
+# after a crash records whatever was logged but not recorded, exactly once.
+#
+# Usage:
+#   with MatchLog('/var/lib/tournament/matches.log') as log:
+#       log.reportMatch(player_one_id, player_two_id, winner_id, tourney_id)
+#
+
+import json
+import os
+import threading
+import uuid
+
+import tournament
+
+# fdatasync skips syncing file metadata that appends do not need
+_datasync = getattr(os, 'fdatasync', os.fsync)
+
+
+class MatchLog(object):
+    """Logs match results locally and records them in the database behind the caller.
+
+    Results are validated when they are logged, but whether their players
+    are registered in the tournament, and which round they belong to, is
+    only settled when they are recorded: call flush() before closeRound()
+    so that a round's results are recorded in it.  A result the database
+    refuses is left out and kept in `rejected`.
+
+    Args:
+      path: the log file, created if missing and replayed if not
+      flush_interval: the most seconds a logged result waits before the
+        background thread records it
+      batch_size: the most results recorded in one transaction
+      checkpoint_bytes: once every logged result is recorded and the file
+        has grown past this many bytes, it is emptied
+
+    Attributes:
+      log_id: the id kept in the log file's first line
+      rejected: (entry, exception) tuples for the results the database
+        refused, with entries as for tournament.reportLoggedMatches()
+      last_error: the exception raised by the last background flush, or None
+    """
+
+    def __init__(self, path, flush_interval=0.05, batch_size=1000, checkpoint_bytes=1 << 20):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.checkpoint_bytes = checkpoint_bytes
+        self.rejected = []
+        self.last_error = None
+
+        # _appending guards the file and the seqs written to it; _synced
+        # guards how far the file is known to be on disk
+        self._appending = threading.Lock()
+        self._synced = threading.Condition(threading.Lock())
+        self._syncing = False
+        self._pending = []
+        self._flushing = threading.Lock()
+        self._wakeup = threading.Condition(threading.Lock())
+        self._closed = False
+
+        self._open()
+        self._flusher = threading.Thread(target=self._flushLoop, name="match-log-flush")
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def _open(self):
+        """Opens the log file, creating it or reading back the results not yet recorded."""
+        header, entries, size = None, [], 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as log:
+                for line in log:
+                    try:
+                        record = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        record = None
+                    # a line cut short by a crash was never acknowledged
+                    if record is None or not line.endswith(b'\n'):
+                        break
+                    if header is None:
+                        if not isinstance(record, dict) or 'log_id' not in record:
+                            raise ValueError("%s is not a match log." % self.path)
+                        header = record
+                        self._header_bytes = len(line)
+                    else:
+                        entries.append(tuple(record))
+                    size += len(line)
+
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.ftruncate(self._fd, size)
+        if header is None:
+            self.log_id = uuid.uuid4().hex
+            self._header_bytes = size = self._write([{'log_id': self.log_id}])
+            os.fsync(self._fd)
+            directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        else:
+            self.log_id = header['log_id']
+        self._size = size
+
+        mark = tournament.getMatchLogMark(self.log_id)
+        self._pending = [entry for entry in entries if entry[0] > mark]
+        # seqs are never reused, even once the file has been emptied
+        self._seq = self._synced_seq = max([mark] + [entry[0] for entry in entries])
+
+    def _write(self, records):
+        """Appends one JSON line per record and returns the bytes written."""
+        data = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records).encode('utf-8')
+        written = len(data)
+        while data:
+            data = data[os.write(self._fd, data):]
+        return written
+
+    def reportMatch(self, player_one_id, player_two_id, winner_id, tourney_id):
+        """Logs the outcome of a single match; see tournament.reportMatch()."""
+        self.reportMatches([(player_one_id, player_two_id, winner_id)], tourney_id)
+
+    def reportMatches(self, results, tourney_id):
+        """Logs a batch of results, returning once they are on disk.
+
+        Every result is validated before any of them is logged.
+
+        Raises:
+          ValueError: if any result is malformed, or the log is closed
+        """
+        rows = []
+        for result in results:
+            if len(result) != 3:
+                raise ValueError("Expected (player_one_id, player_two_id, winner_id), got %r." % (result,))
+            rows.append(tournament.normalizeMatch(*result))
+        if not rows:
+            return
+
+        with self._appending:
+            if self._fd is None:
+                raise ValueError("Match log %s is closed." % self.path)
+            entries = [(self._seq + i, int(tourney_id)) + row for i, row in enumerate(rows, 1)]
+            self._size += self._write(entries)
+            self._seq = entries[-1][0]
+            # queued in seq order, as a log's mark only moves forward
+            with self._wakeup:
+                self._pending.extend(entries)
+                if len(self._pending) >= self.batch_size:
+                    self._wakeup.notify()
+        self._sync(entries[-1][0])
+
+    def _sync(self, seq):
+        """Waits until the log is on disk through `seq`.
+
+        The first caller to arrive syncs everything written so far; callers
+        arriving while it does are covered by the next sync, so a burst of
+        reports costs a few fsyncs rather than one each.
+        """
+        with self._synced:
+            while self._synced_seq < seq:
+                if self._syncing:
+                    self._synced.wait()
+                    continue
+                self._syncing = True
+                written = self._seq
+                self._synced.release()
+                try:
+                    _datasync(self._fd)
+                finally:
+                    self._synced.acquire()
+                    self._syncing = False
+                    self._synced.notify_all()
+                self._synced_seq = max(self._synced_seq, written)
+
+    def pending(self):
+        """Returns the number of logged results not yet recorded."""
+        with self._wakeup:
+            return len(self._pending)
+
+    def flush(self):
+        """Records every result logged so far before returning."""
+        with self._flushing:
+            through = self._seq
+            self._sync(through)
+            while True:
+                with self._wakeup:
+                    batch = [entry for entry in self._pending[:self.batch_size] if entry[0] <= through]
+                if not batch:
+                    break
+                self._record(batch)
+                with self._wakeup:
+                    del self._pending[:len(batch)]
+            self._checkpoint()
+
+    def _record(self, batch):
+        """Records a batch in one transaction, or entry by entry if the database refuses it."""
+        try:
+            tournament.reportLoggedMatches(self.log_id, batch)
+        except Exception:
+            # one refused result fails the whole batch, so find it
+            for entry in batch:
+                try:
+                    tournament.reportLoggedMatches(self.log_id, [entry])
+                except Exception as e:
+                    # if the database cannot be read at all, the result is not to
+                    # blame; this raises, and the rest is tried again later
+                    tournament.getMatchLogMark(self.log_id)
+                    tournament.reportLoggedMatches(self.log_id, [], through=entry[0])
+                    self.rejected.append((entry, e))
+
+    def _checkpoint(self):
+        """Empties the log file back to its header once it has grown past
+        checkpoint_bytes and every result in it is recorded."""
+        if self._size < self.checkpoint_bytes:
+            return
+        with self._appending:
+            with self._wakeup:
+                if self._pending:
+                    return
+            os.ftruncate(self._fd, self._header_bytes)
+            os.fsync(self._fd)
+            self._size = self._header_bytes
+
+    def _flushLoop(self):
+        while True:
+            with self._wakeup:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._wakeup.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                self.last_error = None
+            except Exception as e:
+                # the results stay logged and queued; try again on the next wakeup
+                self.last_error = e
+
+    def close(self):
+        """Stops the background thread and records the remaining results.
+
+        If they cannot be recorded, the error is raised and they are
+        recorded when the log is next opened.
+        """
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        self._flusher.join()
+        try:
+            self.flush()
+        finally:
+            with self._appending:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+#
+# pairing.py -- Swiss-system pairing engine
+#
+# Pairs players within score groups, floating players down to the next group
+# when their own group cannot pair them, without rematches and with at most
+# one bye per player.  Large score groups are paired in windows of adjacent
+# players, so the cost of a round grows linearly with the number of players.
+# A window is paired with each player's nearest unplayed neighbour when that
+# works out, and by maximum weight matching otherwise.
+#
+
+from collections import namedtuple
+
+from matching import maxWeightMatching
+
+DEFAULT_WINDOW_SIZE = 32
+
+
+class PairingPlayer(namedtuple('PairingPlayer', 'id name score opponents had_bye')):
+    """A player as seen by the pairing engine.
+
+    Attributes:
+      id: the player's unique id
+      name: the player's name
+      score: the player's current score; players with equal scores form a score group
+      opponents: a set of the ids of every player already played
+      had_bye: whether the player has already received a bye
+    """
+    __slots__ = ()
+
+
+def pairRound(players, window_size=DEFAULT_WINDOW_SIZE):
+    """Pairs a round of a Swiss-system tournament.
+
+    Args:
+      players: a sequence of PairingPlayer, ordered by standings with the
+        first place player first
+      window_size: the largest number of players matched at once
+
+    Returns:
+      A tuple of (pairs, bye) where pairs is a list of (player, player) tuples
+      in standings order, with the higher ranked player first, and bye is the
+      player to be given a bye, or None when the number of players is even
+
+    Raises:
+      ValueError: if a bye is needed but every player has already had one
+    """
+    players = list(players)
+    bye = None
+    if len(players) % 2 == 1:
+        bye = _findBye(players)
+        players.remove(bye)
+
+    rank = dict((player.id, i) for i, player in enumerate(players))
+    pairs = []
+    floaters = []
+    for group in _scoreGroups(players):
+        start = 0
+        while True:
+            take = max(window_size - len(floaters), 2)
+            window = floaters + group[start:start + take]
+            start += take
+            window_pairs, floaters = _pairWindow(window, rank)
+            pairs.extend(window_pairs)
+            if start >= len(group):
+                break
+
+    # players nobody in the lower groups could take
+    if floaters:
+        pairs, _ = _repairTail(pairs, floaters, rank, allow_rematches=True)
+
+    pairs.sort(key=lambda pair: rank[pair[0].id])
+    return pairs, bye
+
+
+def _findBye(players):
+    """Returns the lowest ranked player who has not already had a bye."""
+    for player in reversed(players):
+        if not player.had_bye:
+            return player
+    raise ValueError("Could not find bye player for this round")
+
+
+def _scoreGroups(players):
+    """Splits players ordered by standings into runs of equal score."""
+    groups = []
+    for player in players:
+        if groups and groups[-1][-1].score == player.score:
+            groups[-1].append(player)
+        else:
+            groups.append([player])
+    return groups
+
+
+def _pairWindow(window, rank):
+    """Pairs a window of players without rematches.
+
+    With an odd window the lowest ranked player is left over.  Players who
+    cannot be paired inside the window are left over too.
+
+    Returns:
+      A tuple of (pairs, leftover players in standings order)
+    """
+    leftover = []
+    if len(window) % 2 == 1:
+        window, leftover = window[:-1], window[-1:]
+
+    pairs, stuck = _pairNearest(window)
+    if stuck:
+        pairs, unmatched = _repairTail(pairs, stuck, rank, allow_rematches=False)
+        leftover = unmatched + leftover
+    return pairs, leftover
+
+
+def _pairNearest(players):
+    """Pairs each player, from the top, with the nearest player below them
+    they have not played yet.
+
+    This is adjacent pairing whenever that avoids rematches, and only swaps
+    players locally otherwise, which settles most windows without building
+    a matching.
+
+    Returns:
+      A tuple of (pairs, players at the bottom left with nobody they have
+      not played)
+    """
+    pairs = []
+    remaining = list(players)
+    while remaining:
+        one = remaining.pop(0)
+        for i, two in enumerate(remaining):
+            if two.id not in one.opponents:
+                pairs.append((one, remaining.pop(i)))
+                break
+        else:
+            return pairs, [one] + remaining
+    return pairs, []
+
+
+def _matchPlayers(players, allow_rematches):
+    """Pairs as many players as possible by maximum weight matching.
+
+    Pairing players far apart in the standings costs more than pairing
+    neighbours, pairing across score groups costs more than any distance
+    between them, and a rematch, when allowed at all, costs more than
+    anything else.
+
+    Returns:
+      A tuple of (pairs, unmatched players in standings order)
+    """
+    n = len(players)
+    scores = [player.score for player in players]
+    score_cost = n
+    rematch_cost = score_cost * (max(scores) - min(scores) + 1) * n
+
+    costs = []
+    for i in range(n):
+        for j in range(i + 1, n):
+            rematch = players[j].id in players[i].opponents
+            if rematch and not allow_rematches:
+                continue
+            cost = (j - i) + abs(scores[i] - scores[j]) * score_cost
+            if rematch:
+                cost += rematch_cost
+            costs.append((i, j, cost))
+    if not costs:
+        return [], list(players)
+
+    ceiling = max(cost for (i, j, cost) in costs) + 1
+    mate = maxWeightMatching([(i, j, ceiling - cost) for (i, j, cost) in costs],
+                             maxcardinality=True)
+    mate += [-1] * (n - len(mate))
+
+    pairs = [(players[i], players[mate[i]]) for i in range(n) if mate[i] > i]
+    unmatched = [players[i] for i in range(n) if mate[i] == -1]
+    return pairs, unmatched
+
+
+def _repairTail(pairs, stuck, rank, allow_rematches):
+    """Re-pairs the bottom of a list of pairs so the stuck players can play.
+
+    Breaks up the lowest pairs, doubling how many each time, and matches the
+    players involved until none is left unpaired.  Once every pair has been
+    broken up, rematches are allowed if `allow_rematches` is set; otherwise
+    whoever still cannot be paired is returned.
+
+    Returns:
+      A tuple of (pairs, unmatched players in standings order)
+    """
+    undo = max(len(stuck), 2)
+    while True:
+        undo = min(undo, len(pairs))
+        kept, broken = pairs[:len(pairs) - undo], pairs[len(pairs) - undo:]
+        players = stuck + [player for pair in broken for player in pair]
+        players.sort(key=lambda player: rank[player.id])
+
+        last_attempt = undo == len(pairs)
+        new_pairs, unmatched = _matchPlayers(players, allow_rematches and last_attempt)
+        if not unmatched or last_attempt:
+            return kept + new_pairs, unmatched
+        undo *= 2
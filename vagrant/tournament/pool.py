@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+#
+# pool.py -- thread-safe pool of PostgreSQL connections shared by tournament.py
+#
+
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available before the wait timeout."""
+
+
+class PooledConnection(object):
+    """Wraps a psycopg2 connection checked out of a ConnectionPool.
+
+    Behaves like the underlying connection, except that close() hands the
+    connection back to the pool instead of closing it.  This lets existing
+    code keep using `with closing(connect()) as db:` unchanged.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(self._connection, name)
+
+    def close(self):
+        """Returns the connection to the pool.  Safe to call more than once."""
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.putconn(connection)
+
+
+class ConnectionPool(object):
+    """A bounded, thread-safe pool of psycopg2 connections.
+
+    Connections are opened lazily up to `maxconn`; `minconn` connections are
+    opened up front and kept alive.  Callers that find the pool exhausted
+    block until a connection is returned or `timeout` seconds pass.
+
+    Idle connections that have not been used for `health_check_interval`
+    seconds are pinged with `SELECT 1` before being handed out, and broken
+    connections are discarded and replaced.
+
+    Counters:
+        hits: checkouts served by an idle connection
+        misses: checkouts that had to open a new connection
+        waits: checkouts that blocked because the pool was exhausted
+        discarded: connections dropped after failing a health check
+    """
+
+    def __init__(self, dsn, minconn=1, maxconn=10, timeout=30.0,
+                 health_check_interval=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("expected 0 <= minconn <= maxconn and maxconn >= 1")
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Condition(threading.Lock())
+        # idle connections as (connection, time returned) pairs, most recent last
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._stats = {'hits': 0, 'misses': 0, 'waits': 0, 'discarded': 0}
+
+        for _ in range(minconn):
+            self._idle.append((self._open(), time.time()))
+            self._size += 1
+
+    def _open(self):
+        return psycopg2.connect(self.dsn)
+
+    def _isHealthy(self, connection, idle_since):
+        """Checks a connection taken from the idle list before reuse."""
+        if connection.closed:
+            return False
+        if time.time() - idle_since < self.health_check_interval:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.close()
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def getconn(self):
+        """Checks a connection out of the pool.
+
+        Returns:
+            A PooledConnection; close it to return it to the pool.
+        """
+        deadline = None
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle:
+                    connection, idle_since = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    # reserve the slot, then connect outside the lock
+                    self._size += 1
+                    self._stats['misses'] += 1
+                    connection = None
+                    break
+                if deadline is None:
+                    self._stats['waits'] += 1
+                    deadline = time.time() + self.timeout
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        "no connection available after %.1f seconds" % self.timeout)
+                self._lock.wait(remaining)
+
+        if connection is None:
+            try:
+                connection = self._open()
+            except Exception:
+                self._release()
+                raise
+        elif self._isHealthy(connection, idle_since):
+            with self._lock:
+                self._stats['hits'] += 1
+        else:
+            self._discard(connection)
+            return self.getconn()
+
+        return PooledConnection(self, connection)
+
+    def putconn(self, connection):
+        """Returns a raw connection to the pool, rolling back any open transaction."""
+        if not connection.closed:
+            try:
+                status = connection.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                pass
+        if connection.closed or connection.get_transaction_status() == \
+                psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            self._discard(connection)
+            return
+
+        with self._lock:
+            if self._closed:
+                self._size -= 1
+                connection.close()
+            else:
+                self._idle.append((connection, time.time()))
+            self._lock.notify()
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._stats['discarded'] += 1
+        self._release()
+
+    def _release(self):
+        with self._lock:
+            self._size -= 1
+            self._lock.notify()
+
+    def stats(self):
+        """Returns a snapshot of the pool counters and current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+        return stats
+
+    def closeall(self):
+        """Closes every idle connection; checked-out connections close when returned."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._lock.notify_all()
+        for connection, _ in idle:
+            connection.close()
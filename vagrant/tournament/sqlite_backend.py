@@ -0,0 +1,527 @@
+#!/usr/bin/env python
+#
+# sqlite_backend.py -- embedded storage backend for tournament.py
+#
+# Keeps tournaments in SQLite, in memory by default, so tests and small
+# single-machine events need no database server.  Standings and opponent
+# match wins are computed here in Python from the tournament's matches
+# rather than by plpgsql triggers.
+#
+# Usage:
+#   tournament.useBackend(SQLiteBackend())            # in memory
+#   tournament.useBackend(SQLiteBackend('event.db'))  # kept in a file
+#
+
+import csv
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from backend import Backend
+from pairing import PairingPlayer, pairRound
+from tournament import afterCommit, exportPath, normalizeMatch, stagingPath, unknownPlayerMessage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tournament_tracker(
+  id INTEGER PRIMARY KEY,
+  version INTEGER NOT NULL DEFAULT 0,
+  current_round INTEGER NOT NULL DEFAULT 1,
+  active INTEGER NOT NULL DEFAULT 1,
+  closed_at REAL DEFAULT NULL,
+  archived INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS players(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT,
+  tourney_id INTEGER REFERENCES tournament_tracker (id)
+);
+
+-- If player two is null, player one received a bye
+-- If winner id is null, match is a tie
+CREATE TABLE IF NOT EXISTS matches(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  player_one_id INTEGER REFERENCES players (id),
+  player_two_id INTEGER REFERENCES players (id) DEFAULT NULL,
+  winner_id INTEGER REFERENCES players (id) DEFAULT NULL,
+  tourney_id INTEGER REFERENCES tournament_tracker (id),
+  round INTEGER NOT NULL,
+  CHECK (player_one_id != player_two_id)
+);
+
+CREATE TABLE IF NOT EXISTS rounds(
+  tourney_id INTEGER NOT NULL REFERENCES tournament_tracker (id),
+  round INTEGER NOT NULL,
+  opened_at REAL NOT NULL,
+  closed_at REAL DEFAULT NULL,
+  PRIMARY KEY (tourney_id, round)
+);
+
+CREATE TABLE IF NOT EXISTS round_standings(
+  tourney_id INTEGER NOT NULL REFERENCES tournament_tracker (id),
+  round INTEGER NOT NULL,
+  player_id INTEGER NOT NULL REFERENCES players (id) ON DELETE CASCADE,
+  wins INTEGER NOT NULL,
+  matches INTEGER NOT NULL,
+  omw INTEGER NOT NULL,
+  PRIMARY KEY (tourney_id, round, player_id)
+);
+
+CREATE TABLE IF NOT EXISTS archived_standings(
+  player_id INTEGER NOT NULL,
+  name TEXT,
+  wins INTEGER NOT NULL,
+  matches INTEGER NOT NULL,
+  tourney_id INTEGER NOT NULL REFERENCES tournament_tracker (id),
+  omw INTEGER NOT NULL,
+  PRIMARY KEY (tourney_id, player_id)
+);
+
+CREATE TABLE IF NOT EXISTS matches_archive(
+  id INTEGER NOT NULL,
+  player_one_id INTEGER NOT NULL,
+  player_two_id INTEGER DEFAULT NULL,
+  winner_id INTEGER DEFAULT NULL,
+  tourney_id INTEGER NOT NULL REFERENCES tournament_tracker (id),
+  round INTEGER NOT NULL,
+  PRIMARY KEY (tourney_id, id)
+);
+
+CREATE TABLE IF NOT EXISTS match_log_marks(
+  log_id TEXT PRIMARY KEY,
+  applied INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS players_tourney_idx ON players (tourney_id);
+CREATE INDEX IF NOT EXISTS matches_tourney_idx ON matches (tourney_id);
+"""
+
+
+class SQLiteBackend(Backend):
+    """Stores tournaments in an embedded SQLite database.
+
+    One connection is shared by every thread and each operation runs under
+    a lock in a transaction of its own, or in a savepoint of the transaction
+    a tournament.transaction() block holds open.  The block holds the lock
+    until it ends, so other threads wait for it rather than join it.
+
+    Args:
+      path: the database file, or ':memory:' for a database that lasts as
+        long as this backend
+    """
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.RLock()
+        # transactions are begun and ended here rather than by the sqlite3 module
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA foreign_keys=ON;")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @contextmanager
+    def _atomic(self):
+        """Runs the block in a transaction of its own, or in a savepoint if a
+        transaction is already open, and rolls it back if it raises."""
+        with self._lock:
+            # outside a transaction a savepoint begins one, and releasing it commits
+            self._db.execute("SAVEPOINT atomic;")
+            try:
+                yield
+            except BaseException:
+                self._db.execute("ROLLBACK TO atomic;")
+                self._db.execute("RELEASE atomic;")
+                raise
+            self._db.execute("RELEASE atomic;")
+
+    def transaction(self):
+        return self._atomic()
+
+    def _execute(self, query, params=()):
+        """Runs one statement in a transaction of its own and returns its rows."""
+        with self._atomic():
+            return self._db.execute(query, params).fetchall()
+
+    def _bumpVersion(self, tourney_id=None):
+        if tourney_id is None:
+            self._db.execute("UPDATE tournament_tracker SET version=version + 1;")
+        else:
+            self._db.execute("UPDATE tournament_tracker SET version=version + 1 WHERE id=?;", (tourney_id,))
+
+    def _resetRounds(self, tourney_id):
+        """Starts a tournament's rounds over from round 1, like reset_rounds() on PostgreSQL."""
+        self._db.execute("UPDATE tournament_tracker SET current_round=1 WHERE id=?;", (tourney_id,))
+        self._db.execute("DELETE FROM rounds WHERE tourney_id=?;", (tourney_id,))
+        self._db.execute("INSERT INTO rounds (tourney_id, round, opened_at) VALUES(?, 1, ?);",
+                         (tourney_id, time.time()))
+
+    def createNewTournament(self):
+        with self._lock:
+            with self._atomic():
+                cursor = self._db.execute("INSERT INTO tournament_tracker DEFAULT VALUES;")
+                self._resetRounds(cursor.lastrowid)
+        return cursor.lastrowid
+
+    def closeTournament(self, tourney_id):
+        self._execute("UPDATE tournament_tracker SET active=0, closed_at=coalesce(closed_at, ?) WHERE id=?;",
+                      (time.time(), int(tourney_id)))
+
+    def getCurrentTournamentId(self):
+        return self._execute("SELECT max(id) FROM tournament_tracker;")[0][0]
+
+    def deleteAllMatches(self):
+        with self._lock:
+            with self._atomic():
+                self._db.execute("DELETE FROM matches;")
+                self._db.execute("DELETE FROM round_standings;")
+                for (tourney_id,) in self._db.execute("SELECT id FROM tournament_tracker "
+                                                      "WHERE NOT archived;").fetchall():
+                    self._resetRounds(tourney_id)
+                self._bumpVersion()
+
+    def deleteMatchesFromTournament(self, tourney_id):
+        with self._lock:
+            with self._atomic():
+                self._db.execute("DELETE FROM matches WHERE tourney_id=?;", (int(tourney_id),))
+                self._db.execute("DELETE FROM round_standings WHERE tourney_id=?;", (int(tourney_id),))
+                self._resetRounds(int(tourney_id))
+                self._bumpVersion(int(tourney_id))
+
+    def dropTournament(self, tourney_id):
+        with self._lock:
+            with self._atomic():
+                self._db.execute("DELETE FROM matches WHERE tourney_id=?;", (int(tourney_id),))
+                self._db.execute("DELETE FROM players WHERE tourney_id=?;", (int(tourney_id),))
+                self._db.execute("DELETE FROM archived_standings WHERE tourney_id=?;", (int(tourney_id),))
+                self._db.execute("DELETE FROM matches_archive WHERE tourney_id=?;", (int(tourney_id),))
+                self._db.execute("DELETE FROM round_standings WHERE tourney_id=?;", (int(tourney_id),))
+                self._db.execute("DELETE FROM rounds WHERE tourney_id=?;", (int(tourney_id),))
+                self._db.execute("DELETE FROM tournament_tracker WHERE id=?;", (int(tourney_id),))
+
+    def archiveTournament(self, tourney_id, export_path=None):
+        tourney_id = int(tourney_id)
+        with self._lock:
+            row = self._db.execute("SELECT archived FROM tournament_tracker WHERE id=?;", (tourney_id,)).fetchone()
+            if row is None or row[0]:
+                return
+            standings = self.playerStandings(tourney_id)
+            staging = stagingPath(export_path) if export_path is not None else None
+            try:
+                self._archive(tourney_id, standings, staging)
+            except BaseException:
+                if staging is not None:
+                    os.remove(staging)
+                raise
+            if staging is not None:
+                afterCommit(lambda: os.rename(staging, export_path), lambda: os.remove(staging))
+
+    def _archive(self, tourney_id, standings, staging):
+        """Archives a tournament in one transaction, exporting its matches to
+        `staging` if it is not None."""
+        with self._atomic():
+            if staging is not None:
+                results = self._db.execute("SELECT id, player_one_id, player_two_id, winner_id, tourney_id, "
+                                           "round FROM matches WHERE tourney_id=? ORDER BY id;", (tourney_id,))
+                with open(staging, 'w') as export:
+                    writer = csv.writer(export)
+                    writer.writerow(['id', 'player_one_id', 'player_two_id', 'winner_id', 'tourney_id', 'round'])
+                    writer.writerows(results)
+            else:
+                self._db.execute("INSERT INTO matches_archive (id, player_one_id, player_two_id, winner_id, "
+                                 "tourney_id, round) SELECT id, player_one_id, player_two_id, winner_id, "
+                                 "tourney_id, round FROM matches WHERE tourney_id=?;", (tourney_id,))
+            self._db.executemany("INSERT INTO archived_standings (player_id, name, wins, matches, tourney_id, "
+                                 "omw) VALUES(?, ?, ?, ?, ?, ?);", standings)
+            self._db.execute("DELETE FROM matches WHERE tourney_id=?;", (tourney_id,))
+            self._db.execute("DELETE FROM round_standings WHERE tourney_id=?;", (tourney_id,))
+            self._db.execute("DELETE FROM players WHERE tourney_id=?;", (tourney_id,))
+            self._db.execute("UPDATE tournament_tracker SET active=0, archived=1, "
+                             "closed_at=coalesce(closed_at, ?), version=version + 1 WHERE id=?;",
+                             (time.time(), tourney_id))
+
+    def compactTournaments(self, older_than=0, export_dir=None):
+        tourney_ids = [row[0] for row in self._execute(
+            "SELECT id FROM tournament_tracker WHERE NOT active AND NOT archived AND closed_at <= ? "
+            "ORDER BY id;", (time.time() - older_than,))]
+        for tourney_id in tourney_ids:
+            self.archiveTournament(tourney_id, exportPath(export_dir, tourney_id))
+        return tourney_ids
+
+    def deleteAllPlayers(self):
+        with self._lock:
+            with self._atomic():
+                self._db.execute("DELETE FROM players;")
+                self._bumpVersion()
+
+    def deletePlayersFromTournament(self, tourney_id):
+        with self._lock:
+            with self._atomic():
+                self._db.execute("DELETE FROM players WHERE tourney_id=?;", (int(tourney_id),))
+                self._bumpVersion(int(tourney_id))
+
+    def countTotalPlayers(self):
+        return self._execute("SELECT count(id) FROM players;")[0][0]
+
+    def countPlayersFromTournament(self, tourney_id):
+        return self._execute("SELECT count(id) FROM players WHERE tourney_id=?;", (int(tourney_id),))[0][0]
+
+    def registerPlayer(self, name, tourney_id):
+        return self.registerPlayers([name], tourney_id)[0]
+
+    def registerPlayers(self, names, tourney_id):
+        names = list(names)
+        ids = []
+        with self._lock:
+            with self._atomic():
+                for name in names:
+                    cursor = self._db.execute("INSERT INTO players (name, tourney_id) VALUES(?, ?);",
+                                              (name, int(tourney_id)))
+                    ids.append(cursor.lastrowid)
+                if ids:
+                    self._bumpVersion(int(tourney_id))
+        return ids
+
+    def _totals(self, tourney_id):
+        """Reads a tournament and computes every player's totals.
+
+        Returns:
+          A tuple of (players, wins, matches, omw, opponents, had_bye) where
+          players is a list of (id, name, tourney_id) rows in id order and
+          the rest are dicts keyed by player id
+        """
+        with self._lock:
+            players = self._db.execute("SELECT id, name, tourney_id FROM players "
+                                       "WHERE tourney_id=? ORDER BY id;", (int(tourney_id),)).fetchall()
+            results = self._db.execute("SELECT player_one_id, player_two_id, winner_id FROM matches "
+                                       "WHERE tourney_id=?;", (int(tourney_id),)).fetchall()
+
+        wins = dict((player[0], 0) for player in players)
+        matches = dict(wins)
+        opponents = dict((player[0], set()) for player in players)
+        had_bye = dict((player[0], False) for player in players)
+        for player_one_id, player_two_id, winner_id in results:
+            matches[player_one_id] += 1
+            if player_two_id is None:
+                had_bye[player_one_id] = True
+            else:
+                matches[player_two_id] += 1
+                opponents[player_one_id].add(player_two_id)
+                opponents[player_two_id].add(player_one_id)
+            if winner_id is not None:
+                wins[winner_id] += 1
+
+        omw = dict((player_id, sum(wins[opponent] for opponent in opponents[player_id]))
+                   for player_id in opponents)
+        return players, wins, matches, omw, opponents, had_bye
+
+    def findPlayerOMW(self, player_id, tourney_id, cursor=None):
+        players, wins, matches, omw, opponents, had_bye = self._totals(tourney_id)
+        return omw.get(player_id, 0)
+
+    def playerStandings(self, tourney_id, tiebreakers=None):
+        if tiebreakers is not None:
+            import tiebreaks
+            with self._lock:
+                players = self._db.execute("SELECT id, name, tourney_id FROM players "
+                                           "WHERE tourney_id=? ORDER BY id;", (int(tourney_id),)).fetchall()
+                results = self._db.execute("SELECT player_one_id, coalesce(player_two_id, -1), "
+                                           "coalesce(winner_id, -1) FROM matches WHERE tourney_id=?;",
+                                           (int(tourney_id),)).fetchall()
+            return tiebreaks.rankStandings(players, results, tuple(tiebreakers))
+
+        players, wins, matches, omw, opponents, had_bye = self._totals(tourney_id)
+        if not players:
+            # an archived tournament's standings were frozen when it was archived
+            return self._execute("SELECT player_id, name, wins, matches, tourney_id, omw FROM archived_standings "
+                                 "WHERE tourney_id=? ORDER BY wins DESC, omw DESC, player_id;", (int(tourney_id),))
+        standings = [(player_id, name, wins[player_id], matches[player_id], player_tourney_id, omw[player_id])
+                     for (player_id, name, player_tourney_id) in players]
+        standings.sort(key=lambda row: (-row[2], -row[5], row[0]))
+        return standings
+
+    def iterStandings(self, tourney_id, batch_size=1000):
+        # standings are computed in memory here, so there is nothing to stream
+        for row in self.playerStandings(tourney_id):
+            yield row
+
+    def standingsPage(self, tourney_id, limit=50, offset=None, after_key=None):
+        if offset is not None and after_key is not None:
+            raise ValueError("Pass either offset or after_key, not both.")
+        standings = self.playerStandings(tourney_id)
+        if after_key is not None:
+            wins, omw, player_id = after_key
+            after = (-wins, -omw, player_id)
+            standings = [row for row in standings if (-row[2], -row[5], row[0]) > after]
+        start = offset or 0
+        return standings[start:start + limit]
+
+    def reportMatch(self, player_one_id, player_two_id, winner_id, tourney_id):
+        self.reportMatches([(player_one_id, player_two_id, winner_id)], tourney_id)
+
+    def reportMatches(self, results, tourney_id):
+        rows = []
+        for result in results:
+            if len(result) != 3:
+                raise ValueError("Expected (player_one_id, player_two_id, winner_id), got %r." % (result,))
+            rows.append(normalizeMatch(*result) + (int(tourney_id),))
+        if not rows:
+            return
+
+        with self._lock:
+            with self._atomic():
+                # each result belongs to the tournament's open round
+                self._db.executemany("INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id, round) "
+                                     "VALUES(?, ?, ?, ?, (SELECT current_round FROM tournament_tracker WHERE id=?));",
+                                     [row + (row[3],) for row in rows])
+                self._bumpVersion(int(tourney_id))
+
+    def reportLoggedMatches(self, log_id, entries, through=None):
+        rows = []
+        for entry in entries:
+            if len(entry) != 5:
+                raise ValueError("Expected (seq, tourney_id, player_one_id, player_two_id, winner_id), got %r." %
+                                 (entry,))
+            rows.append((int(entry[0]), int(entry[1])) + normalizeMatch(*entry[2:]))
+        last = max([through or 0] + [row[0] for row in rows])
+
+        with self._lock:
+            with self._atomic():
+                self._db.execute("INSERT OR IGNORE INTO match_log_marks (log_id) VALUES(?);", (log_id,))
+                applied = self._db.execute("SELECT applied FROM match_log_marks WHERE log_id=?;",
+                                           (log_id,)).fetchone()[0]
+                rows = [row for row in rows if row[0] > applied]
+                self._db.executemany("INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id, round) "
+                                     "VALUES(?, ?, ?, ?, (SELECT current_round FROM tournament_tracker WHERE id=?));",
+                                     [row[2:] + (row[1], row[1]) for row in rows])
+                for tourney_id in sorted(set(row[1] for row in rows)):
+                    self._bumpVersion(tourney_id)
+                self._db.execute("UPDATE match_log_marks SET applied=? WHERE log_id=? AND applied < ?;",
+                                 (last, log_id, last))
+        return len(rows)
+
+    def getMatchLogMark(self, log_id):
+        row = self._execute("SELECT applied FROM match_log_marks WHERE log_id=?;", (log_id,))
+        return row[0][0] if row else 0
+
+    def importRecords(self, records, tourney_id, max_errors=100):
+        tourney_id = int(tourney_id)
+        with self._lock:
+            with self._atomic():
+                self._db.execute("CREATE TEMP TABLE import_rows (line INTEGER, kind TEXT, name TEXT, "
+                                 "player_one TEXT, player_two TEXT, winner TEXT);")
+                try:
+                    self._db.executemany("INSERT INTO import_rows VALUES(?, ?, ?, ?, ?, ?);", records)
+                    players = self._db.execute("INSERT INTO players (name, tourney_id) "
+                                               "SELECT name, ? FROM import_rows WHERE kind='player' ORDER BY line;",
+                                               (tourney_id,)).rowcount
+                    self._db.execute("CREATE TEMP TABLE import_names AS "
+                                     "SELECT name, min(id) AS id, count(*) AS players FROM players "
+                                     "WHERE tourney_id=? GROUP BY name;", (tourney_id,))
+                    rows = self._db.execute(
+                        "SELECT v.line, v.name, coalesce(n.players, 0) FROM "
+                        "(SELECT line, player_one AS name FROM import_rows WHERE kind='match' "
+                        " UNION ALL SELECT line, player_two FROM import_rows "
+                        " WHERE kind='match' AND player_two IS NOT NULL) AS v "
+                        "LEFT JOIN import_names AS n ON n.name=v.name "
+                        "WHERE coalesce(n.players, 0) != 1 ORDER BY v.line LIMIT ?;", (max_errors,)).fetchall()
+                    errors = [(line, unknownPlayerMessage(name, count, tourney_id)) for (line, name, count) in rows]
+                    matches = self._db.execute(
+                        "INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id, round) "
+                        "SELECT one.id, two.id, winner.id, ?, (SELECT current_round FROM tournament_tracker WHERE id=?) "
+                        "FROM import_rows AS r "
+                        "JOIN import_names AS one ON one.name=r.player_one AND one.players=1 "
+                        "LEFT JOIN import_names AS two ON two.name=r.player_two "
+                        "LEFT JOIN import_names AS winner ON winner.name=r.winner "
+                        "WHERE r.kind='match' AND (r.player_two IS NULL OR two.players=1) "
+                        "ORDER BY r.line;", (tourney_id, tourney_id)).rowcount
+                    total = self._db.execute("SELECT count(*) FROM import_rows WHERE kind='match';").fetchone()[0]
+                    self._bumpVersion(tourney_id)
+                finally:
+                    self._db.execute("DROP TABLE IF EXISTS temp.import_rows;")
+                    self._db.execute("DROP TABLE IF EXISTS temp.import_names;")
+        return players, matches, total - matches, errors
+
+    def getCurrentRound(self, tourney_id):
+        row = self._execute("SELECT current_round FROM tournament_tracker WHERE id=?;", (int(tourney_id),))
+        return row[0][0] if row else None
+
+    def closeRound(self, tourney_id):
+        tourney_id = int(tourney_id)
+        with self._lock:
+            closing = self.getCurrentRound(tourney_id)
+            if closing is None:
+                raise ValueError("Tournament %d does not exist." % tourney_id)
+            players, wins, matches, omw, opponents, had_bye = self._totals(tourney_id)
+            now = time.time()
+            with self._atomic():
+                self._db.executemany("INSERT INTO round_standings (tourney_id, round, player_id, wins, matches, omw) "
+                                     "VALUES(?, ?, ?, ?, ?, ?);",
+                                     [(tourney_id, closing, player_id, wins[player_id], matches[player_id],
+                                       omw[player_id]) for (player_id, _, _) in players])
+                self._db.execute("UPDATE rounds SET closed_at=? WHERE tourney_id=? AND round=?;",
+                                 (now, tourney_id, closing))
+                self._db.execute("INSERT INTO rounds (tourney_id, round, opened_at) VALUES(?, ?, ?);",
+                                 (tourney_id, closing + 1, now))
+                self._db.execute("UPDATE tournament_tracker SET current_round=? WHERE id=?;", (closing + 1, tourney_id))
+        return closing
+
+    def standingsAfterRound(self, tourney_id, round_number):
+        return self._execute("SELECT p.id, p.name, r.wins, r.matches, r.tourney_id, r.omw "
+                             "FROM round_standings AS r JOIN players AS p ON p.id=r.player_id "
+                             "WHERE r.tourney_id=? AND r.round=? "
+                             "ORDER BY r.wins DESC, r.omw DESC, r.player_id;", (int(tourney_id), int(round_number)))
+
+    def swissPairings(self, tourney_id):
+        with self._lock:
+            players, wins, matches, omw, opponents, had_bye = self._totals(tourney_id)
+            order = sorted(players, key=lambda player: (-wins[player[0]], -omw[player[0]], player[0]))
+            pairs, bye = pairRound([PairingPlayer(player_id, name, wins[player_id],
+                                                  frozenset(opponents[player_id]), had_bye[player_id])
+                                    for (player_id, name, _) in order])
+            if bye is not None:
+                self.reportMatch(bye.id, None, bye.id, tourney_id)
+
+        return [(one.id, one.name, two.id, two.name) for (one, two) in pairs]
+
+    def pairAllActiveTournaments(self, processes=None, tourney_ids=None):
+        # an embedded database serves small events; pair them one at a time
+        active = [row[0] for row in self._execute("SELECT id FROM tournament_tracker WHERE active ORDER BY id;")]
+        if tourney_ids is not None:
+            wanted = set(int(tourney_id) for tourney_id in tourney_ids)
+            active = [tourney_id for tourney_id in active if tourney_id in wanted]
+
+        pairings, failures = {}, {}
+        for tourney_id in active:
+            if not self.countPlayersFromTournament(tourney_id):
+                continue
+            try:
+                pairings[tourney_id] = self.swissPairings(tourney_id)
+            except ValueError as e:
+                failures[tourney_id] = str(e)
+        return pairings, failures
+
+    def findByePlayer(self, standings, tourney_id):
+        previous_bye_players = set(row[0] for row in self._execute(
+            "SELECT player_one_id FROM matches WHERE player_two_id IS NULL AND tourney_id=?;", (int(tourney_id),)))
+        for i in range(len(standings) - 1, -1, -1):
+            if standings[i][0] not in previous_bye_players:
+                return i
+        return None
+
+    def resetDatabase(self):
+        with self._lock:
+            with self._atomic():
+                self._db.execute("DELETE FROM matches;")
+                self._db.execute("DELETE FROM round_standings;")
+                self._db.execute("DELETE FROM players;")
+                for (tourney_id,) in self._db.execute("SELECT id FROM tournament_tracker "
+                                                      "WHERE NOT archived;").fetchall():
+                    self._resetRounds(tourney_id)
+                self._bumpVersion()
+                # restart the ids, like the ALTER SEQUENCEs on PostgreSQL
+                self._db.execute("DELETE FROM sqlite_sequence WHERE name IN ('matches', 'players');")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+#
+# subscriptions.py -- pushed standings updates for tournament.py
+#
+# Every change to a tournament's players or matches bumps its version and
+# sends a NOTIFY on tournament.STANDINGS_CHANNEL when it commits.  A
+# StandingsSubscriber LISTENs on that channel and, for each change, reads
+# only the player_stats rows stamped with a newer version than it last saw,
+# so a scoreboard costs the database one small query per change instead of
+# a full standings read per poll.
+#
+# Usage:
+#   with StandingsSubscriber([tourney_id]) as subscriber:
+#       for delta in subscriber:
+#           scoreboard.update(delta)
+#
+
+import json
+import select
+from collections import namedtuple
+from contextlib import closing
+
+import psycopg2
+import psycopg2.extensions
+
+import tournament
+
+# A tournament's rows whose stats changed after one version, up to and
+# including another, in standings order
+CHANGED_ROWS_SQL = ("SELECT p.id, p.name, s.wins, s.matches, s.tourney_id, s.omw "
+                    "FROM player_stats AS s "
+                    "JOIN players AS p ON p.tourney_id=s.tourney_id AND p.id=s.player_id "
+                    "WHERE s.tourney_id=%s AND s.changed_version > %s AND s.changed_version <= %s "
+                    "ORDER BY s.wins DESC, s.omw DESC, s.player_id;")
+
+ALL_ROWS_SQL = "SELECT * FROM standings WHERE tourney_id=%s ORDER BY wins DESC, omw DESC, id;"
+
+# Run first when reading a change: once the version is read, every row
+# stamped with it or an earlier version has committed
+VERSION_SQL = "SELECT version FROM tournament_tracker WHERE id=%s;"
+
+
+class StandingsDelta(namedtuple('StandingsDelta', 'tourney_id version rows reset')):
+    """A change to one tournament's standings.
+
+    Attributes:
+      tourney_id: the tournament that changed
+      version: its version after the change, or None if it no longer exists
+      rows: (id, name, wins, matches, tourney_id, omw) tuples, as
+        playerStandings() returns, for just the players whose rows changed;
+        if `reset` is set, the whole standings instead
+      reset: whether `rows` replaces everything known about the tournament,
+        as when players were removed or the tournament was archived
+    """
+    __slots__ = ()
+
+
+def parseNotification(payload):
+    """Returns the (tourney_id, version, reset) announced by a standings NOTIFY."""
+    message = json.loads(payload)
+    return message['tourney_id'], message['version'], bool(message['reset'])
+
+
+def mergeNotifications(notifications, pending):
+    """Folds (tourney_id, version, reset) tuples into `pending`, a dict of
+    tourney_id -> reset, so each tournament is read once however many
+    changes arrived for it."""
+    for tourney_id, version, reset in notifications:
+        pending[tourney_id] = pending.get(tourney_id, False) or reset or version is None
+
+
+def deltaQuery(tourney_id, version, last, reset):
+    """Decides how to read a change to a tournament.
+
+    Args:
+      tourney_id: the tournament that changed
+      version: its current version, or None if it no longer exists
+      last: the version last delivered for it, or None
+      reset: whether the notifications asked for the whole standings
+
+    Returns:
+      None if nothing changed since `last`, or a tuple of (query, params,
+      reset) where query is None if the delta has no rows
+    """
+    if version is None:
+        return None, (), True
+    if reset or last is None:
+        return ALL_ROWS_SQL, (tourney_id,), True
+    if version == last:
+        return None
+    return CHANGED_ROWS_SQL, (tourney_id, last, version), False
+
+
+class StandingsSubscriber(object):
+    """Pushes standings changes of some or all tournaments as they commit.
+
+    Iterating yields a StandingsDelta per changed tournament, blocking until
+    there is one.  The first delta for each tournament is a reset carrying
+    its whole standings; after that only changed rows are read, unless
+    players were removed.  Needs the PostgreSQL backend.
+
+    Args:
+      tourney_ids: the tournaments to follow, or None for all of them
+      dsn: the libpq connection string for the listening connection
+    """
+
+    def __init__(self, tourney_ids=None, dsn=tournament.DSN):
+        self.tourney_ids = None if tourney_ids is None else set(int(t) for t in tourney_ids)
+        self._versions = {}
+        self._pending = {}
+        # LISTEN holds a session of its own, outside the shared pool
+        self._listener = psycopg2.connect(dsn)
+        self._listener.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        self._listener.cursor().execute("LISTEN %s;" % tournament.STANDINGS_CHANNEL)
+        # start from the whole standings, read after LISTEN so no change is missed
+        for tourney_id in self.tourney_ids or ():
+            self._pending[tourney_id] = True
+
+    def close(self):
+        self._listener.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            for delta in self.poll():
+                yield delta
+
+    def poll(self, timeout=None):
+        """Waits up to `timeout` seconds (forever if None) for changes.
+
+        Returns:
+          A list of StandingsDelta, empty if nothing changed in time
+        """
+        if not self._pending:
+            if select.select([self._listener], [], [], timeout) == ([], [], []):
+                return []
+        self._listener.poll()
+        notifications = []
+        while self._listener.notifies:
+            notification = self._listener.notifies.pop(0)
+            tourney_id, version, reset = parseNotification(notification.payload)
+            if tourney_id is not None and (self.tourney_ids is None or tourney_id in self.tourney_ids):
+                notifications.append((tourney_id, version, reset))
+        mergeNotifications(notifications, self._pending)
+
+        pending, self._pending = self._pending, {}
+        deltas = [self._read(tourney_id, reset) for tourney_id, reset in sorted(pending.items())]
+        return [delta for delta in deltas if delta is not None]
+
+    def _read(self, tourney_id, reset):
+        """Reads one tournament's changes, or returns None if it has none
+        beyond the version already delivered."""
+        with closing(tournament.connect()) as db:
+            cursor = db.cursor()
+            cursor.execute(VERSION_SQL, (tourney_id,))
+            row = cursor.fetchone()
+            version = row[0] if row is not None else None
+            plan = deltaQuery(tourney_id, version, self._versions.get(tourney_id), reset)
+            if plan is None:
+                return None
+            query, params, reset = plan
+            rows = []
+            if query is not None:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+            db.rollback()
+
+        if version is None:
+            self._versions.pop(tourney_id, None)
+        else:
+            self._versions[tourney_id] = version
+        return StandingsDelta(tourney_id, version, rows, reset)
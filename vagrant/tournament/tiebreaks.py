@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+#
+# tiebreaks.py -- vectorized tiebreak computation over a tournament's matches
+#
+# Computes every player's totals and tiebreak scores at once from the
+# tournament's matches held as integer arrays, using NumPy bincount
+# scatter-adds instead of per-player queries.  Requires NumPy.
+#
+
+import numpy as np
+
+# a player whose opponents have won less than this is treated as if they had
+# (the conventional floor on opponent match-win percentage)
+MINIMUM_WIN_PERCENTAGE = 1.0 / 3
+
+# tiebreakers playerStandings() can sort on, highest value first
+TIEBREAKERS = ('wins', 'matches', 'score', 'omw', 'owp', 'buchholz', 'sonneborn_berger')
+
+
+def computeTiebreaks(player_ids, player_one_ids, player_two_ids, winner_ids):
+    """Computes totals and tiebreaks for every player in a tournament.
+
+    A match with no player two is a bye and counts as a win without an
+    opponent; a match with no winner is a draw and scores half a point
+    for each player.
+
+    Args:
+      player_ids: the ids of every player in the tournament
+      player_one_ids: player one's id for each match
+      player_two_ids: player two's id for each match, -1 for a bye
+      winner_ids: the winner's id for each match, -1 for a draw
+
+    Returns:
+      A dict of arrays aligned with player_ids:
+        wins: matches won, byes included
+        matches: matches played, byes included
+        score: wins plus half a point per draw
+        omw: total wins of each distinct opponent
+        owp: mean match-win percentage of distinct opponents, each floored
+          at MINIMUM_WIN_PERCENTAGE
+        buchholz: total score of the opponent in every match played
+        sonneborn_berger: score of each opponent beaten, plus half the score
+          of each opponent drawn
+    """
+    player_ids = np.asarray(player_ids, dtype=np.int64)
+    player_one_ids = np.asarray(player_one_ids, dtype=np.int64)
+    player_two_ids = np.asarray(player_two_ids, dtype=np.int64)
+    winner_ids = np.asarray(winner_ids, dtype=np.int64)
+    n = len(player_ids)
+
+    # map player ids to positions in player_ids by binary search; ids come
+    # from one sequence shared by every tournament, so a dense lookup table
+    # could span far more ids than the tournament has players
+    order = np.argsort(player_ids, kind='mergesort')
+    sorted_ids = player_ids[order]
+
+    def positions(ids):
+        return order[np.searchsorted(sorted_ids, ids)]
+
+    one = positions(player_one_ids)
+    played = player_two_ids >= 0
+    decided = winner_ids >= 0
+
+    wins = np.bincount(positions(winner_ids[decided]), minlength=n)
+
+    # only real matches from here on; byes have no opponent
+    one, two = one[played], positions(player_two_ids[played])
+    matches = np.bincount(one, minlength=n) + np.bincount(two, minlength=n)
+    matches += np.bincount(positions(player_one_ids[~played]), minlength=n)
+
+    drawn = ~decided[played]
+    draws = np.bincount(one[drawn], minlength=n) + np.bincount(two[drawn], minlength=n)
+    score = wins + 0.5 * draws
+
+    # each player's result in each match: 1 for a win, 0.5 for a draw, 0 for a loss
+    winners = winner_ids[played]
+    one_result = np.where(winners == player_one_ids[played], 1.0, np.where(drawn, 0.5, 0.0))
+    two_result = np.where(winners == player_two_ids[played], 1.0, np.where(drawn, 0.5, 0.0))
+
+    buchholz = (np.bincount(one, weights=score[two], minlength=n) +
+                np.bincount(two, weights=score[one], minlength=n))
+    sonneborn_berger = (np.bincount(one, weights=one_result * score[two], minlength=n) +
+                        np.bincount(two, weights=two_result * score[one], minlength=n))
+
+    # distinct opponent pairs, encoded as low * n + high
+    pairs = np.unique(np.minimum(one, two) * n + np.maximum(one, two))
+    low, high = pairs // n, pairs % n
+    omw = (np.bincount(low, weights=wins[high], minlength=n) +
+           np.bincount(high, weights=wins[low], minlength=n)).astype(np.int64)
+
+    win_percentage = np.maximum(wins / np.maximum(matches, 1).astype(float), MINIMUM_WIN_PERCENTAGE)
+    opponents = np.bincount(low, minlength=n) + np.bincount(high, minlength=n)
+    opponent_percentage = (np.bincount(low, weights=win_percentage[high], minlength=n) +
+                           np.bincount(high, weights=win_percentage[low], minlength=n))
+    owp = opponent_percentage / np.maximum(opponents, 1)
+
+    return {
+        'wins': wins,
+        'matches': matches,
+        'score': score,
+        'omw': omw,
+        'owp': owp,
+        'buchholz': buchholz,
+        'sonneborn_berger': sonneborn_berger,
+    }
+
+
+def rankPlayers(player_ids, tiebreaks, order=('wins', 'omw')):
+    """Sorts players on a chain of tiebreakers, highest first.
+
+    Players still tied after the whole chain are ordered by id.
+
+    Args:
+      player_ids: the ids the tiebreak arrays are aligned with
+      tiebreaks: the dict returned by computeTiebreaks()
+      order: the names of the tiebreakers to sort on, most significant first
+
+    Returns:
+      An array of positions into player_ids, first place first
+    """
+    for name in order:
+        if name not in TIEBREAKERS:
+            raise ValueError("Unknown tiebreaker %r; expected one of %s." % (name, ", ".join(TIEBREAKERS)))
+    # np.lexsort sorts on its last key first
+    keys = [np.asarray(player_ids)] + [-tiebreaks[name] for name in reversed(order)]
+    return np.lexsort(keys)
+
+
+def rankStandings(players, matches, order):
+    """Builds standings rows ranked on a chain of tiebreakers.
+
+    Args:
+      players: (id, name, tourney_id) rows for every player in the tournament
+      matches: (player_one_id, player_two_id, winner_id) rows, with -1 for
+        a missing player two or winner
+      order: the names of the tiebreakers to sort on, most significant first
+
+    Returns:
+      A list of (id, name, wins, matches, tourney_id, omw) tuples, first place first
+    """
+    player_ids = [player[0] for player in players]
+    columns = list(zip(*matches)) or [(), (), ()]
+    totals = computeTiebreaks(player_ids, *columns)
+    ranking = rankPlayers(player_ids, totals, order)
+
+    wins, played, omw = totals['wins'], totals['matches'], totals['omw']
+    return [(players[i][0], players[i][1], int(wins[i]), int(played[i]), players[i][2], int(omw[i]))
+            for i in ranking]
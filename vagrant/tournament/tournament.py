@@ -4,29 +4,302 @@
 # Extra Credit Exercises
 #
 
-import psycopg2
-from contextlib import closing
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import closing, contextmanager
+from functools import wraps
+from itertools import groupby
+
+import instrumentation
+from cache import VersionedLRUCache
+from instrumentation import instrumented
+from pairing import PairingPlayer, pairRound
+from pool import ConnectionPool
+
+DSN = "dbname=tournament_ec"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_standings_cache = VersionedLRUCache()
+
+_backend = None
+
+_session = threading.local()
+
+
+def useBackend(backend):
+    """Routes every public function in this module to another storage backend.
+
+    Args:
+      backend: a backend.Backend, such as sqlite_backend.SQLiteBackend(), or
+        None to go back to the PostgreSQL database at DSN
+
+    Returns:
+      The backend that was in use before, or None for PostgreSQL
+    """
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+def pluggable(function):
+    """Sends calls to the backend set with useBackend(), if there is one.
+
+    Without one the decorated function's own PostgreSQL implementation runs.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        backend = _backend
+        if backend is None:
+            return function(*args, **kwargs)
+        return getattr(backend, function.__name__)(*args, **kwargs)
+    return wrapper
+
+
+def configurePool(minconn=1, maxconn=10, dsn=DSN, **kwargs):
+    """Replaces the shared connection pool used by every function in this module.
+
+    Args:
+      minconn: connections opened up front and kept alive
+      maxconn: upper bound on open connections; callers block beyond it
+      dsn: the libpq connection string
+      kwargs: passed through to ConnectionPool (timeout, health_check_interval)
+    """
+    global _pool
+    new_pool = ConnectionPool(dsn, minconn=minconn, maxconn=maxconn, **kwargs)
+    with _pool_lock:
+        old_pool, _pool = _pool, new_pool
+    if old_pool is not None:
+        old_pool.closeall()
+
+
+def poolStats():
+    """Returns the shared pool's hit, miss, wait and discard counters."""
+    if _pool is None:
+        return {'hits': 0, 'misses': 0, 'waits': 0, 'discarded': 0, 'size': 0, 'idle': 0}
+    return _pool.stats()
 
 
 def connect():
-    """Connect to the PostgreSQL database.  Returns a database connection."""
-    return psycopg2.connect("dbname=tournament_ec")
+    """Connect to the PostgreSQL database.  Returns a database connection.
+
+    The connection is checked out of a shared pool; closing it returns it to
+    the pool rather than disconnecting.  While instrumentation hooks are
+    registered it also reports its checkout and statements; see
+    instrumentation.py.  Inside transaction() every call returns the
+    transaction's connection instead.
+    """
+    session = getattr(_session, 'connection', None)
+    if session is not None:
+        return session
+
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DSN)
+    if instrumentation.enabled():
+        return instrumentation.instrumentConnect(_pool.getconn)
+    return _pool.getconn()
+
+
+class _SessionConnection(object):
+    """The connection connect() returns inside transaction().
+
+    Functions close, commit and roll back their connection as usual; here
+    those calls do nothing, and the transaction ends with the block.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def inTransaction():
+    """Returns whether this thread is inside a transaction() block."""
+    return getattr(_session, 'callbacks', None) is not None
+
+
+@contextmanager
+def transaction():
+    """Runs every function called in the block on one connection, in one transaction.
+
+    The transaction is committed when the block ends and rolled back if it
+    raises.  Blocks nest; only the outermost one commits.  Other threads
+    are unaffected.  With another backend in use (see useBackend()) the
+    block runs in that backend's transaction() instead.
+
+    Usage:
+      with transaction():
+          reportMatches(results, tourney_id)
+          closeRound(tourney_id)
 
+    Raises:
+      NotImplementedError: if the backend in use cannot run a transaction
+    """
+    if inTransaction():
+        yield
+        return
+
+    _session.callbacks = []
+    try:
+        try:
+            with (_backend.transaction() if _backend is not None else _connectionTransaction()):
+                yield
+        except BaseException:
+            for _, on_rollback in _session.callbacks:
+                if on_rollback is not None:
+                    on_rollback()
+            raise
+        callbacks = _session.callbacks
+    finally:
+        _session.callbacks = None
+    for on_commit, _ in callbacks:
+        on_commit()
+
+
+@contextmanager
+def _connectionTransaction():
+    """Holds one PostgreSQL connection and transaction for a transaction() block."""
+    db = connect()
+    _session.connection = _SessionConnection(db)
+    try:
+        try:
+            yield
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+    finally:
+        _session.connection = None
+        db.close()
+
+
+def afterCommit(on_commit, on_rollback=None):
+    """Calls `on_commit` once the work done so far is committed.
+
+    Inside transaction() that is when the block commits, and `on_rollback`
+    is called instead if it rolls back; outside one, each function commits
+    its own work before calling this, so `on_commit` is called right away.
+    """
+    if inTransaction():
+        _session.callbacks.append((on_commit, on_rollback))
+    else:
+        on_commit()
+
+
+def configureStandingsCache(maxsize=128):
+    """Replaces the standings cache with an empty one holding up to maxsize tournaments."""
+    global _standings_cache
+    _standings_cache = VersionedLRUCache(maxsize)
+
+
+def standingsCacheStats():
+    """Returns the standings cache's hit, miss and eviction counters."""
+    return _standings_cache.stats()
+
+
+# Every version bump is announced with a NOTIFY on this channel, delivered
+# when the transaction commits; see subscriptions.py.  The payload is a JSON
+# object of the tournament's id, its new version, and whether subscribers
+# must reread the whole standings rather than the rows changed since their
+# last version.
+STANDINGS_CHANNEL = 'standings'
+
+_BUMP_SQL = ("WITH bumped AS (UPDATE tournament_tracker SET version=version + 1%s RETURNING id, version) "
+             "SELECT pg_notify('" + STANDINGS_CHANNEL + "', "
+             "json_build_object('tourney_id', id, 'version', version, 'reset', %%s)::text) FROM bumped;")
+BUMP_ALL_SQL = _BUMP_SQL % ""
+BUMP_ONE_SQL = _BUMP_SQL % " WHERE id=(%s)"
+BUMP_MANY_SQL = _BUMP_SQL % " WHERE id=ANY(%s)"
+
+
+def bumpVersion(cursor, tourney_id=None, reset=False):
+    """Marks a tournament's standings as changed, within the caller's transaction.
+
+    Every function that changes players or matches calls this, so that cached
+    standings in any process are recognised as out of date, and standings
+    subscribers are notified.  It is called before the change is made: that
+    locks the tournament's tracker row for the rest of the transaction, and
+    the player_stats rows the change touches are stamped with the new version.
+
+    Args:
+      cursor: a cursor on the connection making the change
+      tourney_id: the tournament that changed, or None for all of them
+      reset: whether players were removed, so that subscribers must reread
+        the whole standings
+    """
+    if tourney_id is None:
+        cursor.execute(BUMP_ALL_SQL, (reset,))
+    else:
+        cursor.execute(BUMP_ONE_SQL, (str(tourney_id), reset))
 
+
+def notifyDropped(cursor, tourney_id):
+    """Tells standings subscribers that a tournament no longer exists."""
+    cursor.execute("SELECT pg_notify(%s, json_build_object('tourney_id', %s::int, 'version', NULL, "
+                   "'reset', true)::text);", (STANDINGS_CHANNEL, int(tourney_id)))
+
+
+# Creating, detaching or dropping a tournament's partitions locks the shared
+# parent tables one after another, in different orders; transactions doing
+# so at once would deadlock on them, so they take this lock first and go one
+# at a time.  Those locks also stall every other tournament's reads and
+# writes until the transaction ends.
+PARTITIONS_LOCK_SQL = "SELECT pg_advisory_xact_lock(%d);" % 0x746f75726e
+
+
+@instrumented
+@pluggable
 def createNewTournament():
-    """Creates a new tournament whose id is automatically incremented with each call"""
+    """Creates a new tournament whose id is drawn from the tournament_tracker sequence
+
+    Concurrent callers each get a distinct id, but take turns: creating a
+    tournament creates its partitions, which locks the shared parent tables
+    until the transaction ends.
+
+    Returns:
+        The new tournament's id
+    """
     with closing(connect()) as db:
         cursor = db.cursor()
-        current = getCurrentTournamentId()
-        # if no tourneys have been registered yet
-        if current is None:
-            current = 1
-        else:
-            current += 1
-        cursor.execute("INSERT INTO tournament_tracker (id) VALUES(%s);", (str(current),))
+        cursor.execute(PARTITIONS_LOCK_SQL)
+        cursor.execute("INSERT INTO tournament_tracker DEFAULT VALUES RETURNING id;")
+        tourney_id = cursor.fetchone()[0]
         db.commit()
 
+    return tourney_id
+
 
+@instrumented
+@pluggable
+def closeTournament(tourney_id):
+    """Marks a tournament as finished, so pairAllActiveTournaments() skips it
+    and compactTournaments() may archive it."""
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute("UPDATE tournament_tracker SET active=FALSE, closed_at=coalesce(closed_at, now()) "
+                       "WHERE id=(%s);", (str(tourney_id),))
+        db.commit()
+
+
+@instrumented
+@pluggable
 def getCurrentTournamentId():
     """Finds the current tournament
 
@@ -41,38 +314,174 @@ def getCurrentTournamentId():
     return current_tourney
 
 
+@instrumented
+@pluggable
 def deleteAllMatches():
     """Remove all the match records from the database."""
     with closing(connect()) as db:
         cursor = db.cursor()
-        cursor.execute("DELETE FROM matches;")
+        bumpVersion(cursor)
+        # TRUNCATE skips the per-row player_stats triggers, so reset the totals directly
+        cursor.execute("TRUNCATE matches, round_standings;")
+        cursor.execute("UPDATE player_stats SET wins=0, matches=0, omw=0;")
+        cursor.execute("SELECT reset_rounds(id) FROM tournament_tracker WHERE NOT archived;")
         db.commit()
 
 
+@instrumented
+@pluggable
 def deleteMatchesFromTournament(tourney_id):
-    """Remove all the match records from the database for the current tournament."""
+    """Remove all the match records from the database for the current tournament.
+
+    The tournament's matches partition is truncated rather than deleted
+    from row by row, and its rounds start again from round 1.
+    """
     with closing(connect()) as db:
         cursor = db.cursor()
-        cursor.execute("DELETE FROM matches WHERE tourney_id=(%s);", (str(tourney_id),))
+        bumpVersion(cursor, tourney_id)
+        cursor.execute("SELECT clear_tournament_matches(%s);", (int(tourney_id),))
         db.commit()
 
 
+@instrumented
+@pluggable
+def dropTournament(tourney_id):
+    """Removes a tournament with all of its players and matches.
+
+    Takes the same time however large the tournament is, as its partitions
+    are dropped whole.  Dropping them locks the shared parent tables, so
+    every other tournament's reads and writes wait until this commits.
+    """
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute(PARTITIONS_LOCK_SQL)
+        cursor.execute("SELECT drop_tournament(%s);", (int(tourney_id),))
+        notifyDropped(cursor, tourney_id)
+        db.commit()
+
+
+@instrumented
+@pluggable
+def archiveTournament(tourney_id, export_path=None):
+    """Moves a finished tournament out of the live tables.
+
+    Its final standings are frozen into archived_standings, where
+    playerStandings(), iterStandings() and standingsPage() go on finding
+    them, and its partitions of players, player_stats and matches are
+    dropped.  The raw matches are kept in matches_archive or, if
+    `export_path` is given, written to that file as CSV instead.  The
+    tournament is closed if it was not already; archiving it again does
+    nothing.
+
+    An archived tournament's standings can no longer be ranked on other
+    tiebreakers, which need its matches.  Dropping the partitions locks the
+    shared parent tables, so every other tournament's reads and writes wait
+    until this commits.
+
+    Args:
+      tourney_id: the id number of the tournament
+      export_path: optionally, a file to write the tournament's matches to;
+        it only appears once the archive is committed
+    """
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute(PARTITIONS_LOCK_SQL)
+        # lock the tournament so that concurrent archivers take turns
+        cursor.execute("SELECT archived FROM tournament_tracker WHERE id=(%s) FOR UPDATE;", (int(tourney_id),))
+        row = cursor.fetchone()
+        if row is None or row[0]:
+            # nothing was changed; whoever owns the transaction ends it
+            return
+
+        staging = None
+        try:
+            if export_path is not None:
+                staging = stagingPath(export_path)
+                with open(staging, 'w') as export:
+                    cursor.copy_expert("COPY (SELECT id, player_one_id, player_two_id, winner_id, tourney_id, "
+                                       "round FROM matches WHERE tourney_id=%d ORDER BY id) TO STDOUT WITH CSV HEADER"
+                                       % int(tourney_id), export)
+            bumpVersion(cursor, tourney_id, reset=True)
+            cursor.execute("SELECT archive_tournament(%s, %s);", (int(tourney_id), export_path is None))
+            db.commit()
+        except BaseException:
+            if staging is not None:
+                os.remove(staging)
+            raise
+
+    if staging is not None:
+        afterCommit(lambda: os.rename(staging, export_path), lambda: os.remove(staging))
+
+
+@instrumented
+@pluggable
+def compactTournaments(older_than=0, export_dir=None):
+    """Archives every tournament closed at least `older_than` seconds ago.
+
+    Each one is archived by archiveTournament() in a transaction of its own,
+    so a failure leaves those archived before it archived.
+
+    Args:
+      older_than: how many seconds a closed tournament stays in the live tables
+      export_dir: optionally, a directory to export each tournament's
+        matches to, as matches_<id>.csv, instead of matches_archive
+
+    Returns:
+      The ids of the tournaments archived, in id order
+    """
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT id FROM tournament_tracker "
+                       "WHERE NOT active AND NOT archived AND closed_at <= now() - make_interval(secs => %s) "
+                       "ORDER BY id;", (older_than,))
+        tourney_ids = [row[0] for row in cursor.fetchall()]
+
+    for tourney_id in tourney_ids:
+        archiveTournament(tourney_id, exportPath(export_dir, tourney_id))
+    return tourney_ids
+
+
+def stagingPath(export_path):
+    """Creates an empty file beside `export_path` for an export to be written
+    to, and renamed into place once it is committed, and returns its path."""
+    directory, name = os.path.split(os.path.abspath(export_path))
+    fd, path = tempfile.mkstemp(prefix='.%s.' % name, suffix='.tmp', dir=directory)
+    os.close(fd)
+    return path
+
+
+def exportPath(export_dir, tourney_id):
+    """Returns the file compactTournaments() exports a tournament's matches
+    to, or None if `export_dir` is None."""
+    if export_dir is None:
+        return None
+    return os.path.join(export_dir, "matches_%d.csv" % int(tourney_id))
+
+
+@instrumented
+@pluggable
 def deleteAllPlayers():
     """Remove all the player records from the database."""
     with closing(connect()) as db:
         cursor = db.cursor()
+        bumpVersion(cursor, reset=True)
         cursor.execute("DELETE FROM players;")
         db.commit()
 
 
+@instrumented
+@pluggable
 def deletePlayersFromTournament(tourney_id):
     """Remove all the player records from the database for the current tournament."""
     with closing(connect()) as db:
         cursor = db.cursor()
+        bumpVersion(cursor, tourney_id, reset=True)
         cursor.execute("DELETE FROM players WHERE tourney_id=(%s);", (str(tourney_id),))
         db.commit()
 
 
+@instrumented
+@pluggable
 def countTotalPlayers():
     """Returns the number of players currently registered."""
     with closing(connect()) as db:
@@ -83,6 +492,8 @@ def countTotalPlayers():
     return players
 
 
+@instrumented
+@pluggable
 def countPlayersFromTournament(tourney_id):
     """Returns the number of players currently registered for the current tournament."""
     with closing(connect()) as db:
@@ -93,6 +504,8 @@ def countPlayersFromTournament(tourney_id):
     return players
 
 
+@instrumented
+@pluggable
 def registerPlayer(name, tourney_id):
     """Adds a player to the tournament database.
   
@@ -102,46 +515,96 @@ def registerPlayer(name, tourney_id):
     Args:
       name: the player's full name (need not be unique).
       tourney_id: the tourney_id of tournament to register the player in
+
+    Returns:
+      The id assigned to the player
     """
     with closing(connect()) as db:
         cursor = db.cursor()
-        cursor.execute("INSERT INTO players (name, tourney_id) VALUES(%s, %s);", (name, str(tourney_id)))
+        bumpVersion(cursor, tourney_id)
+        cursor.execute("INSERT INTO players (name, tourney_id) VALUES(%s, %s) RETURNING id;",
+                       (name, str(tourney_id)))
+        player_id = cursor.fetchone()[0]
         db.commit()
 
+    return player_id
+
 
-def findPlayerOMW(player_id, tourney_id, cursor):
+@instrumented
+@pluggable
+def registerPlayers(names, tourney_id):
+    """Adds a whole roster of players to the tournament database at once.
 
-    opponent_match_wins = 0
+    All players are inserted by a single statement in one transaction, so
+    registering thousands of players costs one round trip.
 
-    # First group of opponents
-    cursor.execute(""
-                   "SELECT player_one_id FROM matches "
-                   "WHERE player_two_id=(%s) AND tourney_id=(%s) "
-                   "AND winner_id IS NOT NULL;", (str(player_id), str(tourney_id)))
-    opponents = cursor.fetchall()
+    Args:
+      names: an iterable of the players' full names
+      tourney_id: the tourney_id of tournament to register the players in
+
+    Returns:
+      The ids assigned to the players, in the same order as `names`
+    """
+    names = list(names)
+    if not names:
+        return []
 
-    # Second group of opponents
-    cursor.execute(""
-                   "SELECT player_two_id FROM matches "
-                   "WHERE player_one_id=(%s) AND tourney_id=(%s) "
-                   "AND winner_id IS NOT NULL;", (str(player_id), str(tourney_id)))
-    opponents.append(cursor.fetchall())
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        bumpVersion(cursor, tourney_id)
+        # neither RETURNING nor nextval() follows array order, so each name's
+        # id is drawn alongside its position and read back in that order
+        cursor.execute("WITH roster AS MATERIALIZED ("
+                       "  SELECT nextval('players_id_seq') AS id, name, position "
+                       "  FROM unnest(%s::text[]) WITH ORDINALITY AS n(name, position)"
+                       "), inserted AS ("
+                       "  INSERT INTO players (id, name, tourney_id) SELECT id, name, %s FROM roster RETURNING id"
+                       ") SELECT roster.id FROM roster JOIN inserted USING (id) ORDER BY roster.position;",
+                       (names, str(tourney_id)))
+        ids = [row[0] for row in cursor.fetchall()]
+        db.commit()
 
-    for opponent in opponents:
-        cursor.execute(""
-                       "SELECT wins FROM standings "
-                       "WHERE id=(%s);", (str(opponent[0]),))
-    opponent_match_wins += cursor.fetchall()[0]
+    return ids
 
-    return opponent_match_wins
 
+@instrumented
+@pluggable
+def findPlayerOMW(player_id, tourney_id, cursor=None):
+    """Returns the total wins of every distinct opponent of a player.
 
-def playerStandings(tourney_id):
+    The total is kept up to date in player_stats as results are reported.
+    Runs on `cursor` when one is given, and on a connection of its own
+    otherwise.
+    """
+    db = None
+    if cursor is None:
+        db = connect()
+        cursor = db.cursor()
+    try:
+        cursor.execute("SELECT omw FROM player_stats WHERE player_id=(%s) AND tourney_id=(%s);",
+                       (str(player_id), str(tourney_id)))
+        row = cursor.fetchone()
+    finally:
+        if db is not None:
+            db.close()
+    return row[0] if row is not None else 0
+
+
+@instrumented
+@pluggable
+def playerStandings(tourney_id, tiebreakers=None):
     """Returns a list of the players and their win records, sorted by wins and
     opponent match wins.
 
     The first entry in the list should be the player in first place.
 
+    Args:
+      tourney_id: the id number of the tournament
+      tiebreakers: optionally, a sequence of names from tiebreaks.TIEBREAKERS
+        to sort on instead, most significant first; for example
+        ('wins', 'buchholz', 'sonneborn_berger').  Players still tied are
+        ordered by id.  Requires NumPy.
+
     Returns:
       A list of tuples, each of which contains (id, name, wins, matches, tourney_id, omw):
         id: the player's unique id (assigned by the database)
@@ -150,15 +613,209 @@ def playerStandings(tourney_id):
         matches: the number of matches the player has played
         tourney_id: the tournament id associated with this player
         omw: Opponent Match Wins: the number of total wins opponents of this player have
+
+    Results are cached per tournament and reused for as long as the
+    tournament's version in tournament_tracker is unchanged.
     """
+    key = str(tourney_id)
+    if tiebreakers is not None:
+        tiebreakers = tuple(tiebreakers)
+        cache_key = (key,) + tiebreakers
+    else:
+        cache_key = key
+
     with closing(connect()) as db:
         cursor = db.cursor()
-        cursor.execute("SELECT * FROM standings WHERE tourney_id=(%s) ORDER BY wins DESC, omw DESC ;", (str(tourney_id),))
-        standings = cursor.fetchall()
+        cursor.execute("SELECT version FROM tournament_tracker WHERE id=(%s);", (key,))
+        row = cursor.fetchone()
+        version = row[0] if row is not None else None
+        if version is not None:
+            standings = _standings_cache.get(cache_key, version)
+            if standings is not None:
+                return list(standings)
 
+        if tiebreakers is None:
+            cursor.execute("SELECT * FROM standings WHERE tourney_id=(%s) "
+                           "ORDER BY wins DESC, omw DESC, id;", (key,))
+            standings = cursor.fetchall()
+        else:
+            standings = _rankedStandings(cursor, tourney_id, tiebreakers)
+
+    # standings read inside a transaction may yet be rolled back, so are not cached
+    if version is not None and not inTransaction():
+        _standings_cache.put(cache_key, version, tuple(standings))
     return standings
 
 
+# Pages and streams of standings read player_stats in the order of its
+# standings index, looking up each row's name by primary key, so that they
+# never sort or hash the whole tournament; the lookup is a subquery rather
+# than a join so that the plan holds before the tournament's statistics are
+# gathered, naming the tournament so that it is planned for that tournament's
+# partition alone.  Archived tournaments are read from archived_standings, whose
+# index has the same order.  A tournament is only ever in one of the two.
+LIVE_STANDINGS_SQL = ("SELECT s.player_id, (SELECT p.name FROM players AS p "
+                      "WHERE p.tourney_id=%(tourney)s AND p.id=s.player_id), "
+                      "s.wins, s.matches, s.tourney_id, s.omw FROM player_stats AS s WHERE s.tourney_id=%(tourney)s")
+ARCHIVED_STANDINGS_SQL = ("SELECT s.player_id, s.name, s.wins, s.matches, s.tourney_id, s.omw "
+                          "FROM archived_standings AS s WHERE s.tourney_id=%(tourney)s")
+STANDINGS_ORDER_SQL = " ORDER BY s.wins DESC, s.omw DESC, s.player_id"
+
+
+def standingsQuery(source, tourney_id, limit=None, offset=None, after_key=None):
+    """Builds a query for standings in rank order from LIVE_STANDINGS_SQL or
+    ARCHIVED_STANDINGS_SQL.
+
+    Each part of the query is an index scan of the standings in order,
+    stopped after `limit` rows when given.
+
+    Returns:
+      A tuple of (query, params)
+    """
+    params = {'tourney': int(tourney_id), 'limit': limit, 'offset': offset}
+    if after_key is None:
+        query = source + STANDINGS_ORDER_SQL
+    else:
+        params['wins'], params['omw'], params['player_id'] = after_key
+        # (wins, omw) descend and player_id ascends, so the rows after the key
+        # are not one range of the index but three, merged in rank order
+        ranges = [" AND s.wins=%(wins)s AND s.omw=%(omw)s AND s.player_id>%(player_id)s",
+                  " AND s.wins=%(wins)s AND s.omw<%(omw)s",
+                  " AND s.wins<%(wins)s"]
+        parts = []
+        for condition in ranges:
+            part = source + condition + STANDINGS_ORDER_SQL
+            if limit is not None:
+                part += " LIMIT %(limit)s"
+            parts.append("(" + part + ")")
+        query = " UNION ALL ".join(parts) + " ORDER BY 3 DESC, 6 DESC, 1"
+    if limit is not None:
+        query += " LIMIT %(limit)s"
+    if offset is not None:
+        query += " OFFSET %(offset)s"
+    return query + ";", params
+
+
+@instrumented
+@pluggable
+def iterStandings(tourney_id, batch_size=1000):
+    """Yields the standings one row at a time, first place first.
+
+    Rows are streamed from a server-side cursor `batch_size` at a time, so
+    memory use and the time to the first row do not grow with the size of
+    the tournament.  The connection is held until the iteration finishes or
+    the generator is closed.
+
+    Yields:
+      (id, name, wins, matches, tourney_id, omw) tuples, as playerStandings()
+    """
+    with closing(connect()) as db:
+        for source in (LIVE_STANDINGS_SQL, ARCHIVED_STANDINGS_SQL):
+            # named uniquely, as streams opened inside one transaction() share a connection
+            cursor = db.cursor(name='standings_stream_%s' % uuid.uuid4().hex)
+            cursor.itersize = batch_size
+            found = False
+            try:
+                cursor.execute(*standingsQuery(source, tourney_id))
+                for row in cursor:
+                    found = True
+                    yield row
+            finally:
+                cursor.close()
+            if found:
+                return
+
+
+@instrumented
+@pluggable
+def standingsPage(tourney_id, limit=50, offset=None, after_key=None):
+    """Returns one page of the standings, first place first.
+
+    Pages are best fetched by key: pass the standingsKey() of the last row of
+    the previous page as `after_key`, and the page is read straight from the
+    standings index however deep it is.  `offset` skips rows instead, which
+    costs time in proportion to the offset.
+
+    Args:
+      tourney_id: the id number of the tournament
+      limit: the most rows to return
+      offset: the number of rows to skip
+      after_key: a (wins, omw, id) tuple; only rows ranked below it are returned
+
+    Returns:
+      A list of (id, name, wins, matches, tourney_id, omw) tuples, as playerStandings()
+
+    Raises:
+      ValueError: if both `offset` and `after_key` are given
+    """
+    if offset is not None and after_key is not None:
+        raise ValueError("Pass either offset or after_key, not both.")
+
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        for source in (LIVE_STANDINGS_SQL, ARCHIVED_STANDINGS_SQL):
+            cursor.execute(*standingsQuery(source, tourney_id, limit, offset, after_key))
+            rows = cursor.fetchall()
+            if rows:
+                break
+        return rows
+
+
+def standingsKey(row):
+    """Returns the key standingsPage() takes as `after_key` for a standings row."""
+    return row[2], row[5], row[0]
+
+
+def topK(tourney_id, k):
+    """Returns the first `k` rows of the standings, read from the standings index."""
+    return standingsPage(tourney_id, limit=k)
+
+
+def _rankedStandings(cursor, tourney_id, tiebreakers):
+    """Computes standings sorted on a chain of tiebreakers from one read of
+    the tournament's players and matches."""
+    import tiebreaks
+
+    cursor.execute("SELECT id, name, tourney_id FROM players WHERE tourney_id=(%s) ORDER BY id;",
+                   (str(tourney_id),))
+    players = cursor.fetchall()
+    # byes and draws come back as -1 so every column stays an integer array
+    cursor.execute("SELECT player_one_id, coalesce(player_two_id, -1), coalesce(winner_id, -1) "
+                   "FROM matches WHERE tourney_id=(%s);", (str(tourney_id),))
+    return tiebreaks.rankStandings(players, cursor.fetchall(), tiebreakers)
+
+
+def normalizeMatch(player_one_id, player_two_id, winner_id):
+    """Validates the outcome of a match and puts byes into their stored form.
+
+    A bye may be given with either player id as None; it is stored with the
+    player as player one and as the winner.
+
+    Returns:
+      A (player_one_id, player_two_id, winner_id) tuple ready to insert
+
+    Raises:
+      ValueError: if the match has no players, a player plays themselves or
+        the winner did not play in the match
+    """
+    # Match is a bye, enter player as player one
+    if player_one_id is None:
+        player_one_id = player_two_id
+        player_two_id = None
+    if player_one_id is None:
+        raise ValueError("A match needs at least one player.")
+    if player_two_id is None:
+        winner_id = player_one_id
+    if player_one_id == player_two_id:
+        raise ValueError("Player %s cannot play against themselves." % player_one_id)
+    if winner_id not in (player_one_id, player_two_id, None):
+        raise ValueError("Winner %s did not play in match %s vs. %s." % (winner_id, player_one_id, player_two_id))
+
+    return player_one_id, player_two_id, winner_id
+
+
+@instrumented
+@pluggable
 def reportMatch(player_one_id, player_two_id, winner_id, tourney_id):
     """Records the outcome of a single match between two players.
 
@@ -170,29 +827,307 @@ def reportMatch(player_one_id, player_two_id, winner_id, tourney_id):
       winner_id: the id number of the player who won
       tourney_id: the id number of the tournament
     """
-    # Match is a bye, enter player as player one
-    if player_one_id is None:
-        player_one_id = player_two_id
-        player_two_id = None
-        winner_id = player_one_id
+    player_one_id, player_two_id, winner_id = normalizeMatch(player_one_id, player_two_id, winner_id)
 
     with closing(connect()) as db:
         cursor = db.cursor()
+        # locking the tournament first also keeps closeRound() from closing the round under this result
+        bumpVersion(cursor, tourney_id)
         cursor.execute(
             "INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id) VALUES(%s, %s, %s, %s);", (player_one_id, player_two_id, winner_id, str(tourney_id),))
         db.commit()
 
 
+@instrumented
+@pluggable
+def reportMatches(results, tourney_id):
+    """Records the outcomes of a whole round of matches in one transaction.
+
+    Every result is validated before anything is written, so either the
+    whole round is recorded or none of it is.
+
+    Args:
+      results: an iterable of (player_one_id, player_two_id, winner_id)
+        tuples, following the same conventions as reportMatch() for byes
+        and draws
+      tourney_id: the id number of the tournament
+
+    Raises:
+      ValueError: if any result is malformed
+    """
+    rows = []
+    for result in results:
+        if len(result) != 3:
+            raise ValueError("Expected (player_one_id, player_two_id, winner_id), got %r." % (result,))
+        rows.append(normalizeMatch(*result))
+    if not rows:
+        return
+
+    player_one_ids, player_two_ids, winner_ids = [list(column) for column in zip(*rows)]
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        bumpVersion(cursor, tourney_id)
+        cursor.execute(
+            "INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id) "
+            "SELECT one, two, winner, %s FROM unnest(%s::int[], %s::int[], %s::int[]) AS m(one, two, winner);",
+            (str(tourney_id), player_one_ids, player_two_ids, winner_ids))
+        db.commit()
+
+
+@instrumented
+@pluggable
+def reportLoggedMatches(log_id, entries, through=None):
+    """Records results from a match log, skipping any it already recorded.
+
+    The results and the log's mark, the last entry recorded, are written in
+    one transaction, so replaying a log after a crash records each result
+    exactly once.  Entries may belong to any number of tournaments.
+
+    Args:
+      log_id: the id of the match log the entries come from
+      entries: an iterable of (seq, tourney_id, player_one_id, player_two_id,
+        winner_id) tuples in increasing seq order, following the same
+        conventions as reportMatch() for byes and draws
+      through: optionally, a seq to move the mark to even if no entry has
+        it, so that the entries up to it are skipped
+
+    Returns:
+      The number of results recorded
+
+    Raises:
+      ValueError: if any result is malformed
+    """
+    rows = []
+    for entry in entries:
+        if len(entry) != 5:
+            raise ValueError("Expected (seq, tourney_id, player_one_id, player_two_id, winner_id), got %r." % (entry,))
+        rows.append((int(entry[0]), int(entry[1])) + normalizeMatch(*entry[2:]))
+    last = max([through or 0] + [row[0] for row in rows])
+
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute("INSERT INTO match_log_marks (log_id) VALUES(%s) ON CONFLICT DO NOTHING;", (log_id,))
+        cursor.execute("SELECT applied FROM match_log_marks WHERE log_id=%s FOR UPDATE;", (log_id,))
+        applied = cursor.fetchone()[0]
+        rows = [row for row in rows if row[0] > applied]
+        if rows:
+            _, tourney_ids, player_one_ids, player_two_ids, winner_ids = [list(column) for column in zip(*rows)]
+            cursor.execute(BUMP_MANY_SQL, (sorted(set(tourney_ids)), False))
+            cursor.execute(
+                "INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id) "
+                "SELECT one, two, winner, tourney FROM unnest(%s::int[], %s::int[], %s::int[], %s::int[]) "
+                "AS m(one, two, winner, tourney);",
+                (player_one_ids, player_two_ids, winner_ids, tourney_ids))
+        cursor.execute("UPDATE match_log_marks SET applied=%s WHERE log_id=%s AND applied < %s;",
+                       (last, log_id, last))
+        db.commit()
+    return len(rows)
+
+
+@instrumented
+@pluggable
+def getMatchLogMark(log_id):
+    """Finds the last entry of a match log whose result has been recorded
+
+    Returns:
+        The entry's seq, or 0 if none of the log's results have been recorded
+    """
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT applied FROM match_log_marks WHERE log_id=%s;", (log_id,))
+        row = cursor.fetchone()
+    return row[0] if row is not None else 0
+
+
+def _copyValue(value):
+    """Formats one value as a field of COPY's text format."""
+    if value is None:
+        return '\\N'
+    return ('%s' % value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class _CopyStream(object):
+    """A file for COPY ... FROM STDIN to read rows from as they are
+    generated, so the rows are never all held in memory."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        chunks, length = [self._buffer], len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = '\t'.join(_copyValue(value) for value in row) + '\n'
+            chunks.append(line)
+            length += len(line)
+        data = ''.join(chunks)
+        if size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def unknownPlayerMessage(name, players, tourney_id):
+    """Explains why a name in an imported match does not identify a player."""
+    if players:
+        return "%d players in tournament %s are named \"%s\"." % (players, tourney_id, name)
+    return "No player in tournament %s is named \"%s\"." % (tourney_id, name)
+
+
+@instrumented
+@pluggable
+def importRecords(records, tourney_id, max_errors=100):
+    """Bulk-loads players and match results into a tournament in one transaction.
+
+    The records are streamed into a temporary table with COPY, then the
+    players are registered and the matches recorded by one statement each.
+    Matches name their players, who may be registered by earlier or later
+    records or already be in the tournament; a match naming a player no one
+    has, or a name several players share, is left out.  Player totals are
+    rebuilt once at the end rather than updated match by match.
+
+    Args:
+      records: an iterable of (line, kind, name, player_one, player_two,
+        winner) tuples, where kind is 'player', with only a name, or 'match',
+        with the names of its players and winner as normalizeMatch() returns
+        them
+      tourney_id: the id number of the tournament
+      max_errors: the most left out matches to describe
+
+    Returns:
+      A tuple of (players registered, matches recorded, matches left out,
+      (line, message) tuples for the first max_errors matches left out)
+    """
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        bumpVersion(cursor, tourney_id)
+        cursor.execute("CREATE TEMPORARY TABLE import_rows (line BIGINT, kind TEXT, name TEXT, "
+                       "player_one TEXT, player_two TEXT, winner TEXT);")
+        cursor.copy_expert("COPY import_rows FROM STDIN;", _CopyStream(records))
+        cursor.execute("ANALYZE import_rows;")
+        cursor.execute("INSERT INTO players (name, tourney_id) "
+                       "SELECT name, %s FROM import_rows WHERE kind='player' ORDER BY line;", (str(tourney_id),))
+        players = cursor.rowcount
+
+        # a name identifies a player only if no one else in the tournament has it
+        cursor.execute("CREATE TEMPORARY TABLE import_names AS "
+                       "SELECT name, min(id) AS id, count(*) AS players FROM players "
+                       "WHERE tourney_id=(%s) GROUP BY name;", (str(tourney_id),))
+        cursor.execute("ANALYZE import_names;")
+        cursor.execute("SELECT r.line, v.name, coalesce(n.players, 0) FROM import_rows AS r "
+                       "CROSS JOIN LATERAL (VALUES (r.player_one), (r.player_two)) AS v(name) "
+                       "LEFT JOIN import_names AS n ON n.name=v.name "
+                       "WHERE r.kind='match' AND v.name IS NOT NULL AND coalesce(n.players, 0) != 1 "
+                       "ORDER BY r.line LIMIT %s;", (max_errors,))
+        errors = [(line, unknownPlayerMessage(name, count, tourney_id))
+                  for (line, name, count) in cursor.fetchall()]
+
+        cursor.execute("SET LOCAL tournament.bulk_load = on;")
+        cursor.execute("INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id) "
+                       "SELECT one.id, two.id, winner.id, %s FROM import_rows AS r "
+                       "JOIN import_names AS one ON one.name=r.player_one AND one.players=1 "
+                       "LEFT JOIN import_names AS two ON two.name=r.player_two "
+                       "LEFT JOIN import_names AS winner ON winner.name=r.winner "
+                       "WHERE r.kind='match' AND (r.player_two IS NULL OR two.players=1) "
+                       "ORDER BY r.line;", (str(tourney_id),))
+        matches = cursor.rowcount
+        cursor.execute("SET LOCAL tournament.bulk_load = off;")
+        if matches:
+            cursor.execute("SELECT rebuild_player_stats(%s);", (tourney_id,))
+
+        cursor.execute("SELECT count(*) FROM import_rows WHERE kind='match';")
+        refused = cursor.fetchone()[0] - matches
+        cursor.execute("DROP TABLE import_rows, import_names;")
+        db.commit()
+    return players, matches, refused, errors
+
+
+@instrumented
+@pluggable
+def getCurrentRound(tourney_id):
+    """Finds a tournament's open round, which new results are recorded against
+
+    Returns:
+        The round number, counting from 1, or None if there is no such tournament
+    """
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT current_round FROM tournament_tracker WHERE id=(%s);", (str(tourney_id),))
+        row = cursor.fetchone()
+
+    return row[0] if row is not None else None
+
+
+@instrumented
+@pluggable
+def closeRound(tourney_id):
+    """Closes a tournament's open round and opens the next one.
+
+    The standings as they stand are saved as the closed round's snapshot for
+    standingsAfterRound().  player_stats has already folded in the round's
+    matches one at a time as they were reported, so closing a round copies
+    one row per player rather than recomputing anything from the matches.
+    Results reported from then on belong to the next round.
+
+    Returns:
+      The number of the round that was closed
+    """
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT close_round(%s);", (int(tourney_id),))
+        closed_round = cursor.fetchone()[0]
+        db.commit()
+
+    return closed_round
+
+
+@instrumented
+@pluggable
+def standingsAfterRound(tourney_id, round_number):
+    """Returns the standings as they stood when a round closed.
+
+    Snapshots are read as they were saved by closeRound(); matches deleted
+    afterwards do not change them, and they go when the tournament is
+    archived.
+
+    Args:
+      tourney_id: the id number of the tournament
+      round_number: a closed round, counting from 1
+
+    Returns:
+      A list of (id, name, wins, matches, tourney_id, omw) tuples, as
+      playerStandings(), or an empty list if the round has not closed
+    """
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT p.id, p.name, r.wins, r.matches, r.tourney_id, r.omw "
+                       "FROM round_standings AS r "
+                       "JOIN players AS p ON p.tourney_id=r.tourney_id AND p.id=r.player_id "
+                       "WHERE r.tourney_id=(%s) AND r.round=(%s) "
+                       "ORDER BY r.wins DESC, r.omw DESC, r.player_id;", (int(tourney_id), int(round_number)))
+        return cursor.fetchall()
+
+
+@instrumented
+@pluggable
 def swissPairings(tourney_id):
     """Returns a list of pairs of players for the next round of a match.
   
     Assuming that there are an even number of players registered, each player
     appears exactly once in the pairings.  Each player is paired with another
-    player with an equal or nearly-equal win record, that is, a player adjacent
-    to him or her in the standings.
+    player with an equal or nearly-equal win record, preferring a player
+    adjacent to him or her in the standings, whom he or she has not played
+    before.  Players float down to the next score group when their own
+    group cannot pair them.  See pairing.py.
 
     When an odd number of players are registered, one player is given a bye.
     Players may not receive more than one bye in a tournament.
+
+    Everything the pairing needs is fetched by one query, and the bye is
+    recorded on the same connection.
   
     Returns:
       A list of tuples, each of which contains (id1, name1, id2, name2)
@@ -201,31 +1136,108 @@ def swissPairings(tourney_id):
         id2: the second player's unique id
         name2: the second player's name
     """
-    standings = playerStandings(tourney_id)
-    pairings = []
-    length = countPlayersFromTournament(tourney_id)
-    append = pairings.append
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT * FROM pairing_candidates(%s);", (str(tourney_id),))
+        players = [PairingPlayer(player_id, name, wins, frozenset(opponents), had_bye)
+                   for (player_id, name, wins, omw, had_bye, opponents) in cursor.fetchall()]
+
+        pairs, bye = pairRound(players)
+        if bye is not None:
+            bumpVersion(cursor, tourney_id)
+            cursor.execute(
+                "INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id) VALUES(%s, NULL, %s, %s);",
+                (bye.id, bye.id, str(tourney_id)))
+            db.commit()
+
+    return [(one.id, one.name, two.id, two.name) for (one, two) in pairs]
 
-    # Odd number of players
-    if length % 2 == 1:
-        bye_player_index = findByePlayer(standings, tourney_id)
-        # bye player not found
-        if bye_player_index is None:
-            raise ValueError(
-                "Could not find bye player for this round"
-            )
-        # report bye and remove player from standings
-        reportMatch(standings[bye_player_index][0], None, standings[bye_player_index][0], tourney_id)
-        del standings[bye_player_index]
 
-    # start from the highest ranked player
-    for i in range(0, length - 1, 2):
-        # add pair to the pairings list, (id1, name1, id2, name2)
-        append((standings[i][0], standings[i][1], standings[i+1][0], standings[i+1][1]))
+def _pairTournament(job):
+    """Pairs one tournament's next round; runs in a pairAllActiveTournaments() worker.
 
-    return pairings
+    Returns:
+      A tuple of (tourney_id, pairs, bye player id or None, error message or None)
+    """
+    tourney_id, players = job
+    try:
+        pairs, bye = pairRound(players)
+    except ValueError as e:
+        return tourney_id, None, None, str(e)
+    return (tourney_id, [(one.id, one.name, two.id, two.name) for (one, two) in pairs],
+            bye.id if bye is not None else None, None)
 
 
+@instrumented
+@pluggable
+def pairAllActiveTournaments(processes=None, tourney_ids=None):
+    """Pairs the next round of every active tournament at once.
+
+    The pairing candidates of every tournament are fetched by one query, the
+    tournaments are paired in parallel by a pool of worker processes, and
+    every bye is recorded by a single statement in one transaction.
+
+    Args:
+      processes: the number of worker processes; defaults to the number of
+        CPUs, and 1 pairs every tournament in this process
+      tourney_ids: optionally, only pair these of the active tournaments
+
+    Returns:
+      A tuple of (pairings, failures) where pairings maps each paired
+      tournament's id to a list of pairs like swissPairings() returns, and
+      failures maps the id of each tournament that could not be paired to
+      the reason why
+    """
+    query = ("SELECT t.id, c.id, c.name, c.wins, c.had_bye, c.opponents "
+             "FROM tournament_tracker AS t CROSS JOIN LATERAL pairing_candidates(t.id) "
+             "WITH ORDINALITY AS c(id, name, wins, omw, had_bye, opponents, position) "
+             "WHERE t.active")
+    params = ()
+    if tourney_ids is not None:
+        query += " AND t.id=ANY(%s)"
+        params = ([int(tourney_id) for tourney_id in tourney_ids],)
+    query += " ORDER BY t.id, c.position;"
+
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute(query, params)
+        jobs = [(tourney_id, [PairingPlayer(player_id, name, wins, frozenset(opponents), had_bye)
+                              for (_, player_id, name, wins, had_bye, opponents) in rows])
+                for tourney_id, rows in groupby(cursor.fetchall(), key=lambda row: row[0])]
+
+        if processes == 1 or len(jobs) < 2:
+            results = [_pairTournament(job) for job in jobs]
+        else:
+            workers = multiprocessing.Pool(processes)
+            try:
+                results = workers.map(_pairTournament, jobs)
+            finally:
+                workers.close()
+                workers.join()
+
+        pairings, failures, byes = {}, {}, []
+        for tourney_id, pairs, bye_id, error in results:
+            if error is not None:
+                failures[tourney_id] = error
+                continue
+            pairings[tourney_id] = pairs
+            if bye_id is not None:
+                byes.append((tourney_id, bye_id))
+
+        if byes:
+            bye_tourney_ids, bye_ids = [list(column) for column in zip(*byes)]
+            cursor.execute(BUMP_MANY_SQL, (bye_tourney_ids, False))
+            cursor.execute(
+                "INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id) "
+                "SELECT player, NULL, player, tourney FROM unnest(%s::int[], %s::int[]) AS b(tourney, player);",
+                (bye_tourney_ids, bye_ids))
+            db.commit()
+
+    return pairings, failures
+
+
+@instrumented
+@pluggable
 def findByePlayer(standings, tourney_id):
     """ Finds the player that deserves the Bye for the round and hasn't
     already received one.
@@ -237,26 +1249,131 @@ def findByePlayer(standings, tourney_id):
     # find the bye player for the round
     with closing(connect()) as db:
         cursor = db.cursor()
-        cursor.execute("SELECT player_one_id FROM matches WHERE player_two_id=NULL AND tourney_id=(%s);", (str(tourney_id),))
-        previous_bye_matches = cursor.fetchall()
+        cursor.execute("SELECT player_one_id FROM matches WHERE player_two_id IS NULL AND tourney_id=(%s);", (str(tourney_id),))
+        previous_bye_players = set(row[0] for row in cursor.fetchall())
 
     # check each player starting at lowest ranked until eligible player found
-    for i in range(countPlayersFromTournament(tourney_id) - 1, -1, -1):
-        for match in previous_bye_matches:
-            if match[0] == standings[i][0]:
-                break
-        return i
+    for i in range(len(standings) - 1, -1, -1):
+        if standings[i][0] not in previous_bye_players:
+            return i
 
     return None
 
 
+@instrumented
+@pluggable
 def resetDatabase():
     """ removes current data from database and resets serial columns """
-    deleteAllMatches()
-    deleteAllPlayers()
+    with transaction():
+        deleteAllMatches()
+        deleteAllPlayers()
 
-    with closing(connect()) as db:
-        cursor = db.cursor()
-        cursor.execute("ALTER SEQUENCE matches_id_seq RESTART WITH 1;")
-        cursor.execute("ALTER SEQUENCE players_id_seq RESTART WITH 1;")
-        cursor.execute("ALTER SEQUENCE tournament_tracker_id_seq RESTART WITH 1;")
\ No newline at end of file
+        with closing(connect()) as db:
+            cursor = db.cursor()
+            cursor.execute("ALTER SEQUENCE matches_id_seq RESTART WITH 1;")
+            cursor.execute("ALTER SEQUENCE players_id_seq RESTART WITH 1;")
+            # tournaments are kept, so new ones continue after the last of them
+            cursor.execute("SELECT setval('tournament_tracker_id_seq', coalesce(max(id), 0) + 1, false) "
+                           "FROM tournament_tracker;")
+
+
+class TournamentSession(object):
+    """Works on one tournament through one connection and one transaction.
+
+    Each method calls the function of the same name in this module for the
+    session's tournament, inside a transaction() held for the whole block,
+    so a round of calls checks out one connection and commits once at the
+    end.  If the block raises, nothing it did is committed.
+
+    Usage:
+      with TournamentSession(tourney_id) as session:
+          pairs = session.swissPairings()
+          session.reportMatches([(one, two, one) for (one, _, two, _) in pairs])
+          session.closeRound()
+
+    Args:
+      tourney_id: the id number of the tournament, or None to create one
+        with createNewTournament()
+    """
+
+    def __init__(self, tourney_id=None):
+        self.tourney_id = tourney_id
+        self._transaction = None
+
+    def __enter__(self):
+        self._transaction = transaction()
+        self._transaction.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        current, self._transaction = self._transaction, None
+        return current.__exit__(exc_type, exc_value, traceback)
+
+    def createNewTournament(self):
+        """Creates a tournament and makes it the session's tournament.
+
+        Returns:
+          The new tournament's id
+        """
+        self.tourney_id = createNewTournament()
+        return self.tourney_id
+
+    def closeTournament(self):
+        closeTournament(self.tourney_id)
+
+    def archiveTournament(self, export_path=None):
+        archiveTournament(self.tourney_id, export_path)
+
+    def dropTournament(self):
+        dropTournament(self.tourney_id)
+
+    def deleteMatchesFromTournament(self):
+        deleteMatchesFromTournament(self.tourney_id)
+
+    def deletePlayersFromTournament(self):
+        deletePlayersFromTournament(self.tourney_id)
+
+    def countPlayersFromTournament(self):
+        return countPlayersFromTournament(self.tourney_id)
+
+    def registerPlayer(self, name):
+        return registerPlayer(name, self.tourney_id)
+
+    def registerPlayers(self, names):
+        return registerPlayers(names, self.tourney_id)
+
+    def findPlayerOMW(self, player_id):
+        return findPlayerOMW(player_id, self.tourney_id)
+
+    def playerStandings(self, tiebreakers=None):
+        return playerStandings(self.tourney_id, tiebreakers)
+
+    def iterStandings(self, batch_size=1000):
+        return iterStandings(self.tourney_id, batch_size)
+
+    def standingsPage(self, limit=50, offset=None, after_key=None):
+        return standingsPage(self.tourney_id, limit, offset, after_key)
+
+    def topK(self, k):
+        return topK(self.tourney_id, k)
+
+    def reportMatch(self, player_one_id, player_two_id, winner_id):
+        reportMatch(player_one_id, player_two_id, winner_id, self.tourney_id)
+
+    def reportMatches(self, results):
+        reportMatches(results, self.tourney_id)
+
+    def getCurrentRound(self):
+        return getCurrentRound(self.tourney_id)
+
+    def closeRound(self):
+        return closeRound(self.tourney_id)
+
+    def standingsAfterRound(self, round_number):
+        return standingsAfterRound(self.tourney_id, round_number)
+
+    def swissPairings(self):
+        return swissPairings(self.tourney_id)
+
+    def findByePlayer(self, standings):
+        return findByePlayer(standings, self.tourney_id)
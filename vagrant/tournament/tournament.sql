@@ -8,86 +8,518 @@
 
 -- Clear DB to start fresh
 DROP VIEW standings;
+DROP FUNCTION swiss_pairings(tourney integer);
+DROP FUNCTION pairing_candidates(tourney integer);
+DROP FUNCTION rebuild_player_stats(tourney integer);
+DROP FUNCTION tournament_standings(tourney integer);
+DROP TABLE archived_standings;
+DROP TABLE round_standings;
+DROP TABLE rounds;
+DROP TABLE matches_archive;
+DROP TABLE match_log_marks;
+DROP TABLE player_stats;
 DROP TABLE matches;
 DROP TABLE players;
 DROP TABLE tournament_tracker;
+DROP FUNCTION player_stats_on_register();
+DROP FUNCTION player_stats_on_report();
+DROP FUNCTION player_stats_on_delete();
+DROP FUNCTION player_stats_stamp();
 DROP FUNCTION opponent_wins(player_id integer, tourney integer);
 DROP FUNCTION test_opponent_wins(player_id integer, tourney integer);
+DROP FUNCTION create_tournament_partitions();
+DROP FUNCTION clear_tournament_matches(tourney integer);
+DROP FUNCTION drop_tournament(tourney integer);
+DROP FUNCTION drop_tournament_partitions(tourney integer);
+DROP FUNCTION archive_tournament(tourney integer, keep_matches boolean);
+DROP FUNCTION close_round(tourney integer);
+DROP FUNCTION reset_rounds(tourney integer);
 
 
+-- version is bumped by every change to a tournament's players or matches;
+-- active is cleared once a tournament is over and no longer paired, at
+-- closed_at; archived is set once its live partitions have been archived.
+-- current_round is the open round, which new results are recorded against
 CREATE TABLE tournament_tracker(
-  id serial PRIMARY KEY
+  id serial PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  current_round INT NOT NULL DEFAULT 1,
+  active BOOLEAN NOT NULL DEFAULT TRUE,
+  closed_at TIMESTAMPTZ DEFAULT NULL,
+  archived BOOLEAN NOT NULL DEFAULT FALSE
 );
 
+-- players, matches and player_stats are partitioned by tournament, and each
+-- tournament gets its own partition of each when it is created (see
+-- create_tournament_partitions below).  Queries for one tournament only
+-- touch its partitions, and a whole tournament is dropped with its tables.
+-- Creating, detaching or dropping a partition takes an ACCESS EXCLUSIVE
+-- lock on its parent, so while a tournament is being created, dropped or
+-- archived, every other tournament's reads and writes wait for it to commit.
+-- Requires PostgreSQL 13 or later.  Keys include tourney_id, as keys on
+-- partitioned tables must include the partition key.
 CREATE TABLE players(
-  id serial PRIMARY KEY,
+  id serial,
   name text,
-  tourney_id INT REFERENCES tournament_tracker (id)
-);
+  tourney_id INT NOT NULL REFERENCES tournament_tracker (id),
+  PRIMARY KEY (tourney_id, id)
+) PARTITION BY LIST (tourney_id);
 
 -- If player two is null, player one received a bye
 -- If winner id is null, match is a tie
+-- round is filled in with the tournament's open round when left out
 CREATE TABLE matches(
-  id serial PRIMARY KEY,
-  player_one_id INT REFERENCES players (id),
-  player_two_id INT REFERENCES players (id) DEFAULT NULL,
-  winner_id INT REFERENCES players (id) DEFAULT NULL,
-  tourney_id INT REFERENCES tournament_tracker (id),
+  id serial,
+  player_one_id INT,
+  player_two_id INT DEFAULT NULL,
+  winner_id INT DEFAULT NULL,
+  tourney_id INT NOT NULL REFERENCES tournament_tracker (id),
+  round INT NOT NULL,
+  PRIMARY KEY (tourney_id, id),
+  FOREIGN KEY (tourney_id, player_one_id) REFERENCES players (tourney_id, id),
+  FOREIGN KEY (tourney_id, player_two_id) REFERENCES players (tourney_id, id),
+  FOREIGN KEY (tourney_id, winner_id) REFERENCES players (tourney_id, id),
   CHECK (player_one_id != player_two_id)
+) PARTITION BY LIST (tourney_id);
+
+-- Running totals behind the standings view, one row per player.  Kept
+-- current by the triggers below, so reading standings never touches matches.
+-- omw is the total wins of each distinct opponent
+-- changed_version is the tournament's version when the row last changed
+CREATE TABLE player_stats(
+  player_id INT NOT NULL,
+  tourney_id INT NOT NULL REFERENCES tournament_tracker (id),
+  wins INT NOT NULL DEFAULT 0,
+  matches INT NOT NULL DEFAULT 0,
+  omw INT NOT NULL DEFAULT 0,
+  changed_version BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (tourney_id, player_id),
+  FOREIGN KEY (tourney_id, player_id) REFERENCES players (tourney_id, id) ON DELETE CASCADE
+) PARTITION BY LIST (tourney_id);
+
+CREATE INDEX player_stats_standings_idx ON player_stats (tourney_id, wins DESC, omw DESC, player_id);
+CREATE INDEX player_stats_changes_idx ON player_stats (tourney_id, changed_version);
+
+-- One row per round of each tournament, the open one with no closed_at
+CREATE TABLE rounds(
+  tourney_id INT NOT NULL REFERENCES tournament_tracker (id),
+  round INT NOT NULL,
+  opened_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  closed_at TIMESTAMPTZ DEFAULT NULL,
+  PRIMARY KEY (tourney_id, round)
+);
+
+-- Every player's totals as they stood when each round closed, copied from
+-- player_stats by close_round()
+CREATE TABLE round_standings(
+  tourney_id INT NOT NULL REFERENCES tournament_tracker (id),
+  round INT NOT NULL,
+  player_id INT NOT NULL,
+  wins INT NOT NULL,
+  matches INT NOT NULL,
+  omw INT NOT NULL,
+  PRIMARY KEY (tourney_id, round, player_id),
+  FOREIGN KEY (tourney_id, player_id) REFERENCES players (tourney_id, id) ON DELETE CASCADE
+) PARTITION BY LIST (tourney_id);
+
+CREATE INDEX round_standings_idx ON round_standings (tourney_id, round, wins DESC, omw DESC, player_id);
+
+-- Archived tournaments keep only their final standings, frozen here, and
+-- optionally their raw matches in matches_archive.  Neither is partitioned
+-- or referenced by the live tables.
+CREATE TABLE archived_standings(
+  player_id INT NOT NULL,
+  name text,
+  wins INT NOT NULL,
+  matches INT NOT NULL,
+  tourney_id INT NOT NULL REFERENCES tournament_tracker (id),
+  omw INT NOT NULL,
+  PRIMARY KEY (tourney_id, player_id)
 );
 
+CREATE INDEX archived_standings_idx ON archived_standings (tourney_id, wins DESC, omw DESC, player_id);
+
+CREATE TABLE matches_archive(
+  id INT NOT NULL,
+  player_one_id INT NOT NULL,
+  player_two_id INT DEFAULT NULL,
+  winner_id INT DEFAULT NULL,
+  tourney_id INT NOT NULL REFERENCES tournament_tracker (id),
+  round INT NOT NULL,
+  PRIMARY KEY (tourney_id, id)
+);
+
+-- The last entry of each match log (see match_log.py) whose result has been
+-- written to matches, updated in the same transaction as the results, so a
+-- log replayed after a crash skips what was already written
+CREATE TABLE match_log_marks(
+  log_id TEXT PRIMARY KEY,
+  applied BIGINT NOT NULL DEFAULT 0
+);
+
+-- Every hot query is scoped to one tournament, and so to one partition; the
+-- primary keys cover lookups by tournament.  The player indexes also serve
+-- the foreign key checks when players are deleted.
+CREATE INDEX matches_player_one_idx ON matches (player_one_id, player_two_id);
+CREATE INDEX matches_player_two_idx ON matches (player_two_id, player_one_id);
+CREATE INDEX matches_winner_idx ON matches (winner_id);
+CREATE INDEX matches_byes_idx ON matches (tourney_id, player_one_id) WHERE player_two_id IS NULL;
+
+-- Every tournament gets its own partition of players, player_stats, matches
+-- and round_standings, and opens its first round
+CREATE FUNCTION create_tournament_partitions () RETURNS trigger
+AS $$
+    BEGIN
+      EXECUTE format('CREATE TABLE %I PARTITION OF players FOR VALUES IN (%s)', 'players_' || NEW.id, NEW.id);
+      EXECUTE format('CREATE TABLE %I PARTITION OF player_stats FOR VALUES IN (%s)', 'player_stats_' || NEW.id, NEW.id);
+      EXECUTE format('CREATE TABLE %I PARTITION OF matches FOR VALUES IN (%s)', 'matches_' || NEW.id, NEW.id);
+      EXECUTE format('CREATE TABLE %I PARTITION OF round_standings FOR VALUES IN (%s)',
+                     'round_standings_' || NEW.id, NEW.id);
+      INSERT INTO rounds (tourney_id, round) VALUES (NEW.id, NEW.current_round);
+      RETURN NULL;
+    END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tournament_tracker_partitions AFTER INSERT ON tournament_tracker
+  FOR EACH ROW EXECUTE PROCEDURE create_tournament_partitions();
+
+-- Starts a tournament's rounds over from round 1
+CREATE FUNCTION reset_rounds (tourney integer) RETURNS void
+AS $$
+    BEGIN
+      UPDATE tournament_tracker SET current_round=1 WHERE id=tourney;
+      DELETE FROM rounds WHERE tourney_id=tourney;
+      INSERT INTO rounds (tourney_id, round) VALUES (tourney, 1);
+    END
+$$ LANGUAGE plpgsql;
+
+-- Empties a tournament's matches partition in one step.  TRUNCATE skips the
+-- per-row player_stats triggers, so the totals are reset directly, and the
+-- round snapshots go with the matches.
+CREATE FUNCTION clear_tournament_matches (tourney integer) RETURNS void
+AS $$
+    BEGIN
+      EXECUTE format('TRUNCATE %I, %I', 'matches_' || tourney, 'round_standings_' || tourney);
+      UPDATE player_stats SET wins=0, matches=0, omw=0 WHERE tourney_id=tourney;
+      PERFORM reset_rounds(tourney);
+    END
+$$ LANGUAGE plpgsql;
+
+-- Closes a tournament's open round and opens the next.  player_stats has
+-- already folded in the round's matches one by one, so the snapshot is a
+-- copy of the tournament's player_stats rather than a recomputation.
+-- Locking the tracker row first waits out results being reported, which
+-- lock it too, so every result lands either before the snapshot or in the
+-- next round.
+CREATE FUNCTION close_round (tourney integer) RETURNS integer
+AS $$
+    DECLARE
+      closing integer;
+    BEGIN
+      UPDATE tournament_tracker SET current_round=current_round + 1
+        WHERE id=tourney
+        RETURNING current_round - 1 INTO closing;
+      IF closing IS NULL THEN
+        RAISE EXCEPTION 'tournament % does not exist', tourney;
+      END IF;
+      INSERT INTO round_standings (tourney_id, round, player_id, wins, matches, omw)
+        SELECT tourney_id, closing, player_id, wins, matches, omw
+        FROM player_stats WHERE tourney_id=tourney;
+      UPDATE rounds SET closed_at=now() WHERE tourney_id=tourney AND round=closing;
+      INSERT INTO rounds (tourney_id, round) VALUES (tourney, closing + 1);
+      RETURN closing;
+    END
+$$ LANGUAGE plpgsql;
+
+-- Drops a tournament's partitions of players, player_stats, matches and
+-- round_standings.  Stalls every other tournament until the transaction
+-- ends, as it locks the parent tables.
+-- players_N is referenced by the other tables' foreign keys, so it is
+-- detached once they are gone rather than dropped in place.
+CREATE FUNCTION drop_tournament_partitions (tourney integer) RETURNS void
+AS $$
+    BEGIN
+      EXECUTE format('DROP TABLE IF EXISTS %I', 'matches_' || tourney);
+      EXECUTE format('DROP TABLE IF EXISTS %I', 'player_stats_' || tourney);
+      EXECUTE format('DROP TABLE IF EXISTS %I', 'round_standings_' || tourney);
+      IF to_regclass('players_' || tourney) IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE players DETACH PARTITION %I', 'players_' || tourney);
+        EXECUTE format('DROP TABLE %I', 'players_' || tourney);
+      END IF;
+    END
+$$ LANGUAGE plpgsql;
+
+-- Removes a tournament and everything in it, archived or not
+CREATE FUNCTION drop_tournament (tourney integer) RETURNS void
+AS $$
+    BEGIN
+      PERFORM drop_tournament_partitions(tourney);
+      DELETE FROM archived_standings WHERE tourney_id=tourney;
+      DELETE FROM matches_archive WHERE tourney_id=tourney;
+      DELETE FROM rounds WHERE tourney_id=tourney;
+      DELETE FROM tournament_tracker WHERE id=tourney;
+    END
+$$ LANGUAGE plpgsql;
+
+-- Freezes a tournament's standings into archived_standings, copies its
+-- matches to matches_archive if keep_matches is set, and drops its live
+-- partitions.  The tracker row stays, marked archived.
+CREATE FUNCTION archive_tournament (tourney integer, keep_matches boolean) RETURNS void
+AS $$
+    BEGIN
+      INSERT INTO archived_standings (player_id, name, wins, matches, tourney_id, omw)
+        SELECT p.id, p.name, s.wins, s.matches, s.tourney_id, s.omw
+        FROM player_stats AS s
+          JOIN players AS p
+            ON p.tourney_id=s.tourney_id AND p.id=s.player_id
+        WHERE s.tourney_id=tourney;
+      IF keep_matches THEN
+        INSERT INTO matches_archive (id, player_one_id, player_two_id, winner_id, tourney_id, round)
+          SELECT id, player_one_id, player_two_id, winner_id, tourney_id, round
+          FROM matches WHERE tourney_id=tourney;
+      END IF;
+      PERFORM drop_tournament_partitions(tourney);
+      UPDATE tournament_tracker
+        SET active=FALSE, archived=TRUE, closed_at=coalesce(closed_at, now())
+        WHERE id=tourney;
+    END
+$$ LANGUAGE plpgsql;
+
 -- Reset the id of each table
 ALTER SEQUENCE matches_id_seq RESTART WITH 1;
 ALTER SEQUENCE players_id_seq RESTART WITH 1;
 ALTER SEQUENCE tournament_tracker_id_seq RESTART WITH 1;
 
-CREATE FUNCTION opponent_wins (player_id integer, tourney integer) RETURNS table(omw BIGINT)
+-- Standings for a single tournament, computed set-based from one scan of
+-- that tournament's matches.
+-- omw is the total wins of each distinct opponent, NULL if none of them has won
+CREATE FUNCTION tournament_standings (tourney integer)
+  RETURNS table(id INT, name TEXT, wins BIGINT, matches BIGINT, tourney_id INT, omw NUMERIC)
+AS $$
+  WITH tourney_matches AS (
+    SELECT player_one_id, player_two_id, winner_id
+    FROM matches
+    WHERE tourney_id=tourney
+  ), appearances AS (
+    SELECT player_one_id AS player_id, player_two_id AS opponent_id FROM tourney_matches
+    UNION ALL
+    SELECT player_two_id, player_one_id FROM tourney_matches WHERE player_two_id IS NOT NULL
+  ), win_counts AS (
+    SELECT winner_id AS player_id, count(*) AS wins
+    FROM tourney_matches
+    WHERE winner_id IS NOT NULL GROUP BY winner_id
+  ), match_counts AS (
+    SELECT player_id, count(*) AS matches FROM appearances GROUP BY player_id
+  ), opponent_wins AS (
+    SELECT o.player_id, sum(w.wins) AS omw
+    FROM (SELECT DISTINCT player_id, opponent_id
+          FROM appearances WHERE opponent_id IS NOT NULL) AS o
+      JOIN win_counts AS w
+        ON w.player_id=o.opponent_id
+    GROUP BY o.player_id
+  )
+  SELECT
+    p.id,
+    p.name,
+    coalesce(w.wins, 0),
+    coalesce(mc.matches, 0),
+    p.tourney_id,
+    ow.omw
+  FROM players AS p
+    LEFT JOIN win_counts AS w
+      ON p.id=w.player_id
+    LEFT JOIN match_counts AS mc
+      ON p.id=mc.player_id
+    LEFT JOIN opponent_wins AS ow
+      ON p.id=ow.player_id
+  WHERE p.tourney_id=tourney;
+$$ LANGUAGE sql STABLE;
+
+-- Every registered player starts with an empty stats row
+CREATE FUNCTION player_stats_on_register () RETURNS trigger
+AS $$
+    BEGIN
+      INSERT INTO player_stats (player_id, tourney_id) VALUES (NEW.id, NEW.tourney_id);
+      RETURN NULL;
+    END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER players_register AFTER INSERT ON players
+  FOR EACH ROW EXECUTE PROCEDURE player_stats_on_register();
+
+-- Stamps every new or changed player_stats row with its tournament's
+-- version.  Writers bump the version before changing anything (see
+-- bumpVersion() in tournament.py), so the rows a transaction touches carry
+-- the version it commits, and standings subscribers can read just the rows
+-- changed since the version they last saw.
+CREATE FUNCTION player_stats_stamp () RETURNS trigger
+AS $$
+    BEGIN
+      SELECT version INTO NEW.changed_version FROM tournament_tracker WHERE id=NEW.tourney_id;
+      RETURN NEW;
+    END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER player_stats_stamp BEFORE INSERT OR UPDATE ON player_stats
+  FOR EACH ROW EXECUTE PROCEDURE player_stats_stamp();
+
+-- Folds a new match into player_stats.  Runs BEFORE INSERT so that rows
+-- inserted earlier by the same statement are visible but this one is not.
+-- Matches are only recorded against the tournament's open round.
+CREATE FUNCTION player_stats_on_report () RETURNS trigger
 AS $$
     DECLARE
-      id INTEGER;
+      open_round integer;
     BEGIN
-      FOR id in (SELECT
-                       CASE
-                        WHEN player_one_id=player_id AND tourney_id=tourney THEN player_two_id
-                        WHEN player_two_id=player_id AND tourney_id=tourney THEN player_one_id
-                       END AS opponent_id
-                     FROM matches GROUP BY opponent_id)
-        LOOP
-          RETURN QUERY
-          EXECUTE format('SELECT count(*) FROM matches WHERE winner_id=%L AND tourney_id=%L GROUP BY winner_id', id, tourney);
-        END LOOP ;
+      SELECT current_round INTO open_round FROM tournament_tracker WHERE id=NEW.tourney_id;
+      IF NEW.round IS NULL THEN
+        NEW.round := open_round;
+      ELSIF NEW.round != open_round THEN
+        RAISE EXCEPTION 'round % of tournament % is not open', NEW.round, NEW.tourney_id;
+      END IF;
+
+      -- bulk imports (see importRecords() in tournament.py) set this for their
+      -- transaction and rebuild the totals once at the end instead
+      IF current_setting('tournament.bulk_load', true) = 'on' THEN
+        RETURN NEW;
+      END IF;
+
+      UPDATE player_stats SET matches=matches + 1
+        WHERE tourney_id=NEW.tourney_id AND player_id IN (NEW.player_one_id, NEW.player_two_id);
+
+      -- first meeting: each player's omw gains the other's wins so far
+      IF NEW.player_two_id IS NOT NULL AND NOT EXISTS (
+           SELECT 1 FROM matches
+           WHERE tourney_id=NEW.tourney_id AND
+             ((player_one_id=NEW.player_one_id AND player_two_id=NEW.player_two_id) OR
+              (player_one_id=NEW.player_two_id AND player_two_id=NEW.player_one_id))) THEN
+        UPDATE player_stats AS s SET omw=s.omw + o.wins
+          FROM player_stats AS o
+          WHERE s.tourney_id=NEW.tourney_id AND o.tourney_id=NEW.tourney_id AND
+            (s.player_id, o.player_id) IN ((NEW.player_one_id, NEW.player_two_id),
+                                           (NEW.player_two_id, NEW.player_one_id));
+      END IF;
+
+      -- the winner's new win counts towards the omw of each distinct opponent
+      IF NEW.winner_id IS NOT NULL THEN
+        UPDATE player_stats SET wins=wins + 1 WHERE tourney_id=NEW.tourney_id AND player_id=NEW.winner_id;
+        UPDATE player_stats SET omw=omw + 1
+          WHERE tourney_id=NEW.tourney_id AND player_id IN (
+            SELECT player_two_id FROM matches
+              WHERE tourney_id=NEW.tourney_id AND player_one_id=NEW.winner_id
+            UNION
+            SELECT player_one_id FROM matches
+              WHERE tourney_id=NEW.tourney_id AND player_two_id=NEW.winner_id
+            UNION
+            SELECT CASE WHEN NEW.winner_id=NEW.player_one_id
+                     THEN NEW.player_two_id ELSE NEW.player_one_id END);
+      END IF;
+      RETURN NEW;
     END
+$$ LANGUAGE plpgsql;
+
+-- Reverses player_stats_on_report().  Runs BEFORE DELETE, while the row
+-- being removed is still visible.
+CREATE FUNCTION player_stats_on_delete () RETURNS trigger
+AS $$
+    BEGIN
+      UPDATE player_stats SET matches=matches - 1
+        WHERE tourney_id=OLD.tourney_id AND player_id IN (OLD.player_one_id, OLD.player_two_id);
+
+      IF OLD.winner_id IS NOT NULL THEN
+        UPDATE player_stats SET wins=wins - 1 WHERE tourney_id=OLD.tourney_id AND player_id=OLD.winner_id;
+        UPDATE player_stats SET omw=omw - 1
+          WHERE tourney_id=OLD.tourney_id AND player_id IN (
+            SELECT player_two_id FROM matches
+              WHERE tourney_id=OLD.tourney_id AND player_one_id=OLD.winner_id
+            UNION
+            SELECT player_one_id FROM matches
+              WHERE tourney_id=OLD.tourney_id AND player_two_id=OLD.winner_id);
+      END IF;
 
+      -- last meeting: each player's omw loses the other's remaining wins
+      IF OLD.player_two_id IS NOT NULL AND NOT EXISTS (
+           SELECT 1 FROM matches
+           WHERE tourney_id=OLD.tourney_id AND id!=OLD.id AND
+             ((player_one_id=OLD.player_one_id AND player_two_id=OLD.player_two_id) OR
+              (player_one_id=OLD.player_two_id AND player_two_id=OLD.player_one_id))) THEN
+        UPDATE player_stats AS s SET omw=s.omw - o.wins
+          FROM player_stats AS o
+          WHERE s.tourney_id=OLD.tourney_id AND o.tourney_id=OLD.tourney_id AND
+            (s.player_id, o.player_id) IN ((OLD.player_one_id, OLD.player_two_id),
+                                           (OLD.player_two_id, OLD.player_one_id));
+      END IF;
+      RETURN OLD;
+    END
 $$ LANGUAGE plpgsql;
 
+CREATE TRIGGER matches_report BEFORE INSERT ON matches
+  FOR EACH ROW EXECUTE PROCEDURE player_stats_on_report();
+
+CREATE TRIGGER matches_delete BEFORE DELETE ON matches
+  FOR EACH ROW EXECUTE PROCEDURE player_stats_on_delete();
+
+-- Recomputes a tournament's player_stats from scratch, for use after
+-- loading matches with triggers disabled or tournament.bulk_load set
+CREATE FUNCTION rebuild_player_stats (tourney integer) RETURNS void
+AS $$
+  UPDATE player_stats AS ps
+    SET wins=s.wins, matches=s.matches, omw=coalesce(s.omw, 0)
+    FROM tournament_standings(tourney) AS s
+    WHERE ps.tourney_id=tourney AND ps.player_id=s.id;
+$$ LANGUAGE sql;
+
+-- Everything the pairing engine in pairing.py needs to pair the next round,
+-- in standings order: each player's score, whether they have had a bye and
+-- the ids of everyone they have played
+CREATE FUNCTION pairing_candidates (tourney integer)
+  RETURNS table(id INT, name TEXT, wins INT, omw INT, had_bye BOOLEAN, opponents INT[])
+AS $$
+  WITH tourney_matches AS (
+    SELECT player_one_id, player_two_id
+    FROM matches
+    WHERE tourney_id=tourney
+  ), appearances AS (
+    SELECT player_one_id AS player_id, player_two_id AS opponent_id FROM tourney_matches
+    UNION ALL
+    SELECT player_two_id, player_one_id FROM tourney_matches WHERE player_two_id IS NOT NULL
+  )
+  SELECT
+    p.id,
+    p.name,
+    s.wins,
+    s.omw,
+    coalesce(bool_or(a.player_id IS NOT NULL AND a.opponent_id IS NULL), false),
+    array_remove(array_agg(DISTINCT a.opponent_id), NULL)
+  FROM player_stats AS s
+    JOIN players AS p
+      ON p.tourney_id=s.tourney_id AND p.id=s.player_id
+    LEFT JOIN appearances AS a
+      ON a.player_id=s.player_id
+  WHERE s.tourney_id=tourney
+  GROUP BY s.tourney_id, s.player_id, p.tourney_id, p.id
+  ORDER BY s.wins DESC, s.omw DESC, s.player_id;
+$$ LANGUAGE sql STABLE;
+
+-- Live tournaments read from player_stats and archived ones from
+-- archived_standings; a tournament is only ever in one of the two.  The
+-- union cannot be read in index order, so whole standings are read through
+-- this view, but pages and streams read the two tables directly (see
+-- standingsQuery() in tournament.py).
 CREATE VIEW standings (id, name, wins, matches, tourney_id, omw) AS
   SELECT
     p.id,
     p.name,
-    player_wins.num_wins as wins,
-    player_matches.num_matches,
-    p.tourney_id,
-    (SELECT sum(omw) FROM opponent_wins(p.id, p.tourney_id)) as omw
-  FROM players as p
-    LEFT JOIN matches as m
-      ON p.id=m.player_one_id
-    LEFT JOIN
-    (SELECT
-       p.id,
-       count(m) as num_matches
-     FROM players as p
-       LEFT JOIN matches as m
-         ON p.id=m.player_one_id OR p.id = m.player_two_id GROUP BY p.id) as player_matches
-      ON p.id=player_matches.id
-    LEFT JOIN
-    (SELECT
-       p2.id,
-       count(m2) as num_wins
-     FROM players as p2
-       LEFT JOIN matches as m2
-         ON p2.id=m2.winner_id GROUP BY p2.id) as player_wins
-      ON p.id=player_wins.id
-  GROUP BY p.id, player_matches.num_matches, player_wins.num_wins ORDER BY p.tourney_id;
+    s.wins,
+    s.matches,
+    s.tourney_id,
+    s.omw
+  FROM player_stats AS s
+    JOIN players AS p
+      ON p.tourney_id=s.tourney_id AND p.id=s.player_id
+  UNION ALL
+  SELECT player_id, name, wins, matches, tourney_id, omw
+  FROM archived_standings;
 
 -- Ensure DB is empty by displaying tables and views
 SELECT * FROM standings;
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+#
+# tournament_async.py -- asyncio counterpart to tournament.py
+#
+# The same operations as tournament.py, as coroutines backed by an aiopg
+# connection pool, so one process can serve many tournaments at once without
+# a thread per request.  Requires Python 3.6+ and aiopg.
+#
+# Standings share tournament.py's versioned cache, and results are validated
+# with the same rules, so the two modules can be used side by side.
+#
+
+import asyncio
+
+import aiopg
+
+import tournament
+from pairing import PairingPlayer, pairRound
+from subscriptions import (VERSION_SQL, StandingsDelta, deltaQuery, mergeNotifications,
+                           parseNotification)
+
+_pool = None
+_pool_lock = None
+
+
+def _lock():
+    # created on first use so it belongs to the running event loop
+    global _pool_lock
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    return _pool_lock
+
+
+async def configure_pool(minsize=1, maxsize=10, dsn=tournament.DSN, **kwargs):
+    """Replaces the shared connection pool used by every coroutine in this module.
+
+    Args:
+      minsize: connections opened up front and kept alive
+      maxsize: upper bound on open connections; callers wait beyond it
+      dsn: the libpq connection string
+      kwargs: passed through to aiopg.create_pool (timeout, pool_recycle)
+    """
+    global _pool
+    new_pool = await aiopg.create_pool(dsn, minsize=minsize, maxsize=maxsize, **kwargs)
+    async with _lock():
+        old_pool, _pool = _pool, new_pool
+    if old_pool is not None:
+        old_pool.close()
+        await old_pool.wait_closed()
+
+
+async def close_pool():
+    """Closes the shared pool once every connection has been returned."""
+    global _pool
+    async with _lock():
+        old_pool, _pool = _pool, None
+    if old_pool is not None:
+        old_pool.close()
+        await old_pool.wait_closed()
+
+
+def pool_stats():
+    """Returns the shared pool's size and number of idle connections."""
+    if _pool is None:
+        return {'size': 0, 'idle': 0}
+    return {'size': _pool.size, 'idle': _pool.freesize}
+
+
+async def connect():
+    """Returns the shared pool, creating it on first use.
+
+    Use as `async with (await connect()).acquire() as db:`; the connection
+    goes back to the pool at the end of the block.
+    """
+    global _pool
+    if _pool is None:
+        async with _lock():
+            if _pool is None:
+                _pool = await aiopg.create_pool(tournament.DSN)
+    return _pool
+
+
+async def _bump_version(cursor, tourney_id):
+    """See tournament.bumpVersion()."""
+    await cursor.execute(tournament.BUMP_ONE_SQL, (str(tourney_id), False))
+
+
+async def register_player(name, tourney_id):
+    """Adds a player to a tournament; see tournament.registerPlayer().
+
+    Returns:
+      The id assigned to the player
+    """
+    ids = await register_players([name], tourney_id)
+    return ids[0]
+
+
+async def register_players(names, tourney_id):
+    """Adds a whole roster of players at once; see tournament.registerPlayers().
+
+    Returns:
+      The ids assigned to the players, in the same order as `names`
+    """
+    names = list(names)
+    if not names:
+        return []
+
+    async with (await connect()).acquire() as db:
+        async with db.cursor() as cursor:
+            async with cursor.begin():
+                await _bump_version(cursor, tourney_id)
+                # neither RETURNING nor nextval() follows array order, so each
+                # name's id is drawn alongside its position and read back in that order
+                await cursor.execute("WITH roster AS MATERIALIZED ("
+                                     "  SELECT nextval('players_id_seq') AS id, name, position "
+                                     "  FROM unnest(%s::text[]) WITH ORDINALITY AS n(name, position)"
+                                     "), inserted AS ("
+                                     "  INSERT INTO players (id, name, tourney_id) SELECT id, name, %s "
+                                     "  FROM roster RETURNING id"
+                                     ") SELECT roster.id FROM roster JOIN inserted USING (id) ORDER BY roster.position;",
+                                     (names, str(tourney_id)))
+                ids = [row[0] for row in await cursor.fetchall()]
+    return ids
+
+
+async def report_match(player_one_id, player_two_id, winner_id, tourney_id):
+    """Records the outcome of a single match; see tournament.reportMatch()."""
+    await report_matches([(player_one_id, player_two_id, winner_id)], tourney_id)
+
+
+async def report_matches(results, tourney_id):
+    """Records a whole round of results in one transaction; see tournament.reportMatches().
+
+    Raises:
+      ValueError: if any result is malformed
+    """
+    rows = []
+    for result in results:
+        if len(result) != 3:
+            raise ValueError("Expected (player_one_id, player_two_id, winner_id), got %r." % (result,))
+        rows.append(tournament.normalizeMatch(*result))
+    if not rows:
+        return
+
+    player_one_ids, player_two_ids, winner_ids = [list(column) for column in zip(*rows)]
+    async with (await connect()).acquire() as db:
+        async with db.cursor() as cursor:
+            async with cursor.begin():
+                await _bump_version(cursor, tourney_id)
+                await cursor.execute(
+                    "INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id) "
+                    "SELECT one, two, winner, %s FROM unnest(%s::int[], %s::int[], %s::int[]) AS m(one, two, winner);",
+                    (str(tourney_id), player_one_ids, player_two_ids, winner_ids))
+
+
+async def player_standings(tourney_id):
+    """Returns the standings, first place first; see tournament.playerStandings().
+
+    Shares tournament.py's standings cache.
+    """
+    key = str(tourney_id)
+    async with (await connect()).acquire() as db:
+        async with db.cursor() as cursor:
+            await cursor.execute("SELECT version FROM tournament_tracker WHERE id=(%s);", (key,))
+            row = await cursor.fetchone()
+            version = row[0] if row is not None else None
+            if version is not None:
+                standings = tournament._standings_cache.get(key, version)
+                if standings is not None:
+                    return list(standings)
+
+            await cursor.execute("SELECT * FROM standings WHERE tourney_id=(%s) "
+                                 "ORDER BY wins DESC, omw DESC, id;", (key,))
+            standings = await cursor.fetchall()
+
+    if version is not None:
+        tournament._standings_cache.put(key, version, tuple(standings))
+    return standings
+
+
+async def swiss_pairings(tourney_id):
+    """Pairs the next round and records the bye, if any; see tournament.swissPairings().
+
+    The pairing itself runs in the event loop's default executor, so large
+    tournaments do not hold up other requests while they are paired.
+    """
+    async with (await connect()).acquire() as db:
+        async with db.cursor() as cursor:
+            await cursor.execute("SELECT * FROM pairing_candidates(%s);", (str(tourney_id),))
+            players = [PairingPlayer(player_id, name, wins, frozenset(opponents), had_bye)
+                       for (player_id, name, wins, omw, had_bye, opponents) in await cursor.fetchall()]
+
+            loop = asyncio.get_event_loop()
+            pairs, bye = await loop.run_in_executor(None, pairRound, players)
+            if bye is not None:
+                async with cursor.begin():
+                    await _bump_version(cursor, tourney_id)
+                    await cursor.execute(
+                        "INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id) "
+                        "VALUES(%s, NULL, %s, %s);", (bye.id, bye.id, str(tourney_id)))
+
+    return [(one.id, one.name, two.id, two.name) for (one, two) in pairs]
+
+
+async def _read_delta(tourney_id, reset, versions):
+    """Reads one tournament's change; see subscriptions.StandingsSubscriber."""
+    async with (await connect()).acquire() as db:
+        async with db.cursor() as cursor:
+            await cursor.execute(VERSION_SQL, (tourney_id,))
+            row = await cursor.fetchone()
+            version = row[0] if row is not None else None
+            plan = deltaQuery(tourney_id, version, versions.get(tourney_id), reset)
+            if plan is None:
+                return None
+            query, params, reset = plan
+            rows = []
+            if query is not None:
+                await cursor.execute(query, params)
+                rows = await cursor.fetchall()
+
+    if version is None:
+        versions.pop(tourney_id, None)
+    else:
+        versions[tourney_id] = version
+    return StandingsDelta(tourney_id, version, rows, reset)
+
+
+async def subscribe_standings(tourney_ids=None):
+    """Yields a subscriptions.StandingsDelta for each change to the standings
+    of some or all tournaments, as it commits; see
+    subscriptions.StandingsSubscriber.
+
+    Usage:
+      async for delta in subscribe_standings([tourney_id]):
+          scoreboard.update(delta)
+    """
+    wanted = None if tourney_ids is None else set(int(t) for t in tourney_ids)
+    versions = {}
+    pending = dict.fromkeys(wanted or (), True)
+    # LISTEN holds a session of its own, outside the shared pool
+    listener = await aiopg.connect(tournament.DSN)
+    try:
+        async with listener.cursor() as cursor:
+            await cursor.execute("LISTEN %s;" % tournament.STANDINGS_CHANNEL)
+        while True:
+            notifications = []
+            if not pending:
+                notifications.append(await listener.notifies.get())
+            while not listener.notifies.empty():
+                notifications.append(listener.notifies.get_nowait())
+            parsed = [parseNotification(notification.payload) for notification in notifications]
+            mergeNotifications([(tourney_id, version, reset) for (tourney_id, version, reset) in parsed
+                                if tourney_id is not None and (wanted is None or tourney_id in wanted)],
+                               pending)
+
+            current, pending = pending, {}
+            for tourney_id, reset in sorted(current.items()):
+                delta = await _read_delta(tourney_id, reset, versions)
+                if delta is not None:
+                    yield delta
+    finally:
+        listener.close()
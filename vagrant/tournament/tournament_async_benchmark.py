@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+#
+# tournament_async_benchmark.py -- load test of tournament_async.py against tournament.py
+#
+# Seeds a number of tournaments, then runs the same mix of standings reads
+# and match reports through the async API from many concurrent tasks and
+# through the sync API from a pool of threads, and compares throughput.
+# Requires Python 3.5+, aiopg and a local Postgres set up with tournament.sql.
+#
+# Usage:
+#   python3 tournament_async_benchmark.py --tournaments 100 --concurrency 1000 --seconds 10
+#
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+from contextlib import closing
+
+import tournament
+import tournament_async
+from tournament_benchmark import dropTournament, seedTournament
+
+
+def percentile(latencies, fraction):
+    latencies = sorted(latencies)
+    if not latencies:
+        return 0.0
+    return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)]
+
+
+def pickOperation(rosters, read_ratio):
+    """Returns a random (kind, tourney_id, player_one_id, player_two_id) operation."""
+    tourney_id = random.choice(list(rosters))
+    if random.random() < read_ratio:
+        return 'standings', tourney_id, None, None
+    one, two = random.sample(rosters[tourney_id], 2)
+    return 'report', tourney_id, one, two
+
+
+async def runAsync(rosters, args):
+    """Runs the workload from args.concurrency tasks until the deadline."""
+    await tournament_async.configure_pool(minsize=args.connections, maxsize=args.connections)
+    latencies = []
+    deadline = time.time() + args.seconds
+
+    async def worker():
+        while time.time() < deadline:
+            kind, tourney_id, one, two = pickOperation(rosters, args.read_ratio)
+            start = time.time()
+            if kind == 'standings':
+                await tournament_async.player_standings(tourney_id)
+            else:
+                await tournament_async.report_match(one, two, one, tourney_id)
+            latencies.append(time.time() - start)
+
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    await tournament_async.close_pool()
+    return latencies
+
+
+def runSync(rosters, args):
+    """Runs the workload from args.threads threads until the deadline."""
+    tournament.configurePool(minconn=args.connections, maxconn=args.connections)
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.time() + args.seconds
+
+    def worker():
+        mine = []
+        while time.time() < deadline:
+            kind, tourney_id, one, two = pickOperation(rosters, args.read_ratio)
+            start = time.time()
+            if kind == 'standings':
+                tournament.playerStandings(tourney_id)
+            else:
+                tournament.reportMatch(one, two, one, tourney_id)
+            mine.append(time.time() - start)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def report(label, latencies, seconds):
+    print("  %-28s %10.0f ops/s %10.2f ms p50 %10.2f ms p99" % (
+        label, len(latencies) / seconds,
+        percentile(latencies, 0.50) * 1000, percentile(latencies, 0.99) * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the async API against the sync API")
+    parser.add_argument('--tournaments', type=int, default=100)
+    parser.add_argument('--players', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--read-ratio', type=float, default=0.8,
+                        help='fraction of operations that read standings; the rest report a match')
+    parser.add_argument('--concurrency', type=int, default=1000, help='concurrent async tasks')
+    parser.add_argument('--threads', type=int, default=20, help='sync API threads')
+    parser.add_argument('--connections', type=int, default=20, help='pool size for both APIs')
+    args = parser.parse_args()
+    random.seed(0)
+
+    rosters = {}
+    with closing(tournament.connect()) as db:
+        cursor = db.cursor()
+        for _ in range(args.tournaments):
+            tourney_id = seedTournament(cursor, args.players, 0)
+            cursor.execute("SELECT id FROM players WHERE tourney_id=(%s);", (tourney_id,))
+            rosters[tourney_id] = [row[0] for row in cursor.fetchall()]
+        db.commit()
+
+    try:
+        print("load: %d tournaments of %d players, %d%% reads, %d connections" % (
+            args.tournaments, args.players, args.read_ratio * 100, args.connections))
+        report("sync, %d threads" % args.threads, runSync(rosters, args), args.seconds)
+        loop = asyncio.get_event_loop()
+        report("async, %d tasks" % args.concurrency,
+               loop.run_until_complete(runAsync(rosters, args)), args.seconds)
+    finally:
+        with closing(tournament.connect()) as db:
+            cursor = db.cursor()
+            for tourney_id in rosters:
+                dropTournament(cursor, tourney_id)
+            db.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+#
+# tournament_async_test.py -- tests for tournament_async.py
+#
+# Runs against the same database as tournament_test.py, in tournaments of
+# its own that are dropped afterwards.  Requires Python 3.6+ and aiopg.
+#
+# Usage:
+#   python3 tournament_async_test.py
+#
+
+import asyncio
+import random
+
+import tournament
+import tournament_async
+
+
+async def testRegisterPlayers():
+    tourney_id = tournament.createNewTournament()
+    try:
+        names = ["Async Player %d" % i for i in range(500)]
+        random.shuffle(names)
+        ids = await tournament_async.register_players(names, tourney_id)
+        if len(ids) != len(names) or len(set(ids)) != len(names):
+            raise ValueError("register_players() should return a distinct id for every name.")
+        registered = dict((row[0], row[1]) for row in tournament.playerStandings(tourney_id))
+        if [registered.get(i) for i in ids] != names:
+            raise ValueError("Each id register_players() returns should belong to the name in its position.")
+        player_id = await tournament_async.register_player("Async Latecomer", tourney_id)
+        if dict((row[0], row[1]) for row in tournament.playerStandings(tourney_id)).get(player_id) != \
+                "Async Latecomer":
+            raise ValueError("register_player() should return the new player's id.")
+        if await tournament_async.register_players([], tourney_id) != []:
+            raise ValueError("register_players() with no names should register nobody.")
+    finally:
+        tournament.dropTournament(tourney_id)
+    print("1. Each id from register_players() maps to its name.")
+
+
+async def main():
+    try:
+        await testRegisterPlayers()
+    finally:
+        await tournament_async.close_pool()
+    print("Success!  All async tests pass!")
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
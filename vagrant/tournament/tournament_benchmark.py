@@ -0,0 +1,1127 @@
+#!/usr/bin/env python
+#
+# tournament_benchmark.py -- timing harness for tournament.py and tournament.sql
+#
+# Seeds throwaway tournaments into the database used by tournament.py, times
+# the queries under test and removes the seeded rows afterwards.
+#
+# Usage:
+#   python tournament_benchmark.py standings --players 2000 --rounds 8
+#   python tournament_benchmark.py indexes --tournaments 10000 --players 21 --rounds 10
+#   python tournament_benchmark.py pairing --players 64 1000 10000 50000
+#   python tournament_benchmark.py tiebreaks --players 20001 --rounds 10
+#   python tournament_benchmark.py slot --tournaments 500 --players 200 --rounds 4
+#   python tournament_benchmark.py partitions --tournaments 10000 --players 21 --rounds 10
+#   python tournament_benchmark.py streaming --players 1000 10000 100000
+#   python tournament_benchmark.py stress --writers 1 2 4 8 16 32 --calls 200
+#   python tournament_benchmark.py burst --tables 500 --writers 50
+#   python tournament_benchmark.py import --rows 1000000 --players 10000
+#   python tournament_benchmark.py suite --players 11 101 1001 10001 100001 --output results.json
+#
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import resource
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+import tournament
+from instrumentation import profile
+from match_log import MatchLog
+from tournament_import import importFile
+from pairing import PairingPlayer, pairRound
+from tournament import connect, pairAllActiveTournaments, swissPairings
+
+
+# The standings view as it was before the set-based rewrite.  Created as
+# temporary objects so it can be compared against the current schema.
+LEGACY_STANDINGS_SQL = """
+CREATE FUNCTION pg_temp.opponent_wins (player_id integer, tourney integer) RETURNS table(omw BIGINT)
+AS $$
+    DECLARE
+      id INTEGER;
+    BEGIN
+      FOR id in (SELECT
+                       CASE
+                        WHEN player_one_id=player_id AND tourney_id=tourney THEN player_two_id
+                        WHEN player_two_id=player_id AND tourney_id=tourney THEN player_one_id
+                       END AS opponent_id
+                     FROM matches GROUP BY opponent_id)
+        LOOP
+          RETURN QUERY
+          EXECUTE format('SELECT count(*) FROM matches WHERE winner_id=%L AND tourney_id=%L GROUP BY winner_id', id, tourney);
+        END LOOP ;
+    END
+
+$$ LANGUAGE plpgsql;
+
+CREATE TEMP VIEW legacy_standings (id, name, wins, matches, tourney_id, omw) AS
+  SELECT
+    p.id,
+    p.name,
+    player_wins.num_wins as wins,
+    player_matches.num_matches,
+    p.tourney_id,
+    (SELECT sum(omw) FROM pg_temp.opponent_wins(p.id, p.tourney_id)) as omw
+  FROM players as p
+    LEFT JOIN matches as m
+      ON p.id=m.player_one_id
+    LEFT JOIN
+    (SELECT
+       p.id,
+       count(m) as num_matches
+     FROM players as p
+       LEFT JOIN matches as m
+         ON p.id=m.player_one_id OR p.id = m.player_two_id GROUP BY p.id) as player_matches
+      ON p.id=player_matches.id
+    LEFT JOIN
+    (SELECT
+       p2.id,
+       count(m2) as num_wins
+     FROM players as p2
+       LEFT JOIN matches as m2
+         ON p2.id=m2.winner_id GROUP BY p2.id) as player_wins
+      ON p.id=player_wins.id
+  GROUP BY p.id, player_matches.num_matches, player_wins.num_wins ORDER BY p.tourney_id;
+"""
+
+
+def insertMatches(cursor, rows, chunk_size=1000):
+    """Inserts (player_one_id, player_two_id, winner_id, tourney_id) rows in chunks."""
+    for start in range(0, len(rows), chunk_size):
+        values = b",".join(cursor.mogrify("(%s, %s, %s, %s)", row)
+                           for row in rows[start:start + chunk_size])
+        cursor.execute(b"INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id) "
+                       b"VALUES " + values)
+
+
+def simulateRounds(player_ids, rounds, tourney_id, draw_rate=0.05):
+    """Randomly pairs the players for each round and decides every match.
+
+    Returns:
+      A list of (player_one_id, player_two_id, winner_id, tourney_id) rows,
+      including a bye for one player per round when the count is odd.
+    """
+    rows = []
+    player_ids = list(player_ids)
+    for _ in range(rounds):
+        random.shuffle(player_ids)
+        if len(player_ids) % 2 == 1:
+            rows.append((player_ids[-1], None, player_ids[-1], tourney_id))
+        for i in range(0, len(player_ids) - 1, 2):
+            one, two = player_ids[i], player_ids[i + 1]
+            roll = random.random()
+            if roll < draw_rate:
+                winner = None
+            elif roll < (1 + draw_rate) / 2:
+                winner = one
+            else:
+                winner = two
+            rows.append((one, two, winner, tourney_id))
+    return rows
+
+
+def seedTournament(cursor, players, rounds, draw_rate=0.05):
+    """Creates a tournament with `players` players and `rounds` rounds of results.
+
+    Returns:
+      The id of the seeded tournament
+    """
+    cursor.execute("INSERT INTO tournament_tracker DEFAULT VALUES RETURNING id;")
+    tourney_id = cursor.fetchone()[0]
+    cursor.execute("INSERT INTO players (name, tourney_id) "
+                   "SELECT 'Player ' || n, %s FROM generate_series(1, %s) AS n RETURNING id;",
+                   (tourney_id, players))
+    player_ids = [row[0] for row in cursor.fetchall()]
+    insertMatches(cursor, simulateRounds(player_ids, rounds, tourney_id, draw_rate))
+    return tourney_id
+
+
+def dropTournament(cursor, tourney_id):
+    """Removes a seeded tournament and everything registered in it."""
+    cursor.execute("SELECT drop_tournament(%s);", (tourney_id,))
+
+
+def seedManyTournaments(cursor, tournaments, players, rounds):
+    """Bulk-seeds many small tournaments entirely server side.
+
+    Players are shuffled within each tournament every round and paired in
+    order; with an odd player count the last player gets a bye.  The
+    player_stats triggers are disabled while loading and the totals rebuilt
+    afterwards, which is much faster than maintaining them row by row.
+
+    Returns:
+      The list of seeded tournament ids
+    """
+    cursor.execute("INSERT INTO tournament_tracker (id) "
+                   "SELECT nextval('tournament_tracker_id_seq') FROM generate_series(1, %s) RETURNING id;",
+                   (tournaments,))
+    tourney_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("INSERT INTO players (name, tourney_id) "
+                   "SELECT 'Player ' || n, t.id "
+                   "FROM unnest(%s::int[]) AS t(id), generate_series(1, %s) AS n;",
+                   (tourney_ids, players))
+
+    # with the triggers disabled, each match's round has to be given
+    cursor.execute("ALTER TABLE matches DISABLE TRIGGER USER;")
+    for round_number in range(1, rounds + 1):
+        cursor.execute("""
+            WITH shuffled AS (
+              SELECT id, tourney_id,
+                row_number() OVER (PARTITION BY tourney_id ORDER BY random()) AS rn,
+                count(*) OVER (PARTITION BY tourney_id) AS size
+              FROM players WHERE tourney_id=ANY(%(tourney_ids)s)
+            ), paired AS (
+              INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id, round)
+              SELECT a.id, b.id, CASE WHEN random() < 0.5 THEN a.id ELSE b.id END, a.tourney_id, %(round)s
+              FROM shuffled AS a
+                JOIN shuffled AS b
+                  ON a.tourney_id=b.tourney_id AND b.rn=a.rn + 1
+              WHERE a.rn %% 2 = 1
+            )
+            INSERT INTO matches (player_one_id, player_two_id, winner_id, tourney_id, round)
+            SELECT id, NULL, id, tourney_id, %(round)s FROM shuffled
+            WHERE rn=size AND size %% 2 = 1;""", {'tourney_ids': tourney_ids, 'round': round_number})
+    cursor.execute("ALTER TABLE matches ENABLE TRIGGER USER;")
+    cursor.execute("SELECT rebuild_player_stats(t) FROM unnest(%s::int[]) AS t;", (tourney_ids,))
+    return tourney_ids
+
+
+def dropManyTournaments(cursor, tourney_ids):
+    """Removes tournaments seeded by seedManyTournaments()."""
+    cursor.execute("SELECT drop_tournament(t) FROM unnest(%s::int[]) AS t;", (tourney_ids,))
+
+
+def timeQuery(cursor, query, params, repeat):
+    """Runs a query `repeat` times.
+
+    Returns:
+      A tuple of (median seconds, rows from the last run)
+    """
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        start = time.time()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        timings.append(time.time() - start)
+    timings.sort()
+    return timings[len(timings) // 2], rows
+
+
+def benchmarkStandings(args):
+    """Compares the legacy per-row standings view, the set-based
+    tournament_standings() and the trigger-maintained standings view."""
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        tourney_id = seedTournament(cursor, args.players, args.rounds)
+        db.commit()
+        try:
+            cursor.execute(LEGACY_STANDINGS_SQL)
+            legacy_time, legacy_rows = timeQuery(
+                cursor, "SELECT * FROM legacy_standings WHERE tourney_id=(%s);",
+                (tourney_id,), args.repeat)
+            computed_time, computed_rows = timeQuery(
+                cursor, "SELECT * FROM tournament_standings(%s);",
+                (tourney_id,), args.repeat)
+            stored_time, stored_rows = timeQuery(
+                cursor, "SELECT * FROM standings WHERE tourney_id=(%s) "
+                        "ORDER BY wins DESC, omw DESC, id;",
+                (tourney_id,), args.repeat)
+            db.rollback()
+
+            if sorted(legacy_rows) != sorted(computed_rows):
+                raise ValueError("tournament_standings() disagrees with the legacy view.")
+            # player_stats reports 0 rather than NULL when no opponent has won
+            computed_rows = [row[:5] + (row[5] or 0,) for row in computed_rows]
+            if sorted(stored_rows) != sorted(computed_rows):
+                raise ValueError("player_stats disagrees with tournament_standings().")
+
+            print("standings: %d players, %d rounds" % (args.players, args.rounds))
+            print("  legacy view          %10.2f ms" % (legacy_time * 1000))
+            print("  tournament_standings %10.2f ms" % (computed_time * 1000))
+            print("  player_stats read    %10.2f ms" % (stored_time * 1000))
+        finally:
+            dropTournament(cursor, tourney_id)
+            db.commit()
+
+
+# Queries issued by tournament.py and the player_stats triggers, each of
+# which should read only its own tournament's partitions.  Parameters are
+# filled in with a tournament and player from the seeded data.
+HOT_QUERIES = [
+    ("countPlayersFromTournament",
+     "SELECT count(id) FROM players WHERE tourney_id=%(tourney)s;"),
+    ("deletePlayersFromTournament",
+     "DELETE FROM players WHERE tourney_id=%(tourney)s;"),
+    ("findByePlayer",
+     "SELECT player_one_id FROM matches WHERE player_two_id IS NULL AND tourney_id=%(tourney)s;"),
+    ("findPlayerOMW",
+     "SELECT omw FROM player_stats WHERE player_id=%(player)s AND tourney_id=%(tourney)s;"),
+    ("playerStandings",
+     "SELECT * FROM standings WHERE tourney_id=%(tourney)s ORDER BY wins DESC, omw DESC, id;"),
+    ("standingsPage (after_key)",
+     "SELECT s.player_id, (SELECT p.name FROM players AS p WHERE p.tourney_id=%(tourney)s "
+     "AND p.id=s.player_id), s.wins, s.matches, s.tourney_id, s.omw FROM player_stats AS s "
+     "WHERE s.tourney_id=%(tourney)s AND s.wins=1 AND s.omw<5 "
+     "ORDER BY s.wins DESC, s.omw DESC, s.player_id LIMIT 50;"),
+    ("StandingsSubscriber (changed rows)",
+     "SELECT p.id, p.name, s.wins, s.matches, s.tourney_id, s.omw FROM player_stats AS s "
+     "JOIN players AS p ON p.tourney_id=s.tourney_id AND p.id=s.player_id "
+     "WHERE s.tourney_id=%(tourney)s AND s.changed_version > 1 AND s.changed_version <= 2 "
+     "ORDER BY s.wins DESC, s.omw DESC, s.player_id;"),
+    ("standingsAfterRound",
+     "SELECT p.id, p.name, r.wins, r.matches, r.tourney_id, r.omw FROM round_standings AS r "
+     "JOIN players AS p ON p.tourney_id=r.tourney_id AND p.id=r.player_id "
+     "WHERE r.tourney_id=%(tourney)s AND r.round=1 ORDER BY r.wins DESC, r.omw DESC, r.player_id;"),
+    ("tournament_standings()",
+     "SELECT player_one_id, player_two_id, winner_id FROM matches WHERE tourney_id=%(tourney)s;"),
+    ("player_stats trigger (rematch check)",
+     "SELECT 1 FROM matches WHERE tourney_id=%(tourney)s AND "
+     "((player_one_id=%(player)s AND player_two_id=%(opponent)s) OR "
+     "(player_one_id=%(opponent)s AND player_two_id=%(player)s));"),
+    ("player_stats trigger (winner's opponents)",
+     "SELECT player_two_id FROM matches WHERE tourney_id=%(tourney)s AND player_one_id=%(player)s "
+     "UNION SELECT player_one_id FROM matches WHERE tourney_id=%(tourney)s AND player_two_id=%(player)s;"),
+]
+
+
+# Tables partitioned by tournament, and the names of their partitions
+PARTITIONED_TABLES = ['players', 'matches', 'player_stats', 'round_standings']
+PARTITION_PATTERN = re.compile(r'^(%s)_\d+$' % '|'.join(PARTITIONED_TABLES))
+
+
+def scannedRelation(scan):
+    """Returns the table or partition named by an EXPLAIN scan line, or None."""
+    if ' on ' not in scan:
+        return None
+    return scan.split(' on ', 1)[1].split()[0]
+
+
+def isScoped(scan, tourney_id):
+    """Checks one scan of a hot query's plan.
+
+    Partitions of other tournaments must have been pruned away, and a
+    sequential scan is only acceptable over the tournament's own partition.
+    """
+    relation = scannedRelation(scan)
+    if relation is None:
+        return True
+    own = relation.endswith("_%d" % tourney_id)
+    partition = PARTITION_PATTERN.match(relation) is not None
+    if partition and not own:
+        return False
+    return 'Seq Scan' not in scan or own
+
+
+def benchmarkIndexes(args):
+    """Seeds a large database and checks that every hot query reads only its
+    tournament's partitions, through an index or a scan of its own partition."""
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        tourney_ids = seedManyTournaments(cursor, args.tournaments, args.players, args.rounds)
+        db.commit()
+        try:
+            cursor.execute("ANALYZE players; ANALYZE matches; ANALYZE player_stats;")
+            cursor.execute("SELECT count(*) FROM matches;")
+            print("indexes: %d matches in %d seeded tournaments" % (cursor.fetchone()[0], len(tourney_ids)))
+
+            tourney_id = tourney_ids[len(tourney_ids) // 2]
+            cursor.execute("SELECT player_one_id, player_two_id FROM matches "
+                           "WHERE tourney_id=(%s) AND player_two_id IS NOT NULL LIMIT 1;", (tourney_id,))
+            player_id, opponent_id = cursor.fetchone()
+            params = {'tourney': tourney_id, 'player': player_id, 'opponent': opponent_id}
+
+            failures = 0
+            for name, query in HOT_QUERIES:
+                cursor.execute("EXPLAIN " + query, params)
+                plan = [row[0] for row in cursor.fetchall()]
+                scans = [line.strip().lstrip('-> ') for line in plan if 'Scan' in line]
+                scoped = all(isScoped(scan, tourney_id) for scan in scans)
+                if not scoped:
+                    failures += 1
+                print("  %-4s %-42s %s" % ("ok" if scoped else "FAIL", name, "; ".join(scans)))
+            db.rollback()
+        finally:
+            if not args.keep:
+                dropManyTournaments(cursor, tourney_ids)
+                db.commit()
+
+    if failures:
+        raise SystemExit("%d hot queries read outside their tournament's partitions" % failures)
+
+
+def explainTimes(cursor, query, params):
+    """Runs EXPLAIN ANALYZE on a query.
+
+    Returns:
+      A tuple of (planning ms, execution ms, number of partitions scanned)
+    """
+    cursor.execute("EXPLAIN ANALYZE " + query, params)
+    plan = [row[0] for row in cursor.fetchall()]
+    times = {}
+    for line in plan:
+        match = re.match(r'^(Planning|Execution) Time: ([\d.]+) ms', line.strip())
+        if match:
+            times[match.group(1)] = float(match.group(2))
+    partitions = set(relation for relation in (scannedRelation(line.strip().lstrip('-> ')) for line in plan)
+                     if relation is not None and PARTITION_PATTERN.match(relation))
+    return times.get('Planning'), times.get('Execution'), len(partitions)
+
+
+def benchmarkPartitions(args):
+    """Seeds many historical tournaments, then compares deleting a tournament
+    row by row with dropping its partitions, and times a pruned standings read."""
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        tourney_ids = seedManyTournaments(cursor, args.tournaments, args.players, args.rounds)
+        db.commit()
+        try:
+            cursor.execute("ANALYZE players; ANALYZE matches; ANALYZE player_stats;")
+            db.commit()
+            print("partitions: %d tournaments of %d players after %d rounds" % (
+                len(tourney_ids), args.players, args.rounds))
+
+            planning, execution, partitions = explainTimes(
+                cursor, "SELECT * FROM standings WHERE tourney_id=%s ORDER BY wins DESC, omw DESC, id;",
+                (tourney_ids[len(tourney_ids) // 2],))
+            print("  %-40s %8.2f ms planning %8.2f ms execution, %d partitions" % (
+                "playerStandings", planning or 0, execution or 0, partitions))
+
+            sample = random.sample(tourney_ids, min(args.samples * 2, len(tourney_ids)))
+            deleted, dropped = sample[:len(sample) // 2], sample[len(sample) // 2:]
+            timings = []
+            for tourney_id in deleted:
+                start = time.time()
+                cursor.execute("DELETE FROM matches WHERE tourney_id=(%s);", (tourney_id,))
+                cursor.execute("DELETE FROM players WHERE tourney_id=(%s);", (tourney_id,))
+                db.commit()
+                timings.append(time.time() - start)
+            print("  %-40s %8.2f ms" % ("row-by-row DELETE, median", sorted(timings)[len(timings) // 2] * 1000))
+
+            timings = []
+            for tourney_id in dropped:
+                start = time.time()
+                cursor.execute("SELECT drop_tournament(%s);", (tourney_id,))
+                db.commit()
+                timings.append(time.time() - start)
+            print("  %-40s %8.2f ms" % ("drop_tournament(), median", sorted(timings)[len(timings) // 2] * 1000))
+            dropped = set(dropped)
+            tourney_ids = [tourney_id for tourney_id in tourney_ids if tourney_id not in dropped]
+        finally:
+            dropManyTournaments(cursor, tourney_ids)
+            db.commit()
+
+
+def simulatePairedTournament(players, rounds):
+    """Plays a whole tournament in memory, pairing every round with pairRound().
+
+    Returns:
+      A tuple of (seconds spent pairing each round, number of rematches)
+    """
+    wins = [0] * players
+    opponents = [set() for _ in range(players)]
+    had_bye = [False] * players
+    timings = []
+    rematches = 0
+    for _ in range(rounds):
+        order = sorted(range(players), key=lambda i: (-wins[i], i))
+        standings = [PairingPlayer(i, "Player %d" % i, wins[i], opponents[i], had_bye[i])
+                     for i in order]
+        start = time.time()
+        pairs, bye = pairRound(standings)
+        timings.append(time.time() - start)
+
+        for one, two in pairs:
+            if two.id in opponents[one.id]:
+                rematches += 1
+            opponents[one.id].add(two.id)
+            opponents[two.id].add(one.id)
+            wins[random.choice((one.id, two.id))] += 1
+        if bye is not None:
+            had_bye[bye.id] = True
+            wins[bye.id] += 1
+    return timings, rematches
+
+
+def benchmarkPairing(args):
+    """Times pairRound() for every round of simulated tournaments."""
+    print("pairing: %8s %7s %12s %12s %10s" % ("players", "rounds", "mean ms", "max ms", "rematches"))
+    for players in args.players:
+        rounds = args.rounds or int(math.ceil(math.log(players, 2)))
+        timings, rematches = simulatePairedTournament(players, rounds)
+        print("         %8d %7d %12.2f %12.2f %10d" % (
+            players, rounds, sum(timings) / len(timings) * 1000, max(timings) * 1000, rematches))
+
+
+def peakMemory(function):
+    """Calls function and returns (seconds, peak bytes allocated by Python, or None)."""
+    try:
+        import tracemalloc
+    except ImportError:
+        tracemalloc = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+    start = time.time()
+    function()
+    elapsed = time.time() - start
+    if tracemalloc is None:
+        return elapsed, None
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+PLAN_CHECK_PLAYERS = 10000
+
+
+def planNodes(plan):
+    """Returns (depth, node) pairs for the nodes of an EXPLAIN plan, outermost first."""
+    nodes = []
+    for line in plan:
+        stripped = line.lstrip()
+        if stripped.startswith('->'):
+            nodes.append((len(line) - len(stripped), stripped[2:].split('  (')[0].strip()))
+        elif not nodes:
+            nodes.append((0, stripped.split('  (')[0].strip()))
+    return nodes
+
+
+def followsIndex(plan, limited):
+    """Checks that a standings read walks the standings index in order.
+
+    Nothing may be read by a sequential scan or hashed, so every row and
+    every player's name comes from an index scan.  A page must
+    stop each index scan under a Limit, and sort nothing but the limited
+    parts it merges; a stream must sort nothing at all.
+    """
+    nodes = planNodes(plan)
+    for i, (depth, node) in enumerate(nodes):
+        ancestors, level = [], depth
+        for above_depth, above in reversed(nodes[:i]):
+            if above_depth < level:
+                ancestors.append(above)
+                level = above_depth
+        descendants = []
+        for below_depth, below in nodes[i + 1:]:
+            if below_depth <= depth:
+                break
+            descendants.append(below)
+        if 'Seq Scan' in node or 'Hash' in node:
+            return False
+        if 'Sort' in node and not (limited and any(below.startswith('Limit') for below in descendants)):
+            return False
+        if 'Index' in node and limited and not any(above.startswith('Limit') for above in ancestors):
+            return False
+    return any('Index' in node for _, node in nodes)
+
+
+def benchmarkStreaming(args):
+    """Compares reading whole standings with streaming and paging them, at growing sizes.
+
+    First checks that pages and streams are planned as ordered index scans,
+    so that their cost does not grow with the tournament.  Tournaments under
+    PLAN_CHECK_PLAYERS are not checked, as sorting one of them in memory is
+    as cheap as reading it in order.
+    """
+    print("streaming: %8s %-34s %10s %12s" % ("players", "read", "ms", "peak KiB"))
+    failures = 0
+    for players in args.players:
+        with closing(connect()) as db:
+            cursor = db.cursor()
+            [tourney_id] = seedManyTournaments(cursor, 1, players, args.rounds)
+            db.commit()
+        try:
+            middle = tournament.standingsPage(tourney_id, limit=1, offset=players // 2)[0]
+
+            live = tournament.LIVE_STANDINGS_SQL
+            plans = [] if players < PLAN_CHECK_PLAYERS else [
+                ("topK(10)", "EXPLAIN ", tournament.standingsQuery(live, tourney_id, 10), True),
+                ("standingsPage() after_key", "EXPLAIN ", tournament.standingsQuery(
+                    live, tourney_id, 50, after_key=tournament.standingsKey(middle)), True),
+                ("iterStandings()", "EXPLAIN DECLARE standings_plan CURSOR FOR ",
+                 tournament.standingsQuery(live, tourney_id), False),
+            ]
+            with closing(connect()) as db:
+                cursor = db.cursor()
+                cursor.execute("ANALYZE players; ANALYZE player_stats;")
+                for name, explain, (query, params), limited in plans:
+                    cursor.execute(explain + query, params)
+                    ordered = followsIndex([row[0] for row in cursor.fetchall()], limited)
+                    if not ordered:
+                        failures += 1
+                    print("           %8d %-34s %23s" % (players, "plan of " + name,
+                                                          "index order" if ordered else "FAIL"))
+                db.rollback()
+
+            def firstRow():
+                rows = tournament.iterStandings(tourney_id, args.batch_size)
+                next(rows)
+                rows.close()
+
+            reads = [
+                ("playerStandings()", lambda: tournament.playerStandings(tourney_id)),
+                ("iterStandings() to the first row", firstRow),
+                ("iterStandings() to the last row", lambda: sum(1 for _ in tournament.iterStandings(
+                    tourney_id, args.batch_size))),
+                ("topK(10)", lambda: tournament.topK(tourney_id, 10)),
+                ("standingsPage() halfway, after_key", lambda: tournament.standingsPage(
+                    tourney_id, after_key=tournament.standingsKey(middle))),
+                ("standingsPage() halfway, offset", lambda: tournament.standingsPage(
+                    tourney_id, offset=players // 2)),
+            ]
+            for name, read in reads:
+                tournament._standings_cache.clear()
+                elapsed, peak = peakMemory(read)
+                print("           %8d %-34s %10.2f %12s" % (
+                    players, name, elapsed * 1000, "-" if peak is None else "%d" % (peak // 1024)))
+        finally:
+            with closing(connect()) as db:
+                cursor = db.cursor()
+                dropManyTournaments(cursor, [tourney_id])
+                db.commit()
+
+    if failures:
+        raise SystemExit("%d standings reads are not planned in index order" % failures)
+
+
+def benchmarkTiebreaks(args):
+    """Times computeTiebreaks() and rankPlayers() on simulated match arrays."""
+    import tiebreaks
+
+    player_ids = list(range(1, args.players + 1))
+    rows = simulateRounds(player_ids, args.rounds, None)
+    player_one_ids = [row[0] for row in rows]
+    player_two_ids = [-1 if row[1] is None else row[1] for row in rows]
+    winner_ids = [-1 if row[2] is None else row[2] for row in rows]
+    order = ('wins', 'omw', 'buchholz', 'sonneborn_berger')
+
+    compute, rank = [], []
+    for _ in range(args.repeat):
+        start = time.time()
+        totals = tiebreaks.computeTiebreaks(player_ids, player_one_ids, player_two_ids, winner_ids)
+        compute.append(time.time() - start)
+        start = time.time()
+        tiebreaks.rankPlayers(player_ids, totals, order)
+        rank.append(time.time() - start)
+
+    print("tiebreaks: %d players, %d matches" % (len(player_ids), len(rows)))
+    print("  computeTiebreaks  %8.2f ms" % (min(compute) * 1000))
+    print("  rankPlayers       %8.2f ms" % (min(rank) * 1000))
+
+
+def benchmarkSlot(args):
+    """Times pairing a round slot of many tournaments serially and with process pools.
+
+    Seeded tournaments have an even number of players, so no byes are
+    recorded and every run pairs the same standings.
+    """
+    players = args.players + args.players % 2
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        tourney_ids = seedManyTournaments(cursor, args.tournaments, players, args.rounds)
+        db.commit()
+        try:
+            print("slot: %d tournaments of %d players after %d rounds" % (len(tourney_ids), players, args.rounds))
+            start = time.time()
+            for tourney_id in tourney_ids:
+                swissPairings(tourney_id)
+            print("  %-34s %10.2f s" % ("swissPairings() per tournament", time.time() - start))
+
+            processes = 1
+            while True:
+                start = time.time()
+                pairings, failures = pairAllActiveTournaments(processes, tourney_ids)
+                elapsed = time.time() - start
+                if failures or len(pairings) != len(tourney_ids):
+                    raise SystemExit("%d tournaments could not be paired" % len(failures))
+                print("  %-34s %10.2f s" % ("pairAllActiveTournaments(%d)" % processes, elapsed))
+                if processes >= args.processes:
+                    break
+                processes = min(processes * 2, args.processes)
+        finally:
+            dropManyTournaments(cursor, tourney_ids)
+            db.commit()
+
+
+# Tables whose pg_stat_user_tables counters make up "rows scanned", along
+# with the partitions of PARTITIONED_TABLES, where partitioned tables'
+# counters are kept.
+SCANNED_TABLES = ['tournament_tracker', 'rounds', 'archived_standings', 'match_log_marks']
+
+# Statistics are reported to the cumulative statistics system asynchronously;
+# wait this long before reading them so a benchmark's own activity shows up.
+STATS_SETTLE_SECONDS = 1.0
+
+
+def rowsScanned(cursor):
+    """Returns the rows read so far by sequential and index scans of the tournament tables."""
+    time.sleep(STATS_SETTLE_SECONDS)
+    cursor.execute("SELECT pg_stat_clear_snapshot();")
+    cursor.execute("SELECT coalesce(sum(coalesce(seq_tup_read, 0) + coalesce(idx_tup_fetch, 0)), 0) "
+                   "FROM pg_stat_user_tables WHERE relname=ANY(%s) OR relname ~ %s;",
+                   (SCANNED_TABLES, PARTITION_PATTERN.pattern))
+    return int(cursor.fetchone()[0])
+
+
+def percentile(timings, fraction):
+    timings = sorted(timings)
+    return timings[min(int(len(timings) * fraction), len(timings) - 1)]
+
+
+def measure(cursor, name, players, matches, calls, setup, call):
+    """Times `calls` calls of one entry point.
+
+    `setup` runs before each call, outside the timing and the query count.
+
+    Returns:
+      A result dict ready to be written out as JSON
+    """
+    timings = []
+    queries = 0
+    before = rowsScanned(cursor)
+    for _ in range(calls):
+        arguments = setup()
+        with profile() as result:
+            start = time.time()
+            call(*arguments)
+            timings.append(time.time() - start)
+        queries += len(result.queries)
+    scanned = rowsScanned(cursor) - before
+    return {
+        'function': name,
+        'players': players,
+        'matches': matches,
+        'calls': calls,
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'p50_ms': percentile(timings, 0.50) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'queries_per_call': float(queries) / calls,
+        # approximate: includes setup and any other sessions' activity
+        'rows_scanned_per_call': float(scanned) / calls,
+    }
+
+
+def suiteForTournament(cursor, db, players, rounds, repeat):
+    """Seeds one tournament and measures every entry point of tournament.py against it."""
+    tourney_id = seedTournament(cursor, players, rounds)
+    cursor.execute("SELECT id FROM players WHERE tourney_id=(%s);", (tourney_id,))
+    player_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT count(*), coalesce(max(id), 0) FROM matches WHERE tourney_id=(%s);", (tourney_id,))
+    matches, last_seeded_match = cursor.fetchone()
+    db.commit()
+
+    def nothing():
+        return ()
+
+    def randomMatch():
+        one, two = random.sample(player_ids, 2)
+        return one, two, random.choice((one, two, None)), tourney_id
+
+    log_id = 'benchmark-%s' % tourney_id
+    seqs = itertools.count(1)
+
+    def loggedMatch():
+        one, two, winner, _ = randomMatch()
+        return log_id, [(next(seqs), tourney_id, one, two, winner)]
+
+    def uncached():
+        tournament._standings_cache.clear()
+        return (tourney_id,)
+
+    def undoBye():
+        # swissPairings() records a bye for odd fields; take it back so
+        # every call pairs the same standings
+        cursor.execute("DELETE FROM matches WHERE tourney_id=(%s) AND player_two_id IS NULL AND id > %s;",
+                       (tourney_id, last_seeded_match))
+        db.commit()
+        return (tourney_id,)
+
+    standings = tournament.playerStandings(tourney_id)
+    entry_points = [
+        ('registerPlayer', repeat, nothing, lambda: tournament.registerPlayer("Bench Player", tourney_id)),
+        ('reportMatch', repeat, randomMatch, tournament.reportMatch),
+        ('reportLoggedMatches', repeat, loggedMatch, tournament.reportLoggedMatches),
+        ('playerStandings', repeat, uncached, tournament.playerStandings),
+        ('playerStandings (cached)', repeat, lambda: (tourney_id,), tournament.playerStandings),
+        ('findByePlayer', repeat, lambda: (standings, tourney_id), tournament.findByePlayer),
+        ('swissPairings', repeat, undoBye, tournament.swissPairings),
+        ('countPlayersFromTournament', repeat, lambda: (tourney_id,), tournament.countPlayersFromTournament),
+        ('closeRound', repeat, lambda: (tourney_id,), tournament.closeRound),
+        ('standingsAfterRound', repeat, lambda: (tourney_id, 1), tournament.standingsAfterRound),
+        ('deleteMatchesFromTournament', 1, lambda: (tourney_id,), tournament.deleteMatchesFromTournament),
+        ('deletePlayersFromTournament', 1, lambda: (tourney_id,), tournament.deletePlayersFromTournament),
+    ]
+
+    results = []
+    try:
+        for name, calls, setup, call in entry_points:
+            result = measure(cursor, name, len(player_ids), matches, calls, setup, call)
+            db.commit()
+            results.append(result)
+            print("  %-30s %8d %10.2f %10.2f %10.2f %12.1f" % (
+                name, len(player_ids), result['p50_ms'], result['p99_ms'],
+                result['queries_per_call'], result['rows_scanned_per_call']))
+    finally:
+        db.rollback()
+        dropTournament(cursor, tourney_id)
+        cursor.execute("DELETE FROM match_log_marks WHERE log_id=%s;", (log_id,))
+        db.commit()
+    return results
+
+
+def stressWriters(writers, calls, operation):
+    """Calls `operation` `calls` times from each of `writers` threads, all
+    started together.
+
+    Returns:
+      A tuple of (seconds, values returned, exceptions raised)
+    """
+    returned, errors = [], []
+    start = threading.Event()
+
+    def writer(index):
+        start.wait()
+        for _ in range(calls):
+            try:
+                returned.append(operation(index))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+    for thread in threads:
+        thread.start()
+    began = time.time()
+    start.set()
+    for thread in threads:
+        thread.join()
+    return time.time() - began, returned, errors
+
+
+def benchmarkStress(args):
+    """Creates tournaments and registers players from growing numbers of
+    concurrent threads, checking that every id handed out is distinct.
+
+    Each writer registers players into a tournament of its own, so writers
+    only share the sequences and the connection pool.  Tournament creation
+    is serialized (see createNewTournament()), so its speedup is expected to
+    stay near 1x.
+    """
+    tournament.configurePool(minconn=1, maxconn=max(args.writers))
+    created = []
+    failures = 0
+    try:
+        rosters = [tournament.createNewTournament() for _ in range(max(args.writers))]
+        created.extend(rosters)
+        operations = [
+            ('createNewTournament', lambda index: tournament.createNewTournament()),
+            ('registerPlayer', lambda index: tournament.registerPlayer("Stress Player", rosters[index])),
+        ]
+        print("  %-20s %7s %10s %8s %10s %7s" % ("function", "writers", "calls/s", "speedup", "duplicates", "errors"))
+        for name, operation in operations:
+            single = None
+            for writers in args.writers:
+                seconds, ids, errors = stressWriters(writers, args.calls, operation)
+                if name == 'createNewTournament':
+                    created.extend(ids)
+                throughput = len(ids) / seconds
+                if single is None:
+                    single = throughput / writers
+                duplicates = len(ids) - len(set(ids))
+                failures += duplicates + len(errors)
+                print("  %-20s %7d %10.0f %7.2fx %10d %7d" % (
+                    name, writers, throughput, throughput / single, duplicates, len(errors)))
+                for error in errors[:3]:
+                    print("    %s: %s" % (type(error).__name__, error))
+    finally:
+        with closing(connect()) as db:
+            cursor = db.cursor()
+            dropManyTournaments(cursor, created)
+            db.commit()
+
+    if failures:
+        raise SystemExit("%d duplicate ids or failed calls under concurrent writers" % failures)
+
+
+def benchmarkBurst(args):
+    """Reports a round's results from many threads at once, as when every
+    table finishes together, through reportMatch() and through a MatchLog.
+
+    Prints the latency callers see, how long until every caller had its
+    answer and how long until every result was recorded in the database.
+    """
+    tournament.configurePool(minconn=1, maxconn=args.writers)
+    directory = tempfile.mkdtemp()
+    created, log_ids = [], []
+    calls = args.tables // args.writers
+    try:
+        print("  %-12s %7s %8s %8s %8s %10s %12s" % (
+            "path", "tables", "p50 ms", "p99 ms", "max ms", "answered s", "recorded s"))
+        for name in ('reportMatch', 'MatchLog'):
+            tourney_id = tournament.createNewTournament()
+            created.append(tourney_id)
+            player_ids = tournament.registerPlayers(
+                ["Burst Player %d" % n for n in range(calls * args.writers * 2)], tourney_id)
+            tables = list(zip(player_ids[0::2], player_ids[1::2]))
+            queues = [iter(tables[index::args.writers]) for index in range(args.writers)]
+            timings = []
+
+            log = None
+            report = tournament.reportMatch
+            if name == 'MatchLog':
+                log = MatchLog(os.path.join(directory, 'matches.log'))
+                log_ids.append(log.log_id)
+                report = log.reportMatch
+
+            def operation(index):
+                one, two = next(queues[index])
+                began = time.time()
+                report(one, two, one, tourney_id)
+                timings.append(time.time() - began)
+
+            seconds, _, errors = stressWriters(args.writers, calls, operation)
+            recorded = seconds
+            if log is not None:
+                began = time.time()
+                log.close()
+                recorded += time.time() - began
+                errors.extend(error for (_, error) in log.rejected)
+            if errors:
+                raise SystemExit("%s failed: %s" % (name, errors[0]))
+            print("  %-12s %7d %8.2f %8.2f %8.2f %10.2f %12.2f" % (
+                name, len(tables), percentile(timings, 0.5) * 1000, percentile(timings, 0.99) * 1000,
+                max(timings) * 1000, seconds, recorded))
+    finally:
+        shutil.rmtree(directory)
+        with closing(connect()) as db:
+            cursor = db.cursor()
+            dropManyTournaments(cursor, created)
+            cursor.execute("DELETE FROM match_log_marks WHERE log_id=ANY(%s);", (log_ids,))
+            db.commit()
+
+
+def writeImportFile(path, format, rows, players, draw_rate=0.05):
+    """Writes a roster of `players` players followed by random results, `rows`
+    rows in all, as a CSV or NDJSON file for tournament_import.py."""
+    with open(path, 'w') as import_file:
+        if format == 'csv':
+            import_file.write("type,name,player_one,player_two,winner\n")
+        for n in range(rows):
+            if n < players:
+                row = {'type': 'player', 'name': 'Player %d' % n}
+            else:
+                one, two = random.sample(range(players), 2)
+                winner = None if random.random() < draw_rate else random.choice((one, two))
+                row = {'type': 'match', 'player_one': 'Player %d' % one, 'player_two': 'Player %d' % two,
+                       'winner': None if winner is None else 'Player %d' % winner}
+            if format == 'csv':
+                import_file.write("%s,%s,%s,%s,%s\n" % tuple(row.get(key) or '' for key in
+                                  ('type', 'name', 'player_one', 'player_two', 'winner')))
+            else:
+                import_file.write(json.dumps(row) + "\n")
+
+
+def benchmarkImport(args):
+    """Imports a generated file of `rows` rows in each format, and times the
+    same kind of rows registered and reported one call at a time.
+
+    Peak memory is read after each import; it should not grow with the file.
+    """
+    directory = tempfile.mkdtemp()
+    created = []
+    try:
+        print("  %-24s %9s %10s %10s %12s" % ("path", "rows", "seconds", "rows/s", "peak rss MB"))
+        for format in ('csv', 'ndjson'):
+            path = os.path.join(directory, 'import.' + format)
+            writeImportFile(path, format, args.rows, args.players)
+            tourney_id = tournament.createNewTournament()
+            created.append(tourney_id)
+            began = time.time()
+            report = importFile(path, tourney_id, format)
+            seconds = time.time() - began
+            if report.rejected or report.players + report.matches != args.rows:
+                raise SystemExit("%s import rejected %d rows: %s" % (format, report.rejected, report.errors[:3]))
+            # ru_maxrss is in kilobytes on Linux
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+            print("  %-24s %9d %10.2f %10.0f %12.1f" % (
+                "importFile (%s)" % format, args.rows, seconds, args.rows / seconds, peak))
+            os.remove(path)
+
+        tourney_id = tournament.createNewTournament()
+        created.append(tourney_id)
+        players = min(args.players, args.baseline_rows // 2)
+        began = time.time()
+        player_ids = [tournament.registerPlayer('Player %d' % n, tourney_id) for n in range(players)]
+        for _ in range(args.baseline_rows - players):
+            one, two = random.sample(player_ids, 2)
+            tournament.reportMatch(one, two, random.choice((one, two)), tourney_id)
+        seconds = time.time() - began
+        print("  %-24s %9d %10.2f %10.0f" % (
+            "registerPlayer/reportMatch", args.baseline_rows, seconds, args.baseline_rows / seconds))
+    finally:
+        shutil.rmtree(directory)
+        with closing(connect()) as db:
+            cursor = db.cursor()
+            dropManyTournaments(cursor, created)
+            db.commit()
+
+
+def gitCommit():
+    """Returns the commit the benchmark was run from, or None outside a checkout."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD']).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compareResults(results, baseline_path):
+    """Prints how each p50 changed against a previous run's JSON output."""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = dict(((r['function'], r['players']), r) for r in baseline['results'])
+    print("compared with %s (commit %s):" % (baseline_path, baseline.get('commit')))
+    for result in results:
+        old = previous.get((result['function'], result['players']))
+        if old is None or not old['p50_ms']:
+            continue
+        print("  %-30s %8d %+9.1f%% p50" % (
+            result['function'], result['players'], (result['p50_ms'] / old['p50_ms'] - 1) * 100))
+
+
+def benchmarkSuite(args):
+    """Times every entry point of tournament.py over seeded tournaments of each size."""
+    results = []
+    with closing(connect()) as db:
+        cursor = db.cursor()
+        cursor.execute("SHOW server_version;")
+        server_version = cursor.fetchone()[0]
+        db.commit()
+        print("  %-30s %8s %10s %10s %10s %12s" % (
+            "function", "players", "p50 ms", "p99 ms", "queries", "rows scanned"))
+        for players in args.players:
+            results.extend(suiteForTournament(cursor, db, players, args.rounds, args.repeat))
+
+    output = {
+        'commit': gitCommit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'server_version': server_version,
+        'rounds': args.rounds,
+        'results': results,
+    }
+    with open(args.output, 'w') as output_file:
+        json.dump(output, output_file, indent=2, sort_keys=True)
+    print("suite: wrote %d results to %s" % (len(results), args.output))
+
+    if args.baseline:
+        compareResults(results, args.baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for tournament.py")
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+
+    standings = subparsers.add_parser(
+        'standings', help='legacy standings view vs. tournament_standings() vs. player_stats')
+    standings.add_argument('--players', type=int, default=2000)
+    standings.add_argument('--rounds', type=int, default=8)
+    standings.add_argument('--repeat', type=int, default=3)
+    standings.set_defaults(run=benchmarkStandings)
+
+    indexes = subparsers.add_parser(
+        'indexes', help='EXPLAIN every hot query against a large seeded database')
+    indexes.add_argument('--tournaments', type=int, default=10000)
+    indexes.add_argument('--players', type=int, default=21)
+    indexes.add_argument('--rounds', type=int, default=10)
+    indexes.add_argument('--keep', action='store_true',
+                         help='leave the seeded tournaments in the database')
+    indexes.set_defaults(run=benchmarkIndexes)
+
+    pairing = subparsers.add_parser(
+        'pairing', help='time the pairing engine per round, without a database')
+    pairing.add_argument('--players', type=int, nargs='+', default=[64, 1000, 10000, 50000])
+    pairing.add_argument('--rounds', type=int, default=None,
+                         help='rounds to play (default: log2 of the player count)')
+    pairing.set_defaults(run=benchmarkPairing)
+
+    tiebreaks = subparsers.add_parser(
+        'tiebreaks', help='time the vectorized tiebreaks over simulated matches, without a database')
+    tiebreaks.add_argument('--players', type=int, default=20001)
+    tiebreaks.add_argument('--rounds', type=int, default=10)
+    tiebreaks.add_argument('--repeat', type=int, default=5)
+    tiebreaks.set_defaults(run=benchmarkTiebreaks)
+
+    slot = subparsers.add_parser(
+        'slot', help='pair a round slot of many tournaments serially and with process pools')
+    slot.add_argument('--tournaments', type=int, default=500)
+    slot.add_argument('--players', type=int, default=200)
+    slot.add_argument('--rounds', type=int, default=4)
+    slot.add_argument('--processes', type=int, default=multiprocessing.cpu_count(),
+                      help='the most worker processes to try (default: CPU count)')
+    slot.set_defaults(run=benchmarkSlot)
+
+    partitions = subparsers.add_parser(
+        'partitions', help='row-by-row deletes vs. partition drops among many historical tournaments')
+    partitions.add_argument('--tournaments', type=int, default=10000)
+    partitions.add_argument('--players', type=int, default=21)
+    partitions.add_argument('--rounds', type=int, default=10)
+    partitions.add_argument('--samples', type=int, default=20,
+                            help='tournaments removed each way')
+    partitions.set_defaults(run=benchmarkPartitions)
+
+    streaming = subparsers.add_parser(
+        'streaming', help='whole standings vs. streamed and paged standings, at growing sizes')
+    streaming.add_argument('--players', type=int, nargs='+', default=[1000, 10000, 100000])
+    streaming.add_argument('--rounds', type=int, default=5)
+    streaming.add_argument('--batch-size', type=int, default=1000)
+    streaming.set_defaults(run=benchmarkStreaming)
+
+    stress = subparsers.add_parser(
+        'stress', help='create tournaments and register players from many threads at once')
+    stress.add_argument('--writers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                        help='numbers of concurrent writer threads to try')
+    stress.add_argument('--calls', type=int, default=200, help='calls made by each writer')
+    stress.set_defaults(run=benchmarkStress)
+
+    burst = subparsers.add_parser(
+        'burst', help='report a whole round at once through reportMatch() and through a MatchLog')
+    burst.add_argument('--tables', type=int, default=500, help='matches in the round')
+    burst.add_argument('--writers', type=int, default=50, help='threads reporting at once')
+    burst.set_defaults(run=benchmarkBurst)
+
+    imports = subparsers.add_parser(
+        'import', help='import a large generated CSV and NDJSON file and compare with one call per row')
+    imports.add_argument('--rows', type=int, default=1000000, help='rows in each generated file')
+    imports.add_argument('--players', type=int, default=10000, help='roster rows among them')
+    imports.add_argument('--baseline-rows', type=int, default=10000,
+                         help='rows to register and report one call at a time for comparison')
+    imports.set_defaults(run=benchmarkImport)
+
+    suite = subparsers.add_parser(
+        'suite', help='time every tournament.py entry point at several sizes and write JSON')
+    suite.add_argument('--players', type=int, nargs='+', default=[11, 101, 1001, 10001, 100001],
+                       help='tournament sizes to seed; odd sizes exercise byes')
+    suite.add_argument('--rounds', type=int, default=3)
+    suite.add_argument('--repeat', type=int, default=20, help='calls timed per entry point')
+    suite.add_argument('--output', default='benchmark-results.json')
+    suite.add_argument('--baseline', default=None,
+                       help='a previous --output file to compare p50 latencies against')
+    suite.set_defaults(run=benchmarkSuite)
+
+    args = parser.parse_args()
+    random.seed(0)
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
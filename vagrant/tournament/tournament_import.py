@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+#
+# tournament_import.py -- bulk import of rosters and results
+#
+# Streams a CSV or NDJSON file of players and/or matches into a tournament
+# through tournament.importRecords(), which loads it with COPY.  The file is
+# read, validated and sent on a row at a time by a pipeline of generators,
+# so memory use does not grow with the file, and rows that fail validation
+# are reported instead of stopping the import.
+#
+# Each row is a player, with a `name`, or a match, with `player_one`,
+# `player_two` and `winner` naming its players; leave `player_two` empty for
+# a bye and `winner` empty for a draw.  A `type` column of "player" or
+# "match" says which, or else rows with a name are players.  Matches may
+# name players registered anywhere in the file or already in the tournament.
+#
+# Usage:
+#   python tournament_import.py roster.csv --tournament 3
+#   python tournament_import.py results.ndjson --tournament 3 --max-errors 20
+#
+
+import argparse
+import csv
+import json
+import os
+
+import tournament
+
+# The format of a file without --format, by extension
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+_TEXT = (str, type(u''))
+
+
+class ImportReport(object):
+    """What an import did.
+
+    Attributes:
+      players: the number of players registered
+      matches: the number of matches recorded
+      rejected: the number of rows left out
+      errors: (line, message) tuples for the first `max_errors` rows left
+        out, in line order
+    """
+
+    def __init__(self, max_errors=100):
+        self.max_errors = max_errors
+        self.players = 0
+        self.matches = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, line, message):
+        """Counts a row as left out, keeping its message if there is room."""
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+
+def readRows(stream, format, report):
+    """Yields (line, row) for each row of a CSV or NDJSON stream, where row
+    is a dict of its fields, rejecting lines that cannot be read.
+
+    Raises:
+      ValueError: if a CSV file has neither a name nor a player_one column
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        if not set(reader.fieldnames or ()) & set(['name', 'player_one']):
+            raise ValueError("A CSV import needs a name or a player_one column.")
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                report.reject(reader.line_num, str(e))
+                continue
+            yield reader.line_num, row
+    elif format == 'ndjson':
+        for line, text in enumerate(stream, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                report.reject(line, "Invalid JSON: %s" % e)
+                continue
+            if not isinstance(row, dict):
+                report.reject(line, "Expected a JSON object, got %s." % text.strip())
+                continue
+            yield line, row
+    else:
+        raise ValueError("Unknown import format %r; expected csv or ndjson." % (format,))
+
+
+def _field(row, key):
+    """Returns a row's field with surrounding space removed, or None if it is empty."""
+    value = row.get(key)
+    if value is None:
+        return None
+    if not isinstance(value, _TEXT):
+        raise ValueError("Expected %s to be a name, got %r." % (key, value))
+    return value.strip() or None
+
+
+def parseRows(rows, report):
+    """Validates (line, row) pairs, yielding a record for tournament.importRecords()
+    for each valid row and rejecting the rest."""
+    for line, row in rows:
+        try:
+            kind = _field(row, 'type')
+            if kind is None:
+                kind = 'player' if _field(row, 'name') is not None else 'match'
+            kind = kind.lower()
+            if kind == 'player':
+                name = _field(row, 'name')
+                if name is None:
+                    raise ValueError("A player needs a name.")
+                yield line, kind, name, None, None, None
+            elif kind == 'match':
+                match = tournament.normalizeMatch(_field(row, 'player_one'), _field(row, 'player_two'),
+                                                  _field(row, 'winner'))
+                yield (line, kind, None) + match
+            else:
+                raise ValueError("Unknown row type %r; expected player or match." % (kind,))
+        except ValueError as e:
+            report.reject(line, str(e))
+
+
+def importStream(stream, tourney_id, format, max_errors=100):
+    """Imports players and matches from an open CSV or NDJSON stream.
+
+    Args:
+      stream: the file to read, a line at a time
+      tourney_id: the id number of the tournament to import into
+      format: 'csv' or 'ndjson'
+      max_errors: the most rejected rows to describe
+
+    Returns:
+      An ImportReport
+    """
+    report = ImportReport(max_errors)
+    records = parseRows(readRows(stream, format, report), report)
+    players, matches, refused, errors = tournament.importRecords(records, tourney_id, max_errors)
+    report.players = players
+    report.matches = matches
+    report.rejected += refused
+    report.errors = sorted(report.errors + errors)[:max_errors]
+    return report
+
+
+def importFile(path, tourney_id, format=None, max_errors=100):
+    """Imports players and matches from a CSV or NDJSON file; see importStream().
+
+    The format is taken from the file's extension unless given.
+    """
+    if format is None:
+        format = FORMATS.get(os.path.splitext(path)[1].lower())
+        if format is None:
+            raise ValueError("Cannot tell the format of %s; expected a .csv or .ndjson file." % path)
+    with open(path) as stream:
+        return importStream(stream, tourney_id, format, max_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import players and match results into a tournament.')
+    parser.add_argument('path', help='a .csv or .ndjson file of players and/or matches')
+    parser.add_argument('--tournament', type=int, default=None,
+                        help='the tournament to import into; defaults to the current one')
+    parser.add_argument('--format', choices=sorted(set(FORMATS.values())), default=None,
+                        help="the file's format; defaults to its extension")
+    parser.add_argument('--max-errors', type=int, default=100, help='the most rejected rows to list')
+    args = parser.parse_args()
+
+    tourney_id = args.tournament
+    if tourney_id is None:
+        tourney_id = tournament.getCurrentTournamentId()
+        if tourney_id is None:
+            raise SystemExit("There is no tournament to import into; create one first.")
+    report = importFile(args.path, tourney_id, args.format, args.max_errors)
+
+    print("Imported %d players and %d matches into tournament %s." % (report.players, report.matches, tourney_id))
+    if report.rejected:
+        print("Rejected %d rows:" % report.rejected)
+        for line, message in report.errors:
+            print("  line %d: %s" % (line, message))
+        if report.rejected > len(report.errors):
+            print("  and %d more" % (report.rejected - len(report.errors)))
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
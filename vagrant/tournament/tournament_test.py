@@ -3,8 +3,17 @@
 # Test cases for tournament.py extra credit exercises
 
 from tournament import *
+from engine import TournamentEngine
+from instrumentation import CallEvent, addHook, profile, removeHook
+from match_log import MatchLog
+from subscriptions import StandingsSubscriber
+from tournament_import import importFile
 import math
+import os
 import random
+import shutil
+import tempfile
+import threading
 
 NUMBER_OF_PLAYERS = 10
 
@@ -191,7 +200,523 @@ def testOMW():
         print "10. Winner could not be determined using Opponent Match Wins"
 
 
+def testConnectionPool():
+    before = poolStats()
+    for i in range(5):
+        countPlayersFromTournament(tourney_id)
+    after = poolStats()
+    if after['misses'] != before['misses']:
+        raise ValueError("Sequential calls should reuse pooled connections.")
+    if after['hits'] < before['hits'] + 5:
+        raise ValueError("Each call should be served by an idle pooled connection.")
+    print "11. Sequential calls reuse pooled connections."
+
+
+def testStatsAfterDeletingMatches():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    registerPlayer("Ada Lovelace", tourney_id)
+    registerPlayer("Grace Hopper", tourney_id)
+    registerPlayer("Alan Turing", tourney_id)
+    [id1, id2, id3] = [row[0] for row in playerStandings(tourney_id)]
+    reportMatch(id1, id2, id1, tourney_id)
+    reportMatch(id2, id3, id2, tourney_id)
+    reportMatch(id3, None, id3, tourney_id)
+    omw = dict((row[0], row[5]) for row in playerStandings(tourney_id))
+    if omw != {id1: 1, id2: 2, id3: 1}:
+        raise ValueError("OMW should total the wins of each distinct opponent.")
+    deleteMatchesFromTournament(tourney_id)
+    for (i, n, w, m, t, o) in playerStandings(tourney_id):
+        if (w, m, o) != (0, 0, 0):
+            raise ValueError("Deleting matches should reset wins, matches and OMW.")
+    print "12. Deleting matches resets the stored standings."
+
+
+def testRegisterPlayers():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    names = ["Roster Player " + str(i + 1) for i in range(NUMBER_OF_PLAYERS)]
+    ids = registerPlayers(names, tourney_id)
+    if len(ids) != NUMBER_OF_PLAYERS or countPlayersFromTournament(tourney_id) != NUMBER_OF_PLAYERS:
+        raise ValueError("registerPlayers() should register every name it is given.")
+    registered = dict((row[0], row[1]) for row in playerStandings(tourney_id))
+    if [registered[i] for i in ids] != names:
+        raise ValueError("registerPlayers() should return ids in the order of the names.")
+    if registerPlayers([], tourney_id) != []:
+        raise ValueError("registerPlayers() with no names should register nobody.")
+    print "13. A roster of players can be registered in one call."
+
+
+def testReportRound():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    [id1, id2, id3, id4, id5] = registerPlayers(["Kasparov", "Karpov", "Tal", "Fischer", "Spassky"], tourney_id)
+    try:
+        reportMatches([(id1, id2, id1), (id3, id4, id5)], tourney_id)
+    except ValueError:
+        pass
+    else:
+        raise ValueError("reportMatches() should reject a winner who did not play.")
+    if any(row[3] != 0 for row in playerStandings(tourney_id)):
+        raise ValueError("A rejected round should not record any matches.")
+    reportMatches([(id1, id2, id1), (id3, id4, None), (None, id5, None)], tourney_id)
+    standings = dict((row[0], row[2:4]) for row in playerStandings(tourney_id))
+    if standings != {id1: (1, 1), id2: (0, 1), id3: (0, 1), id4: (0, 1), id5: (1, 1)}:
+        raise ValueError("reportMatches() should record wins, draws and byes.")
+    print "14. A whole round of results can be reported at once."
+
+
+def testByes():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    ids = registerPlayers(["Bye Player " + str(i + 1) for i in range(5)], tourney_id)
+    bye_players = []
+    for i in range(5):
+        standings = playerStandings(tourney_id)
+        pairings = swissPairings(tourney_id)
+        if len(pairings) != 2:
+            raise ValueError("For five players, swissPairings should return two pairs.")
+        paired = set([pair[0] for pair in pairings] + [pair[2] for pair in pairings])
+        [bye_player] = set(ids) - paired
+        if bye_player in bye_players:
+            raise ValueError("Players may not receive more than one bye.")
+        eligible = [row[0] for row in standings if row[0] not in bye_players]
+        if bye_player != eligible[-1]:
+            raise ValueError("The bye should go to the lowest ranked eligible player.")
+        bye_players.append(bye_player)
+        reportMatches([(pair[0], pair[2], pair[0]) for pair in pairings], tourney_id)
+    try:
+        swissPairings(tourney_id)
+    except ValueError:
+        pass
+    else:
+        raise ValueError("swissPairings should fail once every player has had a bye.")
+    print "15. Byes go to the lowest ranked player who has not had one."
+
+
+def testNoRematches():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    [id1, id2, id3, id4] = registerPlayers(["Anand", "Kramnik", "Topalov", "Carlsen"], tourney_id)
+    reportMatches([(id1, id2, id1), (id3, id4, id3)], tourney_id)
+    reportMatches([(id1, id3, id1), (id2, id4, id2)], tourney_id)
+    pairings = swissPairings(tourney_id)
+    actual_pairs = set(frozenset([pair[0], pair[2]]) for pair in pairings)
+    if actual_pairs != set([frozenset([id1, id4]), frozenset([id2, id3])]):
+        raise ValueError("swissPairings should not pair players who have already played.")
+    print "16. Players who have already played each other are not paired again."
+
+
+def testEngine():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    registerPlayers(["Engine Player " + str(i + 1) for i in range(NUMBER_OF_PLAYERS - 1)], tourney_id)
+    with TournamentEngine(tourney_id) as engine:
+        engine.registerPlayers(["Engine Player " + str(NUMBER_OF_PLAYERS)])
+        for i in range(3):
+            pairings = engine.swissPairings()
+            engine.reportMatches([(pair[0], pair[2], pair[random.randrange(0, 3, 2)]) for pair in pairings])
+        standings = engine.playerStandings()
+    if standings != playerStandings(tourney_id):
+        raise ValueError("The engine's standings should match the database once flushed.")
+    print "17. The in-memory engine agrees with the database after flushing."
+
+
+def testStandingsCache():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    [id1, id2] = registerPlayers(["Cached One", "Cached Two"], tourney_id)
+    playerStandings(tourney_id)
+    before = standingsCacheStats()
+    standings = playerStandings(tourney_id)
+    if standingsCacheStats()['hits'] != before['hits'] + 1:
+        raise ValueError("Unchanged standings should be served from the cache.")
+    reportMatch(id2, id1, id2, tourney_id)
+    standings = playerStandings(tourney_id)
+    if standings[0][0] != id2 or standings[0][2] != 1:
+        raise ValueError("Reporting a match should invalidate cached standings.")
+    print "18. Standings are cached until the tournament changes."
+
+
+def testTiebreakers():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    [a, b, c, d] = registerPlayers(["Tie A", "Tie B", "Tie C", "Tie D"], tourney_id)
+    reportMatches([(a, b, a), (c, d, c)], tourney_id)
+    reportMatches([(a, d, a), (b, c, b)], tourney_id)
+    if playerStandings(tourney_id, ('wins', 'omw')) != playerStandings(tourney_id):
+        raise ValueError("Ranking on wins and OMW should match the default standings.")
+    if findPlayerOMW(b, tourney_id) != 3:
+        raise ValueError("Player B's opponents have won 3 matches between them.")
+    # B and C both have one win, but B beat C while C only beat D
+    ranked = [row[0] for row in playerStandings(tourney_id, ('wins', 'sonneborn_berger'))]
+    if ranked != [a, b, c, d]:
+        raise ValueError("Sonneborn-Berger should rank B above C.")
+    print "19. Standings can be ranked on a chain of tiebreakers."
+
+
+def testPairAllActiveTournaments():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    registerPlayers(["Slot A", "Slot B", "Slot C", "Slot D"], tourney_id)
+    createNewTournament()
+    other_id = getCurrentTournamentId()
+    registerPlayers(["Odd A", "Odd B", "Odd C"], other_id)
+
+    pairings, failures = pairAllActiveTournaments(2, [tourney_id, other_id])
+    if failures or len(pairings[tourney_id]) != 2 or len(pairings[other_id]) != 1:
+        raise ValueError("Every active tournament should be paired in one call.")
+    if [row[3] for row in playerStandings(other_id)].count(1) != 1:
+        raise ValueError("The odd player out should be recorded with a bye.")
+
+    closeTournament(other_id)
+    pairings, failures = pairAllActiveTournaments(1, [tourney_id, other_id])
+    if other_id in pairings:
+        raise ValueError("Closed tournaments should not be paired.")
+    deleteMatchesFromTournament(other_id)
+    deletePlayersFromTournament(other_id)
+    print "20. Every active tournament can be paired at once."
+
+
+def testStandingsPages():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    ids = registerPlayers(["Page %d" % i for i in range(7)], tourney_id)
+    reportMatches([(ids[0], ids[1], ids[0]), (ids[2], ids[3], ids[3]), (ids[4], ids[5], None)], tourney_id)
+    standings = playerStandings(tourney_id)
+    if list(iterStandings(tourney_id, 2)) != standings:
+        raise ValueError("Streamed standings should match playerStandings().")
+    with transaction():
+        if list(zip(iterStandings(tourney_id, 2), iterStandings(tourney_id, 3))) != list(zip(standings, standings)):
+            raise ValueError("Streams opened on one transaction's connection should not collide.")
+    pages = []
+    page = standingsPage(tourney_id, limit=3)
+    while page:
+        pages.extend(page)
+        page = standingsPage(tourney_id, limit=3, after_key=standingsKey(page[-1]))
+    if pages != standings:
+        raise ValueError("Paging by key should walk the whole standings in order.")
+    if standingsPage(tourney_id, limit=3, offset=3) != standings[3:6] or topK(tourney_id, 2) != standings[:2]:
+        raise ValueError("Offset pages and topK() should slice the standings.")
+    print "22. Standings can be streamed and paged."
+
+
+def testDropTournament():
+    createNewTournament()
+    other_id = getCurrentTournamentId()
+    [one, two] = registerPlayers(["Dropped One", "Dropped Two"], other_id)
+    reportMatch(one, two, one, other_id)
+    dropTournament(other_id)
+    if countPlayersFromTournament(other_id) != 0 or playerStandings(other_id):
+        raise ValueError("Dropping a tournament should remove its players and matches.")
+    if countPlayersFromTournament(tourney_id) == 0:
+        raise ValueError("Dropping a tournament should leave other tournaments alone.")
+    print "23. A whole tournament can be dropped at once."
+
+
+def testArchiveTournament():
+    createNewTournament()
+    archived_id = getCurrentTournamentId()
+    [one, two, three, four] = registerPlayers(["Archived One", "Archived Two", "Archived Three",
+                                               "Archived Four"], archived_id)
+    reportMatches([(one, two, one), (three, four, three), (one, three, one)], archived_id)
+    createNewTournament()
+    exported_id = getCurrentTournamentId()
+    [five, six] = registerPlayers(["Exported One", "Exported Two"], exported_id)
+    reportMatch(five, six, six, exported_id)
+    standings = playerStandings(archived_id)
+
+    closeTournament(archived_id)
+    closeTournament(exported_id)
+    export_dir = tempfile.mkdtemp()
+    try:
+        try:
+            with transaction():
+                archiveTournament(exported_id, exportPath(export_dir, exported_id))
+                raise RuntimeError("Roll back the archive.")
+        except RuntimeError:
+            pass
+        if os.listdir(export_dir):
+            raise ValueError("An archive that is rolled back should leave no export behind.")
+        archiveTournament(exported_id, exportPath(export_dir, exported_id))
+        with open(exportPath(export_dir, exported_id)) as export:
+            lines = export.read().splitlines()
+        exports = os.listdir(export_dir)
+    finally:
+        shutil.rmtree(export_dir)
+    if len(lines) != 2 or not lines[0].startswith("id,"):
+        raise ValueError("An exported tournament's matches should be written to its file as CSV.")
+    if exports != [os.path.basename(exportPath(export_dir, exported_id))]:
+        raise ValueError("An archive should leave only its export behind.")
+
+    archived = compactTournaments()
+    if archived_id not in archived or exported_id in archived:
+        raise ValueError("Compaction should archive closed tournaments that are not yet archived.")
+    if compactTournaments():
+        raise ValueError("Compacting again should find nothing left to archive.")
+    if countPlayersFromTournament(archived_id) != 0:
+        raise ValueError("Archiving a tournament should remove its players from the live tables.")
+    if [tuple(row) for row in playerStandings(archived_id)] != [tuple(row) for row in standings]:
+        raise ValueError("An archived tournament should keep its final standings.")
+    if [tuple(row) for row in standingsPage(archived_id, limit=2)] != [tuple(row) for row in standings[:2]]:
+        raise ValueError("An archived tournament's standings should still be paged.")
+    if [tuple(row) for row in standingsPage(archived_id, limit=2, after_key=standingsKey(standings[1]))] != \
+            [tuple(row) for row in standings[2:4]] or \
+            [tuple(row) for row in iterStandings(archived_id)] != [tuple(row) for row in standings]:
+        raise ValueError("An archived tournament's standings should be paged by key and streamed.")
+    if countPlayersFromTournament(tourney_id) == 0:
+        raise ValueError("Archiving a tournament should leave active tournaments alone.")
+    print "24. Closed tournaments can be archived with their final standings."
+
+
+def testRounds():
+    createNewTournament()
+    rounds_id = getCurrentTournamentId()
+    [one, two, three, four] = registerPlayers(["Round One", "Round Two", "Round Three", "Round Four"], rounds_id)
+    if getCurrentRound(rounds_id) != 1:
+        raise ValueError("A new tournament should start in round 1.")
+    reportMatches([(one, two, one), (three, four, three)], rounds_id)
+    after_first = [tuple(row) for row in playerStandings(rounds_id)]
+    if closeRound(rounds_id) != 1 or getCurrentRound(rounds_id) != 2:
+        raise ValueError("Closing round 1 should open round 2.")
+    reportMatches([(one, three, three), (two, four, None)], rounds_id)
+    closeRound(rounds_id)
+
+    if [tuple(row) for row in standingsAfterRound(rounds_id, 1)] != after_first:
+        raise ValueError("Standings after round 1 should not include later results.")
+    if [tuple(row) for row in standingsAfterRound(rounds_id, 2)] != \
+            [tuple(row) for row in playerStandings(rounds_id)]:
+        raise ValueError("Standings after the last closed round should match the current standings.")
+    if standingsAfterRound(rounds_id, 3):
+        raise ValueError("A round that has not closed should have no standings.")
+    deleteMatchesFromTournament(rounds_id)
+    if getCurrentRound(rounds_id) != 1 or standingsAfterRound(rounds_id, 1):
+        raise ValueError("Deleting a tournament's matches should start its rounds over.")
+    print "25. Standings are saved as each round closes."
+
+
+def testSession():
+    with profile() as result:
+        with TournamentSession() as session:
+            session_id = session.createNewTournament()
+            [one, two, three] = session.registerPlayers(["Session One", "Session Two", "Session Three"])
+            pairs = session.swissPairings()
+            session.reportMatches([(pair[0], pair[2], pair[0]) for pair in pairs])
+            session.closeRound()
+            standings = session.playerStandings()
+    if result.summary()['connections'] > 1:
+        raise ValueError("A session should check out one connection for all of its calls.")
+    if session_id != getCurrentTournamentId() or countPlayersFromTournament(session_id) != 3:
+        raise ValueError("A session's changes should be committed when it ends.")
+    if [tuple(row) for row in playerStandings(session_id)] != [tuple(row) for row in standings]:
+        raise ValueError("Standings read in a session should match those read after it.")
+    if [row[2] for row in standings] != [1, 1, 0]:
+        raise ValueError("A session should record both the bye and the round's result.")
+
+    try:
+        with TournamentSession(session_id) as session:
+            session.registerPlayer("Session Four")
+            raise RuntimeError("abandon the session")
+    except RuntimeError:
+        pass
+    if countPlayersFromTournament(session_id) != 3:
+        raise ValueError("A session that raises should be rolled back.")
+    print "26. A session runs a whole round on one connection and commits once."
+
+
+def testConcurrentCreation():
+    created = []
+
+    def create():
+        for _ in range(5):
+            created.append(createNewTournament())
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if len(created) != 40 or len(set(created)) != 40:
+        raise ValueError("Concurrent createNewTournament() calls should each get a new id.")
+    player_id = registerPlayer("Returned Id", created[0])
+    if [row[0] for row in playerStandings(created[0])] != [player_id]:
+        raise ValueError("registerPlayer() should return the new player's id.")
+    for created_id in created:
+        dropTournament(created_id)
+    print "27. Tournaments created concurrently get distinct ids."
+
+
+def testStandingsSubscription():
+    watched_id = createNewTournament()
+    [one, two, three, four] = registerPlayers(["Watched One", "Watched Two", "Watched Three",
+                                               "Watched Four"], watched_id)
+    with StandingsSubscriber([watched_id]) as subscriber:
+        [initial] = subscriber.poll(timeout=5)
+        if not initial.reset or len(initial.rows) != 4:
+            raise ValueError("A subscription should start with the whole standings.")
+        reportMatch(one, two, one, watched_id)
+        [delta] = subscriber.poll(timeout=5)
+        if delta.reset or sorted(row[0] for row in delta.rows) != sorted([one, two]):
+            raise ValueError("After a match only the two players' rows should be pushed.")
+        if delta.version <= initial.version:
+            raise ValueError("Each change should carry a newer version.")
+        if subscriber.poll(timeout=0.1):
+            raise ValueError("Nothing should be pushed while nothing changes.")
+        dropTournament(watched_id)
+        [dropped] = subscriber.poll(timeout=5)
+        if not dropped.reset or dropped.rows or dropped.version is not None:
+            raise ValueError("Dropping a tournament should push empty standings.")
+    print "28. Standings changes are pushed to subscribers."
+
+
+def testMatchLog():
+    logged_id = createNewTournament()
+    [one, two, three, four] = registerPlayers(["Logged One", "Logged Two", "Logged Three",
+                                               "Logged Four"], logged_id)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "matches.log")
+    try:
+        crashed = MatchLog(path, flush_interval=3600)
+        crashed.reportMatch(one, two, one, logged_id)
+        crashed.reportMatches([(three, four, four)], logged_id)
+        try:
+            crashed.reportMatch(one, one, one, logged_id)
+            raise ValueError("A malformed result should be refused before it is logged.")
+        except ValueError as e:
+            if "themselves" not in str(e):
+                raise
+        if sum(row[3] for row in playerStandings(logged_id)) != 0:
+            raise ValueError("Logged results should not be recorded before the log is flushed.")
+        # stop as if the process died halfway through logging another result
+        with open(path, 'a') as log:
+            log.write('[3,%s,%s' % (logged_id, one))
+
+        with MatchLog(path) as log:
+            if log.log_id != crashed.log_id or log.pending() != 2:
+                raise ValueError("Reopening a log should replay the results not yet recorded.")
+            log.flush()
+            log.reportMatch(one, 999999, one, logged_id)
+        wins = dict((row[0], row[2]) for row in playerStandings(logged_id))
+        if wins != {one: 1, two: 0, three: 0, four: 1}:
+            raise ValueError("Replayed results should be recorded once each.")
+        if len(log.rejected) != 1 or log.rejected[0][0][3] != 999999:
+            raise ValueError("A result the database refuses should be set aside.")
+
+        if reportLoggedMatches(log.log_id, [(1, logged_id, one, two, one)]) != 0:
+            raise ValueError("A logged result should not be recorded twice.")
+        with MatchLog(path) as log:
+            if log.pending() != 0:
+                raise ValueError("A log whose results are recorded should have nothing to replay.")
+    finally:
+        shutil.rmtree(directory)
+    dropTournament(logged_id)
+    print "29. Results logged ahead are recorded exactly once, even after a crash."
+
+
+def testEngineRejects():
+    engine_id = createNewTournament()
+    [one, two, three, four] = registerPlayers(["Engine One", "Engine Two", "Engine Three",
+                                               "Engine Four"], engine_id)
+    with TournamentEngine(engine_id, flush_interval=3600) as engine:
+        engine.reportMatches([(one, two, one), (three, four, three)])
+        # another writer removes players the engine has results queued for
+        with closing(connect()) as db:
+            db.cursor().execute("DELETE FROM players WHERE tourney_id=%s AND id IN (%s, %s);",
+                                (engine_id, three, four))
+            db.commit()
+        engine.reportMatch(one, two, two)
+        if engine.closeRound() != 1 or engine.pending() != 0:
+            raise ValueError("Closing a round from the engine should write its queued results first.")
+        if [row for row, e in engine.rejected] != [(three, four, three)]:
+            raise ValueError("A result the database refuses should be set aside.")
+    if standingsAfterRound(engine_id, 1) != [tuple(row) for row in playerStandings(engine_id)] or \
+            dict((row[0], row[2]) for row in playerStandings(engine_id))[one] != 1:
+        raise ValueError("The other results in a refused batch should still be recorded.")
+    dropTournament(engine_id)
+    print "31. The engine sets refused results aside and writes the rest before closing a round."
+
+
+def testImport():
+    imported_id = createNewTournament()
+    registerPlayer("Already Here", imported_id)
+    directory = tempfile.mkdtemp()
+    try:
+        roster = os.path.join(directory, "roster.csv")
+        with open(roster, 'w') as csv_file:
+            csv_file.write("type,name,player_one,player_two,winner\n"
+                           "player,Ann,,,\n"
+                           "player,Bob,,,\n"
+                           "match,,Ann,Bob,Ann\n"
+                           "match,,Ann,Ann,\n"
+                           "match,,Cid,Already Here,Cid\n"
+                           "player,Cid,,,\n"
+                           "match,,Dee,Bob,\n"
+                           "player,,,,\n")
+        report = importFile(roster, imported_id)
+        if (report.players, report.matches, report.rejected) != (3, 2, 3):
+            raise ValueError("The valid rows of a CSV file should be imported and the rest rejected.")
+        if [line for (line, _) in report.errors] != [5, 8, 9] or "Dee" not in report.errors[1][1]:
+            raise ValueError("Each rejected row should be reported with its line.")
+
+        results = os.path.join(directory, "results.ndjson")
+        with open(results, 'w') as ndjson_file:
+            ndjson_file.write('{"player_one": "Bob", "player_two": null}\n'
+                              '{"player_one": "Ann", "player_two": "Cid", "winner": "Cid"}\n'
+                              '{"player_one": "Ann", "player_two"\n'
+                              '\n'
+                              '{"player_one": "Bob", "player_two": "Cid", "winner": "Ann"}\n')
+        report = importFile(results, imported_id)
+        if (report.players, report.matches, report.rejected) != (0, 2, 2):
+            raise ValueError("The valid rows of an NDJSON file should be imported and the rest rejected.")
+        if [line for (line, _) in report.errors] != [3, 5]:
+            raise ValueError("Each rejected row should be reported with its line.")
+    finally:
+        shutil.rmtree(directory)
+
+    standings = dict((row[1], row[2:4]) for row in playerStandings(imported_id))
+    if standings != {"Already Here": (0, 1), "Ann": (1, 2), "Bob": (1, 2), "Cid": (2, 2)}:
+        raise ValueError("Imported matches should count towards the standings.")
+    dropTournament(imported_id)
+    print "30. Rosters and results can be imported from CSV and NDJSON files."
+
+
+def testInstrumentation():
+    deleteMatchesFromTournament(tourney_id)
+    deletePlayersFromTournament(tourney_id)
+    registerPlayers(["Traced One", "Traced Two", "Traced Three", "Traced Four"], tourney_id)
+    calls = []
+
+    def hook(event):
+        if isinstance(event, CallEvent):
+            calls.append(event.function)
+
+    addHook(hook)
+    with profile() as result:
+        swissPairings(tourney_id)
+    removeHook(hook)
+    countPlayersFromTournament(tourney_id)
+
+    summary = result.summary()
+    if summary['connections'] != 1 or summary['queries'] < 1:
+        raise ValueError("swissPairings() should run its queries on one connection.")
+    if [call.function for call in result.calls] != ["swissPairings"]:
+        raise ValueError("The profile should record the swissPairings() call.")
+    if calls != ["swissPairings"]:
+        raise ValueError("Hooks should only see calls made while they are registered.")
+    with profile() as result:
+        list(iterStandings(tourney_id))
+    if [(call.function, call.queries > 0) for call in result.calls] != [("iterStandings", True)]:
+        raise ValueError("A streamed call should be reported with the statements run while iterating it.")
+    print "21. Connections, queries and calls can be traced."
+
+
 if __name__ == '__main__':
+    # TOURNAMENT_BACKEND=sqlite runs the tests against an in-memory database
+    # instead, skipping those that exercise PostgreSQL-only features
+    postgres = os.environ.get('TOURNAMENT_BACKEND', 'postgres') == 'postgres'
+    if not postgres:
+        from sqlite_backend import SQLiteBackend
+        useBackend(SQLiteBackend())
     createNewTournament()
     global tourney_id
     tourney_id = getCurrentTournamentId()
@@ -205,6 +730,32 @@ if __name__ == '__main__':
     testPairings()
     testRoundPairing()
     testOMW()
+    if postgres:
+        testConnectionPool()
+    testStatsAfterDeletingMatches()
+    testRegisterPlayers()
+    testReportRound()
+    testByes()
+    testNoRematches()
+    if postgres:
+        testEngine()
+        testStandingsCache()
+    testTiebreakers()
+    testPairAllActiveTournaments()
+    if postgres:
+        testInstrumentation()
+    testStandingsPages()
+    testDropTournament()
+    testArchiveTournament()
+    testRounds()
+    testSession()
+    testConcurrentCreation()
+    if postgres:
+        testStandingsSubscription()
+    testMatchLog()
+    testImport()
+    if postgres:
+        testEngineRejects()
     print "Success!  All tests pass!"
 
 